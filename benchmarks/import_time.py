@@ -0,0 +1,62 @@
+"""
+Import-time benchmark of the wind farm modules.
+
+Each farm module is imported in a fresh interpreter after PyWake itself has been imported,
+so the measured time is the cost of the farm module alone (classes and layout data).
+The benchmark fails (exit code 1) if any module exceeds the time budget.
+
+Usage: python benchmarks/import_time.py [--budget 0.25] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+FARM_MODULES = ['HornseaProject2', 'BorkumRiffgrundII', 'BorsseleIandII', 'BorsseleIIIandIV', 'BorsseleWFZ']
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE = """
+import json, sys, time
+import py_wake
+from py_wake.site._site import UniformWeibullSite
+from py_wake.wind_turbines import WindTurbine
+from py_wake.wind_turbines.power_ct_functions import PowerCtTabular
+t = time.perf_counter()
+__import__(sys.argv[1])
+print(json.dumps({'module': sys.argv[1], 'import_time': time.perf_counter() - t}))
+"""
+
+
+def measure(module, repeat=3):
+    """Return the fastest of <repeat> import times of <module> in seconds"""
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _MEASURE, module], cwd=REPO_DIR, check=True,
+                             capture_output=True, text=True, env={**os.environ, 'MPLBACKEND': 'Agg'}).stdout
+        times.append(json.loads(out.splitlines()[-1])['import_time'])
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.25, help='Max import time per module [s]')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of imports per module (fastest is used)')
+    parser.add_argument('modules', nargs='*', default=FARM_MODULES)
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module in args.modules:
+        t = measure(module, args.repeat)
+        ok = t <= args.budget
+        print('%-20s %8.3f s %s' % (module, t, ('FAIL', 'ok')[ok]))
+        if not ok:
+            failed.append(module)
+    if failed:
+        print('Import time budget of %.3f s exceeded by: %s' % (args.budget, ', '.join(failed)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
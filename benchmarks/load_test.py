@@ -0,0 +1,113 @@
+"""
+Load test of the local AEP service (offshore_farms.service).
+
+Sends <requests> AEP queries from <concurrency> client threads. The queries are drawn at random from <unique>
+distinct queries (farm x turbulence intensity x shear), so after the first round most of them are answered from
+the result cache. The latency percentiles of cached and simulated queries and the throughput are printed.
+
+If no --url is given, a service is started in this process on a free port.
+
+Usage:
+    python benchmarks/load_test.py [--url http://127.0.0.1:8765] [--requests 2000] [--concurrency 16]
+                                   [--unique 40] [--farms borkumriffgrund2 ...] [--wd-step 10]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy  # noqa
+from offshore_farms import service as aep_service  # noqa
+from offshore_farms.registry import farm_names  # noqa
+
+_connections = threading.local()
+
+
+def post(host, port, query):
+    """Send a query and return (latency [s], result)"""
+    if not hasattr(_connections, 'conn'):
+        _connections.conn = http.client.HTTPConnection(host, port)
+    body = json.dumps(query)
+    t = time.perf_counter()
+    _connections.conn.request('POST', '/aep', body, {'Content-Type': 'application/json'})
+    response = _connections.conn.getresponse()
+    result = json.loads(response.read())
+    latency = time.perf_counter() - t
+    if response.status != 200:
+        raise RuntimeError('%d: %s' % (response.status, result.get('error')))
+    return latency, result
+
+
+def queries(farms, unique, wd_step, rng):
+    """<unique> distinct queries of the farms with varying turbulence intensity and shear"""
+    n_per_farm = max(1, unique // len(farms))
+    return [{'farm': f, 'ti': round(.04 + .12 * rng.random(), 3), 'shear': [None, .1, .12, .14][i % 4],
+             'wd_step': wd_step}
+            for f in farms for i in range(n_per_farm)]
+
+
+def percentiles(latencies):
+    if not latencies:
+        return 'n=0'
+    p = numpy.percentile(numpy.array(latencies) * 1e3, [50, 95, 99])
+    return 'n=%d p50=%.2f ms p95=%.2f ms p99=%.2f ms max=%.2f ms' % (len(latencies), *p, max(latencies) * 1e3)
+
+
+def run(host, port, n_requests, concurrency, farms, unique, wd_step, seed=0):
+    rng = numpy.random.default_rng(seed)
+    qs = queries(farms, unique, wd_step, rng)
+    sequence = [qs[i] for i in rng.integers(0, len(qs), n_requests)]
+    t = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda q: post(host, port, q), sequence))
+    duration = time.perf_counter() - t
+    cached = [lat for lat, r in results if r['cached']]
+    simulated = [lat for lat, r in results if not r['cached']]
+    batch_sizes = [r['batch_size'] for _, r in results if not r['cached']]
+    print('%d requests, %d distinct, %d client threads: %.1f requests/s' % (n_requests, len(qs), concurrency,
+                                                                          n_requests / duration))
+    print('cached:    %s' % percentiles(cached))
+    print('simulated: %s' % percentiles(simulated))
+    if batch_sizes:
+        print('mean batch size of simulated queries: %.1f' % numpy.mean(batch_sizes))
+    return cached, simulated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test of the AEP service')
+    parser.add_argument('--url', default=None, help='URL of a running service. Default: start one in-process')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--unique', type=int, default=40, help='Number of distinct queries')
+    parser.add_argument('--farms', nargs='+', default=farm_names(), choices=farm_names())
+    parser.add_argument('--wd-step', type=float, default=10, help='Wind direction step of the queries')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port
+    else:
+        server = aep_service.make_server(aep_service.AEPService(), port=0)
+        host, port = server.server_address[:2]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        run(host, port, args.requests, args.concurrency, args.farms, args.unique, args.wd_step, args.seed)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
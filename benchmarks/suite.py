@@ -0,0 +1,192 @@
+"""
+Benchmark suite of the wind farm models.
+
+For each farm the suite measures
+- import: import time of the farm module (see import_time.py)
+- construct_<class>: construction of the site and wind turbine classes, e.g. Hornsea2() and SG8_167()
+- simulation: NOJ simulation of the farm on each wd/ws grid
+- aggregation: AEP and wake loss aggregation of the simulation result on each grid
+and records wall time, peak (traced) memory and, for the grid stages, wind turbines x flow cases per second.
+
+"run" appends one JSON line with the results, commit and versions to a history file.
+"compare" compares two runs of the history file (default the last two) and fails (exit code 1)
+if the time or peak memory of any benchmark increased more than a threshold.
+
+Usage:
+    python benchmarks/suite.py run [--farms hornsea2 ...] [--grids coarse medium full] [--history file]
+    python benchmarks/suite.py compare [--threshold 0.1] [--baseline -2] [--current -1] [--history file]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy  # noqa
+import py_wake  # noqa
+from py_wake import NOJ  # noqa
+from import_time import measure as measure_import  # noqa
+from offshore_farms import registry, report  # noqa
+
+DEFAULT_HISTORY = os.path.join(REPO_DIR, 'benchmarks', 'history.jsonl')
+
+# Wind direction and wind speed step of the benchmark grids, wd in [0,360[ and ws in [3,25]
+grids = {'coarse': (30, 2), 'medium': (10, 1), 'full': (1, 1)}
+
+
+def grid(name):
+    wd_step, ws_step = grids[name]
+    return numpy.arange(0, 360, wd_step), numpy.arange(3, 26, ws_step)
+
+
+def timeit(f, repeat):
+    """Return the result of f and the fastest of <repeat> wall times"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        res = f()
+        times.append(time.perf_counter() - t)
+    return res, min(times)
+
+
+def peak_memory(f):
+    """Peak traced memory [MB] of calling f. Measured separately from the time as tracing slows down the code"""
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1] / 1024**2
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(f, repeat, **info):
+    res, t = timeit(f, repeat)
+    result = {**info, 'time': t, 'peak_MB': peak_memory(f)}
+    if 'flow_cases' in info:
+        result['wt_flow_cases_pr_s'] = info['n_wt'] * info['flow_cases'] / t
+    return res, result
+
+
+def benchmark_farm(name, grid_names, repeat=3):
+    """Benchmark results (list of dicts) of the farm, <name>"""
+    results = [{'farm': name, 'stage': 'import', 'time': measure_import(registry.farm_modules[name], repeat)}]
+    for cls in (registry.get_site_class(name),) + registry.get_wind_turbine_classes(name):
+        results.append(benchmark(cls, repeat, farm=name, stage='construct_' + cls.__name__)[1])
+
+    farm = registry.get_farm(name)
+    wfm = farm.wind_farm_model(NOJ)
+    for grid_name in grid_names:
+        wd, ws = grid(grid_name)
+        info = dict(farm=name, grid=grid_name, n_wt=len(farm.x), flow_cases=len(wd) * len(ws))
+        (_, _, power_ilk, _, lw, kwargs_ilk), result = benchmark(
+            lambda: wfm(farm.x, farm.y, type=farm.type, wd=wd, ws=ws, return_simulationResult=False),
+            repeat, stage='simulation', **info)
+        results.append(result)
+
+        def aggregate():
+            return report.make_report(farm, wd, lw.P_ilk, (power_ilk * lw.P_ilk).sum(2),
+                                       report.free_stream_power(wfm, lw, kwargs_ilk))
+        results.append(benchmark(aggregate, repeat, stage='aggregation', **info)[1])
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(farms, grid_names, repeat, history):
+    results = []
+    for name in farms:
+        for result in benchmark_farm(name, grid_names, repeat):
+            print(format_result(result))
+            results.append(result)
+    record = {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+              'python': platform.python_version(), 'numpy': numpy.__version__, 'py_wake': py_wake.__version__,
+              'machine': platform.node(), 'results': results}
+    with open(history, 'a') as fid:
+        fid.write(json.dumps(record) + '\n')
+    print('Results appended to %s' % history)
+
+
+def format_result(result):
+    s = '%-18s %-26s %-7s %9.4f s' % (result['farm'], result['stage'], result.get('grid', ''), result['time'])
+    if 'peak_MB' in result:
+        s += ' %9.1f MB' % result['peak_MB']
+    if 'wt_flow_cases_pr_s' in result:
+        s += ' %12.0f wt*flow cases/s' % result['wt_flow_cases_pr_s']
+    return s
+
+
+def load_history(history):
+    with open(history) as fid:
+        return [json.loads(line) for line in fid if line.strip()]
+
+
+def compare(history, baseline=-2, current=-1, threshold=.1, min_time=5e-3):
+    """Print the relative change of time and peak memory between two runs and return the regressions
+
+    Changes in time below <min_time> seconds are ignored as they are dominated by noise
+    """
+    runs = load_history(history)
+    base, cur = runs[baseline], runs[current]
+    print('Baseline: %s (%s), current: %s (%s)' % (base['timestamp'], base['commit'],
+                                                   cur['timestamp'], cur['commit']))
+
+    def key(r):
+        return r['farm'], r['stage'], r.get('grid', '')
+    base_results = {key(r): r for r in base['results']}
+    regressions = []
+    for r in cur['results']:
+        b = base_results.get(key(r))
+        if b is None:
+            continue
+        for metric, min_change in [('time', min_time), ('peak_MB', 0)]:
+            if metric not in r or metric not in b:
+                continue
+            change = (r[metric] - b[metric]) / b[metric] if b[metric] else 0
+            regression = change > threshold and r[metric] - b[metric] > min_change
+            print('%-18s %-26s %-7s %-8s %10.4g -> %10.4g %+7.1f%% %s' % (
+                key(r) + (metric, b[metric], r[metric], change * 100, ('', 'REGRESSION')[regression])))
+            if regression:
+                regressions.append(key(r) + (metric,))
+    if regressions:
+        print('%d regression(s) of more than %g%%' % (len(regressions), threshold * 100))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('run', help='Run the benchmarks and append the results to the history file')
+    p.add_argument('--farms', nargs='+', default=registry.farm_names(), choices=registry.farm_names())
+    p.add_argument('--grids', nargs='+', default=list(grids), choices=list(grids))
+    p.add_argument('--repeat', type=int, default=3, help='Number of runs per benchmark (fastest is used)')
+    p.add_argument('--history', default=DEFAULT_HISTORY)
+    p = sub.add_parser('compare', help='Compare two runs of the history file')
+    p.add_argument('--baseline', type=int, default=-2, help='Index of the baseline run in the history file')
+    p.add_argument('--current', type=int, default=-1, help='Index of the current run in the history file')
+    p.add_argument('--threshold', type=float, default=.1, help='Relative increase flagged as regression')
+    p.add_argument('--min-time', type=float, default=5e-3, help='Time increases below this [s] are ignored')
+    p.add_argument('--history', default=DEFAULT_HISTORY)
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args.farms, args.grids, args.repeat, args.history)
+        return 0
+    return int(bool(compare(args.history, args.baseline, args.current, args.threshold, args.min_time)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
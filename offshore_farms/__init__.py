@@ -0,0 +1,5 @@
+"""
+Shared helpers for the offshore wind farm models.
+The farm models themselves live in the top-level modules (HornseaProject2, BorsseleWFZ, ...).
+"""
+from offshore_farms.registry import Farm, farm_names, get_farm, register_farm
@@ -0,0 +1,137 @@
+"""
+Batch AEP runner for a matrix of scenarios (farm x wake model x ti x shear).
+
+The scenarios are distributed over a pool of worker processes and the results are streamed as one row per
+scenario as they complete. Each worker builds the site, wind turbines and wind farm model of a farm and wake
+model once and reuses them for its later scenarios. Usage:
+
+    python -m offshore_farms.batch --farms hornsea2 borsselewfz --wake-models NOJ BastankhahGaussian \\
+        --ti 0.06 0.1 --shear none 0.12 --workers 8 --output results.csv
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+from functools import lru_cache
+import itertools
+import os
+import sys
+import time
+import py_wake
+from offshore_farms import profiling, report
+from offshore_farms.precision import precisions
+from offshore_farms.registry import Farm, farm_names, get_farm
+
+columns = ['scenario', 'farm', 'wake_model', 'ti', 'shear', 'n_wt', 'aep', 'aep_gross', 'wake_loss',
+           'wake_loss_pct', 'time']
+
+
+class _WorkerFarm(Farm):
+    """Farm of a worker process that builds its wind farm model once per wake model and reuses it"""
+
+    def __init__(self, farm):
+        Farm.__init__(self, farm.name, farm.label, farm.site, farm.windTurbines, farm.x, farm.y, farm.type,
+                      farm.subfarms)
+        self._models = {}
+
+    def wind_farm_model(self, wake_model=None, **kwargs):
+        if kwargs:
+            return Farm.wind_farm_model(self, wake_model, **kwargs)
+        key = (wake_model, profiling.enabled())  # profiled models are instrumented
+        if key not in self._models:
+            self._models[key] = Farm.wind_farm_model(self, wake_model)
+        return self._models[key]
+
+
+@lru_cache(maxsize=None)
+def _worker_farm(name, ti, shear):
+    # Farm (site, wind turbines, layout and wind farm models) built by this worker process, reused by all its
+    # scenarios
+    return _WorkerFarm(get_farm(name, ti, shear))
+
+
+def get_wake_model(name):
+    """Wind farm model class from its name in the py_wake namespace, e.g. 'NOJ' or 'BastankhahGaussian'"""
+    wake_model = getattr(py_wake, name, None)
+    if not isinstance(wake_model, type) or not issubclass(wake_model, py_wake.WindFarmModel):
+        raise ValueError("Unknown wake model, '%s'" % name)
+    return wake_model
+
+
+def scenario_matrix(farms=None, wake_models=('NOJ',), ti=(.1,), shear=(None,)):
+    """List of scenario dicts of all combinations of the arguments"""
+    return [dict(farm=f, wake_model=w, ti=t, shear=s)
+            for f, w, t, s in itertools.product(farms or farm_names(), wake_models, ti, shear)]
+
+
+def run_scenario(scenario, **kwargs):
+    """AEP of a single scenario dict (see scenario_matrix) as a result row"""
+    farm = _worker_farm(scenario['farm'], scenario['ti'], scenario['shear'])
+    t = time.perf_counter()
+    r = report.aep_report(farm, get_wake_model(scenario['wake_model']), verbose=False, **kwargs)
+    return {**scenario, 'n_wt': len(farm.x), 'aep': float(r.aep), 'aep_gross': float(r.aep_gross),
+            'wake_loss': float(r.wake_loss), 'wake_loss_pct': float(r.wake_loss / r.aep_gross * 100),
+            'time': time.perf_counter() - t}
+
+
+def run_batch(scenarios, workers=None, **kwargs):
+    """Run the scenarios in <workers> processes and yield the result rows as they complete
+
+    Parameters
+    ----------
+    scenarios : list of dict
+        Scenarios, see scenario_matrix
+    workers : int or None, optional
+        Number of worker processes. None: number of CPUs. 1: run in this process
+    kwargs : dict
+        Additional arguments for aep_report, e.g. cache=True
+    """
+    scenarios = [{'scenario': i, **s} for i, s in enumerate(scenarios)]
+    for s in scenarios:
+        get_wake_model(s['wake_model'])  # fail before starting the workers
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for s in scenarios:
+            yield run_scenario(s, **kwargs)
+        return
+    # Scenarios of the same farm are submitted together so each worker tends to reuse its farms
+    scenarios = sorted(scenarios, key=lambda s: (s['farm'], str(s['ti']), str(s['shear'])))
+    with ProcessPoolExecutor(max_workers=min(workers, len(scenarios))) as executor:
+        futures = [executor.submit(run_scenario, s, **kwargs) for s in scenarios]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _float_or_none(v):
+    return None if v.lower() == 'none' else float(v)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.batch',
+                                     description='AEP of all combinations of farms, wake models, ti and shear')
+    parser.add_argument('--farms', nargs='+', default=None, choices=farm_names(), help='Default: all farms')
+    parser.add_argument('--wake-models', nargs='+', default=['NOJ'])
+    parser.add_argument('--ti', nargs='+', type=float, default=[.1])
+    parser.add_argument('--shear', nargs='+', type=_float_or_none, default=[None],
+                        help="Power law shear exponents or 'none'")
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes. Default: all CPUs')
+    parser.add_argument('--cache', action='store_true', help='Use the AEP result cache')
+    parser.add_argument('--precision', default='float64', choices=precisions,
+                        help='Floating point precision of the simulations')
+    parser.add_argument('--output', default=None, help='CSV output file. Default: stdout')
+    args = parser.parse_args(argv)
+
+    scenarios = scenario_matrix(args.farms, args.wake_models, args.ti, args.shear)
+    fid = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.DictWriter(fid, columns)
+        writer.writeheader()
+        for row in run_batch(scenarios, args.workers, cache=args.cache, precision=args.precision):
+            writer.writerow(row)
+            fid.flush()
+    finally:
+        if args.output:
+            fid.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Persistent, content-addressed cache of AEP reports.
+
+The key is a hash of everything the simulation depends on: the layout, the site parameters (Weibull tables,
+ti and shear), the power and Ct curves, the wake model class, the wd/ws grid and additional model arguments.
+Results are stored as compressed .npz files on local disk, with least-recently-used eviction when the cache
+exceeds its size limit, and the most recently used results are also kept in memory.
+
+The memory and disk tiers are implemented by LRUCache, which also holds the probability tables, the flow map tiles
+and the time series bins.
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import tempfile
+import threading
+import xarray as xr
+from py_wake import np
+
+# Increase to invalidate existing cache entries when the stored format or the AEP calculation changes
+cache_version = 2
+
+# Arguments that only control how the simulation is executed and do not change the result
+execution_kwargs = {'n_cpu', 'wd_chunks', 'ws_chunks', 'verbose'}
+
+
+def default_cache_dir():
+    return os.environ.get('OFFSHORE_FARMS_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'offshore_farms'))
+
+
+class _Hasher():
+    def __init__(self):
+        self.h = hashlib.sha256()
+
+    def update(self, v):
+        if isinstance(v, dict):
+            for k in sorted(v):
+                self.update(k)
+                self.update(v[k])
+        elif isinstance(v, (list, tuple)):
+            self.h.update(b'(%d' % len(v))
+            for e in v:
+                self.update(e)
+            self.h.update(b')')
+        elif isinstance(v, (np.ndarray, np.generic)) or (np.ndim(v) and np.asarray(v).dtype != object):
+            v = np.ascontiguousarray(v)
+            self.h.update(('%s%s' % (v.dtype.str, v.shape)).encode())
+            self.h.update(v.tobytes())
+        elif isinstance(v, xr.DataArray):
+            self.update([v.dims, v.values, {k: c.values for k, c in v.coords.items()}])
+        elif v is None or isinstance(v, (bool, int, float, str)):
+            self.h.update(('%s:%r;' % (type(v).__name__, v)).encode())
+        elif isinstance(v, type):
+            self.h.update(('%s.%s;' % (v.__module__, v.__qualname__)).encode())
+        else:
+            # model objects, e.g. Shear, are hashed by class and attributes
+            self.update(type(v))
+            self.update({k: a for k, a in vars(v).items() if not k.startswith('__')})
+        return self
+
+    def hexdigest(self):
+        return self.h.hexdigest()
+
+
+def _site_parameters(site):
+    ds = site.ds
+    return {'data': {k: ds[k].values for k in ds.data_vars},
+            'coords': {k: ds[k].values for k in ds.coords},
+            'interp_method': site.interp_method,
+            'shear': site.shear}
+
+
+def _power_ct_tables(powerCtFunction):
+    if hasattr(powerCtFunction, 'windTurbineFunction_lst'):
+        return [_power_ct_tables(f) for f in powerCtFunction.windTurbineFunction_lst]
+    return {'class': type(powerCtFunction),
+            **{k: getattr(powerCtFunction, k) for k in ['ws_tab', 'power_ct_tab', 'method']
+               if hasattr(powerCtFunction, k)}}
+
+
+def _wind_turbine_parameters(windTurbines):
+    return {'names': windTurbines._names, 'diameters': windTurbines._diameters,
+            'hub_heights': windTurbines._hub_heights,
+            'power_ct': _power_ct_tables(windTurbines.powerCtFunction)}
+
+
+def cache_key(farm, wake_model, wd=None, ws=None, **kwargs):
+    """Hash of the inputs of an aep_report of <farm>"""
+    if wake_model is None:
+        from py_wake import NOJ
+        wake_model = NOJ
+    wd, ws = farm.site.get_defaults(wd, ws)
+    return _Hasher().update({
+        'version': cache_version,
+        'layout': [np.asarray(farm.x, dtype=float), np.asarray(farm.y, dtype=float),
+                   np.zeros(len(farm.x), dtype=int) + farm.type],
+        'site': _site_parameters(farm.site),
+        'wind_turbines': _wind_turbine_parameters(farm.windTurbines),
+        'wake_model': wake_model,
+        'wd': np.asarray(wd, dtype=float), 'ws': np.asarray(ws, dtype=float),
+        'kwargs': {k: v for k, v in kwargs.items() if k not in execution_kwargs}}).hexdigest()
+
+
+class LRUCache():
+    """Two tier cache: the least recently used values are evicted from memory when there are more than max_items,
+    and, if a directory is specified, the values are also stored in and loaded from files in it
+
+    The file format is defined by suffix, _load and _save, default numpy arrays in .npy files. Files are written
+    atomically, so the directory can be shared by processes. With max_bytes, the least recently used files (by
+    modification time, which is updated when a file is read) are deleted when the directory exceeds max_bytes
+    """
+    suffix = '.npy'
+
+    def __init__(self, max_items=128, directory=None, max_bytes=None):
+        """
+        Parameters
+        ----------
+        max_items : int, optional
+            Number of values kept in memory
+        directory : str, optional
+            If specified, the values are also stored in and loaded from this directory
+        max_bytes : int, optional
+            Max size of the files in the directory. Default is no limit
+        """
+        self.max_items = max_items
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __contains__(self, key):
+        """True if <key> is in memory"""
+        with self._lock:
+            return key in self._memory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load(self, path):
+        return np.load(path)
+
+    def _save(self, fid, value):
+        np.save(fid, value)
+
+    def get(self, key):
+        """Value of <key> from memory or disk or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            value = self._load(path)
+            os.utime(path)  # mark as recently used
+        except (OSError, KeyError, ValueError):
+            return None
+        self.remember(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store <value> in memory and, if the cache has a directory, on disk"""
+        self.remember(key, value)
+        if not self.directory:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fid:
+            self._save(fid, value)
+        os.replace(tmp, self._path(key))
+        if self.max_bytes is not None:
+            self.evict(keep=self._path(key))
+
+    def remember(self, key, value):
+        """Store <value> in memory only"""
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def evict(self, keep=None):
+        """Delete the least recently used files, except <keep>, until the directory is below max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    st = entry.stat()
+                except OSError:  # deleted by another process
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        size = sum(e[1] for e in entries)
+        for _, s, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= s
+
+    def clear(self, files=False):
+        """Remove the values from memory and, if <files>, delete the files"""
+        with self._lock:
+            self._memory.clear()
+        if files and self.directory:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(self.suffix):
+                    os.remove(entry.path)
+
+
+class AEPCache(LRUCache):
+    """Two tier (memory and disk) cache of aep_report results"""
+    suffix = '.npz'
+
+    def __init__(self, directory=None, max_bytes=2**30, max_memory_items=64):
+        """
+        Parameters
+        ----------
+        directory : str, optional
+            Cache directory. Default is $OFFSHORE_FARMS_CACHE_DIR or ~/.cache/offshore_farms
+        max_bytes : int, optional
+            Max size of the disk cache. The least recently used results are deleted when exceeded
+        max_memory_items : int, optional
+            Number of results kept in memory
+        """
+        LRUCache.__init__(self, max_memory_items, directory or default_cache_dir(), max_bytes)
+
+    def get(self, key):
+        """Cached aep_report Dataset of <key> or None"""
+        report = LRUCache.get(self, key)
+        return None if report is None else report.copy(deep=True)
+
+    def put(self, key, report):
+        """Store an aep_report Dataset"""
+        LRUCache.put(self, key, report.copy(deep=True))
+
+    def clear(self):
+        """Delete all cached results"""
+        LRUCache.clear(self, files=True)
+
+    def _load(self, path):
+        with np.load(path) as npz:
+            return self._from_arrays(npz)
+
+    def _save(self, fid, report):
+        np.savez_compressed(fid, **self._to_arrays(report))
+
+    @staticmethod
+    def _to_arrays(report):
+        arrays = {'AEP': report.AEP.values, 'AEP_gross': report.AEP_gross.values, 'wd': report.wd.values,
+                  'x': report.x.values, 'y': report.y.values, 'type': report.type.values,
+                  'farm': np.array(report.farm), 'label': np.array(report.label)}
+        if 'subfarm' in report.coords:
+            arrays['subfarm'] = report.subfarm.values
+        return arrays
+
+    @staticmethod
+    def _from_arrays(npz):
+        from offshore_farms.report import report_dataset
+        return report_dataset(str(npz['farm']), str(npz['label']), npz['x'], npz['y'], npz['type'], npz['wd'],
+                              npz['AEP'], npz['AEP_gross'], npz['subfarm'] if 'subfarm' in npz else None)
+
+
+_default_cache = None
+
+
+def default_cache():
+    """AEPCache in the default cache directory, shared within the process"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AEPCache()
+    return _default_cache
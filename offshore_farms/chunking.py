@@ -0,0 +1,131 @@
+"""
+Wind direction chunked execution of the wind farm simulations.
+
+The wind directions are split into chunks that are simulated one by one or in parallel worker processes/threads.
+The number of chunks is chosen such that the estimated memory of the chunks that run at the same time fits
+a memory budget. Each chunk is reduced to AEP per wind turbine and wind direction as soon as it is done, so the
+full (wt, wd, ws) result is never held in memory.
+
+Variants of a simulation that only differ in per flow case inputs (e.g. turbulence intensity, outages or power
+curves) are batched along the wind speed axis instead, see batched_power_P.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from py_wake import np
+from offshore_farms import profiling
+from offshore_farms.precision import check_precision, itemsize, simulate
+
+# Estimated peak memory of an engineering wind farm model per turbine pair and flow case in float64.
+# NOJ on the farms in this repository uses ~5.5 bytes. Half of it in float32
+bytes_per_pair_flow_case = 8
+
+
+def estimate_memory_GB(I, L, K, precision='float64'):
+    """Estimated peak memory [GB] of simulating I wind turbines for L wind directions and K wind speeds"""
+    return bytes_per_pair_flow_case * itemsize(precision) / 8 * I * I * L * K / 1024**3
+
+
+def n_per_simulation(I, L, K, memory_GB, precision='float64'):
+    """Number of batched variants of an (I, L, K) simulation that fit <memory_GB> (at least 1)"""
+    return int(max(1, memory_GB // estimate_memory_GB(I, L, K, precision)))
+
+
+def n_wd_chunks(I, L, K, memory_GB=None, n_workers=1, precision='float64'):
+    """Number of wind direction chunks needed to keep <n_workers> simultaneous chunks within <memory_GB>
+
+    At least one chunk per worker is used and at most one chunk per wind direction.
+    """
+    n_chunks = n_workers
+    if memory_GB is not None:
+        wd_per_chunk = int(memory_GB / n_workers / estimate_memory_GB(I, 1, K, precision))
+        n_chunks = max(n_chunks, int(np.ceil(L / max(wd_per_chunk, 1))))
+    return int(min(n_chunks, L))
+
+
+def wd_chunk_slices(L, n_chunks):
+    """Slices of n_chunks (near) equal-sized wind direction chunks"""
+    i = np.linspace(0, L, n_chunks + 1).astype(int)
+    return [slice(i0, i1) for i0, i1 in zip(i[:-1], i[1:])]
+
+
+def _chunk_aep(farm, wake_model, wd, ws, P_ilk, precision, kwargs):
+    wfm = farm.wind_farm_model(wake_model)
+    power_ilk = simulate(wfm, farm.x, farm.y, precision, type=farm.type, wd=wd, ws=ws, **kwargs)[2]
+    with profiling.stage('aggregation', power_ilk.shape):
+        return (power_ilk * P_ilk).sum(2, dtype=float)
+
+
+def chunked_power_P(farm, wake_model, wd, ws, P_ilk, memory_GB=None, n_workers=1, parallel='process',
+                    precision='float64', **kwargs):
+    """Sum over wind speeds of power times probability, (wt, wd), computed in wind direction chunks
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm
+    wake_model : WindFarmModel class or None
+        Wind farm model, default is NOJ
+    wd, ws : array_like
+        Wind directions and wind speeds
+    P_ilk : array_like
+        Probability of the flow cases of the full wd/ws grid
+    memory_GB : float or None, optional
+        Memory budget of the simulations running at the same time. None: no limit
+    n_workers : int, optional
+        Number of chunks simulated in parallel
+    parallel : {'process', 'thread'}
+        Run the chunks in worker processes or threads (if n_workers > 1)
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    kwargs : dict
+        Additional arguments for the wind farm model call. Must not depend on the wind direction
+    """
+    check_precision(precision)
+    wd, ws = np.asarray(wd), np.asarray(ws)
+    slices = wd_chunk_slices(len(wd), n_wd_chunks(len(farm.x), len(wd), len(ws), memory_GB, n_workers, precision))
+    args = [(farm, wake_model, wd[s], ws, P_ilk[:, s], precision, kwargs) for s in slices]
+    if n_workers == 1:
+        res = [_chunk_aep(*a) for a in args]
+    else:
+        executor_cls = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}[parallel]
+        with executor_cls(max_workers=n_workers) as executor:
+            res = list(executor.map(_chunk_aep, *zip(*args)))
+    return np.concatenate([np.broadcast_to(r, (len(farm.x), s.stop - s.start)) for r, s in zip(res, slices)], 1)
+
+
+def batched_power_P(farm, wfm, wd, ws, P_ilk, n, batch_kwargs, memory_GB=None, precision='float64'):
+    """Sum over wind speeds of power times probability, (wt, wd, variant), of n variants of a simulation
+
+    The variants are simulated in as few simulations as <memory_GB> allows. In each simulation the wind speed axis
+    is repeated once per variant, i.e. flow case k of variant v of the batch is at index v * K + k
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm
+    wfm : WindFarmModel
+        Wind farm model
+    wd, ws : array_like
+        Wind directions and wind speeds of each variant
+    P_ilk : array_like
+        Probability of the flow cases of wd and ws
+    n : int
+        Number of variants
+    batch_kwargs : function
+        batch_kwargs(s) returns the additional arguments of the wind farm model call of the variants of slice s,
+        with the repeated wind speed axis
+    memory_GB : float or None, optional
+        Memory budget of a simulation. None: all variants in one simulation
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    """
+    I, L, K = len(farm.x), len(wd), len(ws)
+    n_per_sim = n if memory_GB is None else n_per_simulation(I, L, K, memory_GB, precision)
+    power_P_ilv = np.zeros((I, L, n))
+    for v in range(0, n, n_per_sim):
+        s = slice(v, min(v + n_per_sim, n))
+        N = s.stop - s.start
+        power_ilk = simulate(wfm, farm.x, farm.y, precision, type=farm.type, wd=wd, ws=np.tile(ws, N),
+                             **batch_kwargs(s))[2]
+        with profiling.stage('aggregation', power_ilk.shape):
+            power_P_ilv[:, :, s] = (power_ilk.reshape(I, L, N, K) * P_ilk[:, :, np.newaxis]).sum(3, dtype=float)
+    return power_P_ilv
@@ -0,0 +1,209 @@
+"""
+Clusters of wind farms with farm-to-farm wakes.
+
+The registered farms are placed in a shared coordinate frame from the latitude and longitude of the origin of
+their layout coordinates (the anchor, see register_farm) and simulated together as one farm with an array of wind
+turbine types. The anchors are projected to metres east and north of their mean with an equirectangular
+projection, which is accurate to a few metres over the ~100 km of a cluster. The anchors of the farms are the
+coordinates of the Global Wind Atlas data of their sites, not the real origins of the layouts, so farms with
+different anchors are placed approximately: their relative position can be off by up to the size of the farms
+(~10-40 km), and the external wake losses between them are indicative only. The Borssele farms share their anchor
+and layout frame and are placed exactly.
+
+The cluster is simulated with the spatial pruning of offshore_farms.pruning: for each wind direction sector, groups
+of wind turbines that cannot interact, e.g. farms that are not upstream of each other in the sector or further
+apart than max_distance, are simulated independently. The cost thereby scales with the interacting pairs rather
+than with the squared total number of wind turbines, and a cluster of farms that are far apart costs the same as
+simulating the farms alone.
+
+The flow cases are simulated once for the cluster, but the free-stream wind speed and turbulence intensity of the
+wind turbines of each farm and the probabilities of their flow cases are taken from the site of the farm. The wake
+loss of each farm is split into
+- internal wake loss: AEP without wake loss - AEP of the farm simulated alone
+- external wake loss: AEP of the farm simulated alone - AEP in the cluster
+Usage:
+
+    python -m offshore_farms.cluster borssele1and2 borssele3and4 --wd-step 5
+"""
+import argparse
+import xarray as xr
+from py_wake import np
+from offshore_farms.probability import free_stream_wind, probability
+from offshore_farms.pruning import pruned_power_P
+from offshore_farms.registry import (Farm, farm_names, get_anchor, get_farm, get_wind_turbine_classes,
+                                     get_wind_turbines)
+from offshore_farms.report import free_stream_power, hours_pr_year, report_dataset
+
+earth_radius = 6371e3
+
+
+def project(anchors, origin=None):
+    """East and north offsets [m] of the (latitude, longitude) anchors from origin (default: their mean)"""
+    lat, lon = np.deg2rad(np.asarray(anchors, dtype=float)).T
+    lat0, lon0 = (np.mean(lat), np.mean(lon)) if origin is None else np.deg2rad(origin)
+    return earth_radius * (lon - lon0) * np.cos(lat0), earth_radius * (lat - lat0)
+
+
+def cluster_farm(names, ti=.1, shear=None, method='linear', min_spacing=1):
+    """Farm of the registered farms, <names>, in a shared coordinate frame
+
+    The wind turbine types of the farms are merged and the farms are the subfarms of the cluster. The site is the
+    site of the first farm (cluster_report takes the local wind of each farm from its own site). Raises ValueError
+    if a farm has no anchor or the farms have wind turbines closer than min_spacing [m], e.g. borsselewfz and
+    borssele1and2
+    """
+    farms = [get_farm(name, ti, shear, method) for name in names]
+    anchors = [get_anchor(name) for name in names]
+    if None in anchors:
+        raise ValueError("No anchor coordinates registered for: %s" % ", ".join(
+            n for n, a in zip(names, anchors) if a is None))
+    dx, dy = project(anchors)
+    wt_classes, type_lst, subfarms = [], [], {}
+    n = 0
+    for name, farm in zip(names, farms):
+        classes = get_wind_turbine_classes(name)
+        for c in classes:
+            if c not in wt_classes:
+                wt_classes.append(c)
+        type_lst.append(np.array([wt_classes.index(classes[t]) for t in np.zeros(len(farm.x), dtype=int) +
+                                  farm.type]))
+        subfarms[name] = slice(n, n + len(farm.x))
+        n += len(farm.x)
+    x = np.concatenate([f.x + o for f, o in zip(farms, dx)])
+    y = np.concatenate([f.y + o for f, o in zip(farms, dy)])
+    farm_i = np.repeat(np.arange(len(farms)), [len(f.x) for f in farms])
+    i, j = _close_pairs(x, y, min_spacing)
+    overlapping = {(names[a], names[b]) for a, b in zip(farm_i[i], farm_i[j]) if a != b}
+    if overlapping:
+        raise ValueError("Farms with overlapping wind turbines: %s" % ", ".join(
+            "%s and %s" % pair for pair in sorted(overlapping)))
+    return Farm('+'.join(names), ' + '.join(f.label for f in farms), farms[0].site,
+                get_wind_turbines(tuple(wt_classes), method), x, y, np.concatenate(type_lst), subfarms)
+
+
+def _close_pairs(x, y, distance):
+    from scipy.spatial import cKDTree
+    pairs = cKDTree(np.array([x, y]).T).query_pairs(distance, output_type='ndarray')
+    return pairs[:, 0], pairs[:, 1]
+
+
+def cluster_report(names, wake_model=None, wd=None, ws=None, ti=.1, shear=None, max_distance=50000, n_sectors=12,
+                   k=None, precision='float64', info=None):
+    """AEP with internal and external wake loss of a cluster of wind farms
+
+    Parameters
+    ----------
+    names : list of str
+        Names of the registered farms, see farm_names()
+    wake_model : WindFarmModel class, optional
+        Wind farm model without blockage, default is NOJ
+    wd, ws : array_like, optional
+        Wind directions and wind speeds. Default is the default grid of the site of the first farm
+    ti : float, optional
+        Turbulence intensity of the sites
+    shear : float or None, optional
+        Exponent of a power law shear of the sites
+    max_distance : float, optional
+        Wakes beyond this distance [m] are neglected, see offshore_farms.pruning
+    n_sectors : int, optional
+        Number of wind direction sectors of the spatial partitioning
+    k : float or None, optional
+        Wake expansion coefficient of the wake cone of the spatial partitioning. Default: see pruning.wake_cone_k
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    info : dict, optional
+        If specified, the partitioning statistics of the cluster simulation (see pruned_power_P) and the number of
+        flow cases, 'flow_cases', are added to it
+
+    Returns
+    -------
+    xarray Dataset with the variables of aep_report (the subfarm coordinate is the farm of each wind turbine) and
+        AEP_alone : (wt, wd) AEP of the farm of the wind turbine simulated alone [GWh]
+        aep_alone : total AEP of the farms simulated alone [GWh]
+        internal_wake_loss, external_wake_loss : total internal and external wake loss [GWh]
+    See farm_wake_losses for the wake losses of each farm
+    """
+    farm = cluster_farm(names, ti, shear)
+    wd, ws = farm.site.get_defaults(wd, ws)
+    L, K = len(wd), len(ws)
+    options = dict(max_distance=max_distance, n_sectors=n_sectors, k=k, precision=precision)
+    P_ilk, WS_ilk, TI_ilk, power_gross_ilk, power_P_alone_il = [], [], [], [], []
+    for name in names:
+        member = get_farm(name, ti, shear)
+        type_i = np.zeros(len(member.x), dtype=int) + member.type
+        h_i = member.windTurbines.hub_height(type_i)
+        ilk = (len(member.x), L, K)
+        P = np.broadcast_to(probability(member.site, wd, ws, member.x, member.y, h_i), ilk)
+        lw = free_stream_wind(member.site, member.x, member.y, h_i, wd, ws)
+        power_gross_ilk.append(np.broadcast_to(free_stream_power(member.wind_farm_model(wake_model), lw,
+                                                                 {'type_i': type_i}), ilk))
+        power_P_alone_il.append(pruned_power_P(member, wake_model, wd, ws, P, **options))
+        P_ilk.append(P)
+        WS_ilk.append(np.broadcast_to(lw.WS_ilk, ilk))
+        TI_ilk.append(np.broadcast_to(lw.TI_ilk, ilk))
+    P_ilk, power_gross_ilk = np.concatenate(P_ilk), np.concatenate(power_gross_ilk)
+    # the local wind of the wind turbines of each farm from the site of the farm
+    wt_kwargs = {'WS': np.concatenate(WS_ilk), 'TI': np.concatenate(TI_ilk)}
+    power_P_il = pruned_power_P(farm, wake_model, wd, ws, P_ilk, info=info, wt_kwargs=wt_kwargs, **options)
+    if info is not None:
+        info['flow_cases'] = L * K
+
+    aep_il, aep_alone_il = power_P_il * hours_pr_year * 1e-9, np.concatenate(power_P_alone_il) * hours_pr_year * 1e-9
+    aep_gross_il = (power_gross_ilk * P_ilk).sum(2) * hours_pr_year * 1e-9
+    ds = report_dataset(farm.name, farm.label, farm.x, farm.y, farm.type, wd, aep_il, aep_gross_il,
+                        farm.subfarm_i())
+    ds['AEP_alone'] = (('wt', 'wd'), aep_alone_il,
+                       {'Description': 'Annual energy production of the farm simulated alone [GWh]'})
+    ds['aep_alone'] = ((), aep_alone_il.sum(), {'Description': 'Total annual energy production of the farms '
+                                                                'simulated alone [GWh]'})
+    ds['internal_wake_loss'] = ds.aep_gross - ds.aep_alone
+    ds['internal_wake_loss'].attrs['Description'] = 'Wake loss within the farms [GWh]'
+    ds['external_wake_loss'] = ds.aep_alone - ds.aep
+    ds['external_wake_loss'].attrs['Description'] = 'Wake loss from the other farms of the cluster [GWh]'
+    return ds
+
+
+def farm_wake_losses(report):
+    """AEP, AEP alone, AEP without wake loss and internal and external wake loss [GWh] of each farm of a
+    cluster_report"""
+    aep = report[['AEP', 'AEP_alone', 'AEP_gross']].sum('wd').groupby('subfarm').sum()
+    return xr.Dataset({'aep': aep.AEP, 'aep_alone': aep.AEP_alone, 'aep_gross': aep.AEP_gross,
+                       'internal_wake_loss': aep.AEP_gross - aep.AEP_alone,
+                       'external_wake_loss': aep.AEP_alone - aep.AEP}, attrs=report.attrs)
+
+
+def main(argv=None):
+    from offshore_farms.batch import get_wake_model
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.cluster',
+                                     description='AEP and internal/external wake loss of a cluster of wind farms')
+    parser.add_argument('farms', nargs='+', choices=farm_names())
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-step', type=float, default=None, help='Wind direction step. Default: site default')
+    parser.add_argument('--ti', type=float, default=.1)
+    parser.add_argument('--max-distance', type=float, default=50000, help='Maximum wake distance [m]')
+    parser.add_argument('--sectors', type=int, default=12, help='Number of wind direction sectors')
+    args = parser.parse_args(argv)
+
+    wd = None if args.wd_step is None else np.arange(0, 360, args.wd_step)
+    info = {}
+    report = cluster_report(args.farms, args.wake_model and get_wake_model(args.wake_model), wd, ti=args.ti,
+                            max_distance=args.max_distance, n_sectors=args.sectors, info=info)
+    losses = farm_wake_losses(report)
+    print('%-20s %12s %12s %12s %14s %14s' % ('farm', 'AEP [GWh]', 'alone [GWh]', 'gross [GWh]',
+                                              'internal [GWh]', 'external [GWh]'))
+    for name in args.farms:
+        s = losses.sel(subfarm=name)
+        print('%-20s %12.2f %12.2f %12.2f %14.2f %14.2f' % (name, s.aep, s.aep_alone, s.aep_gross,
+                                                            s.internal_wake_loss, s.external_wake_loss))
+    if len({get_anchor(name) for name in args.farms}) > 1:
+        print('Note: the farms are placed from the Global Wind Atlas coordinates of their sites, not from the real '
+              'origins of their layouts, so their relative positions, and thereby the external wake losses, are '
+              'approximate')
+    I = len(report.wt)
+    print('%d wind turbines, %d candidate pairs within %.0f m, %d simulations, cost %.1f%% of the full simulation'
+          % (I, info['pairs'], args.max_distance, info['simulations'],
+             info['pair_flow_cases'] / (I * I * info['flow_cases']) * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Chunked streaming export of the per turbine, wind direction and wind speed simulation results.
+
+The wind directions are simulated in chunks (see offshore_farms.chunking) and each chunk is written to its own
+compressed NetCDF4 file as soon as it is done, so the full (wt, wd, ws) result is never held in memory. The
+directory contains
+
+    manifest.json        format version, farm, wake model, grid, variables, and for each chunk its file, wind
+                         direction range and AEP. Rewritten after each chunk; 'complete' is true when all are done
+    chunk_0000.nc, ...   Power, WS_eff, TI_eff, CT, P and AEP, (wt, wd, ws), of the wind directions of the chunk
+
+The files are written to a temporary name and renamed when complete, so a reader never sees a partial file.
+The values are stored as float32 by default (zlib compressed and byte shuffled, one NetCDF chunk per wind
+direction). The AEP totals of the manifest are computed in float64 before the values are stored.
+
+    python -m offshore_farms.export borsselewfz borsselewfz_results --wd-step 1 --ws-step 0.5 --memory-GB 1
+
+ExportReader opens the export lazily: only the chunk files that overlap a selection are opened and only the
+selected part is read,
+
+    results = ExportReader('borsselewfz_results')
+    results.sel(['Power'], wd=slice(250, 290), wt=[0, 1, 2])   # xarray Dataset
+
+and each chunk file is a regular NetCDF file, e.g. for xr.open_mfdataset(results.files) if dask is installed.
+Zarr and Parquet are not used, as they are not dependencies of this repository.
+"""
+import argparse
+import json
+import os
+import time
+import xarray as xr
+from py_wake import np
+from offshore_farms import profiling
+from offshore_farms.cache import execution_kwargs
+from offshore_farms.chunking import n_wd_chunks, wd_chunk_slices
+from offshore_farms.precision import check_precision, simulate
+from offshore_farms.probability import probability
+from offshore_farms.report import hours_pr_year
+
+export_version = 1
+
+variables = {'Power': 'Power [W]',
+             'WS_eff': 'Effective wind speed [m/s]',
+             'TI_eff': 'Effective turbulence intensity [-]',
+             'CT': 'Thrust coefficient [-]',
+             'P': 'Probability of the flow case [-]',
+             'AEP': 'Annual energy production [GWh]'}
+
+
+def _write_json(path, obj):
+    with open(path + '.tmp', 'w') as fid:
+        json.dump(obj, fid, indent=1)
+        fid.write('\n')
+    os.replace(path + '.tmp', path)
+
+
+def _remove_export(directory):
+    """Delete the manifest and the chunk files listed in it (and the temporary file of an interrupted chunk) of the
+    export in <directory>. Other files are kept"""
+    manifest_path = os.path.join(directory, 'manifest.json')
+    with open(manifest_path) as fid:
+        chunks = json.load(fid).get('chunks', [])
+    files = [os.path.basename(c['file']) for c in chunks] + ['chunk_%04d.nc.tmp' % len(chunks), 'manifest.json.tmp']
+    for f in files:
+        path = os.path.join(directory, f)
+        if os.path.isfile(path):
+            os.remove(path)
+    os.remove(manifest_path)
+
+
+def export(farm, directory, wake_model=None, wd=None, ws=None, memory_GB=1, n_chunks=None, dtype='float32',
+           complevel=4, precision='float64', overwrite=False, **kwargs):
+    """Simulate the farm in wind direction chunks and write each chunk to <directory> as it finishes
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm, see offshore_farms.get_farm
+    directory : str
+        Output directory
+    wake_model : WindFarmModel class, optional
+        Wind farm model, default is NOJ
+    wd, ws : array_like, optional
+        Wind directions and wind speeds. Default is the default grid of the site
+    memory_GB : float, optional
+        Memory budget of a chunk simulation, see offshore_farms.chunking.n_wd_chunks
+    n_chunks : int, optional
+        Number of chunks. Overrides memory_GB
+    dtype : {'float32', 'float64'}
+        Data type of the stored values
+    complevel : int, optional
+        zlib compression level, 0-9
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    overwrite : bool, optional
+        If False, an existing export in <directory> raises FileExistsError. If True, the files of the existing
+        export (the manifest and its chunk files) are deleted; other files in <directory> are kept
+    kwargs : dict
+        Additional arguments for the wind farm model call
+
+    Returns
+    -------
+    manifest : dict
+    """
+    check_precision(precision)
+    if execution_kwargs & set(kwargs) - {'verbose'}:
+        raise ValueError("n_cpu, wd_chunks and ws_chunks cannot be combined with the chunked export")
+    manifest_path = os.path.join(directory, 'manifest.json')
+    if os.path.exists(manifest_path):
+        if not overwrite:
+            raise FileExistsError("%s already contains an export" % directory)
+        _remove_export(directory)
+    os.makedirs(directory, exist_ok=True)
+
+    wd, ws = farm.site.get_defaults(wd, ws)
+    wd, ws = np.asarray(wd, dtype=float), np.asarray(ws, dtype=float)
+    I, L, K = len(farm.x), len(wd), len(ws)
+    type_i = np.zeros(I, dtype=int) + farm.type
+    P_ilk = np.broadcast_to(probability(farm.site, wd, ws, farm.x, farm.y, farm.windTurbines.hub_height(type_i)),
+                            (I, L, K))
+    n_chunks = n_chunks or n_wd_chunks(I, L, K, memory_GB, precision=precision)
+    wfm = farm.wind_farm_model(wake_model)
+    encoding = {'dtype': dtype, 'zlib': complevel > 0, 'complevel': complevel, 'shuffle': True,
+                'chunksizes': (I, 1, K)}
+    manifest = {'version': export_version, 'farm': farm.name, 'label': farm.label,
+                'wake_model': type(wfm).__name__, 'precision': precision, 'dtype': dtype, 'complevel': complevel,
+                'dims': {'wt': I, 'wd': L, 'ws': K}, 'wd': wd.tolist(), 'ws': ws.tolist(),
+                'x': np.asarray(farm.x, dtype=float).tolist(), 'y': np.asarray(farm.y, dtype=float).tolist(),
+                'type': type_i.tolist(), 'variables': variables, 'chunks': [], 'aep': 0., 'complete': False}
+    _write_json(manifest_path, manifest)
+    t = time.perf_counter()
+    for c, s in enumerate(wd_chunk_slices(L, n_chunks)):
+        WS_eff_ilk, TI_eff_ilk, power_ilk, ct_ilk, _, _ = simulate(wfm, farm.x, farm.y, precision, type=farm.type,
+                                                                   wd=wd[s], ws=ws, **kwargs)
+        P_chunk_ilk = P_ilk[:, s]
+        with profiling.stage('aggregation', power_ilk.shape):
+            aep_ilk = power_ilk * P_chunk_ilk * hours_pr_year * 1e-9
+        shape = (I, s.stop - s.start, K)
+        ds = xr.Dataset(
+            data_vars={k: (('wt', 'wd', 'ws'), np.broadcast_to(v, shape), {'Description': variables[k]})
+                       for k, v in [('Power', power_ilk), ('WS_eff', WS_eff_ilk), ('TI_eff', TI_eff_ilk),
+                                    ('CT', ct_ilk), ('P', P_chunk_ilk), ('AEP', aep_ilk)]},
+            coords={'wt': np.arange(I), 'wd': wd[s], 'ws': ws, 'x': ('wt', farm.x), 'y': ('wt', farm.y),
+                    'type': ('wt', type_i)},
+            attrs={'farm': farm.name, 'chunk': c})
+        filename = 'chunk_%04d.nc' % c
+        path = os.path.join(directory, filename)
+        ds.to_netcdf(path + '.tmp', format='NETCDF4', engine='netcdf4',
+                     encoding={k: encoding for k in variables})
+        os.replace(path + '.tmp', path)
+        aep = float(aep_ilk.sum(dtype=float))
+        manifest['chunks'].append({'file': filename, 'wd_start': int(s.start), 'wd_stop': int(s.stop), 'aep': aep,
+                                   'bytes': os.path.getsize(path)})
+        manifest['aep'] += aep
+        _write_json(manifest_path, manifest)
+        del ds, WS_eff_ilk, TI_eff_ilk, power_ilk, ct_ilk, aep_ilk
+    manifest.update(complete=True, time=time.perf_counter() - t)
+    _write_json(manifest_path, manifest)
+    return manifest
+
+
+class ExportReader():
+    """Lazy reader of an export directory. Only the chunk files that overlap a selection are opened"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as fid:
+            self.manifest = json.load(fid)
+        if self.manifest['version'] != export_version:
+            raise ValueError("Export in %s has version %s, expected %s" % (directory, self.manifest['version'],
+                                                                           export_version))
+        self.wd = np.array(self.manifest['wd'])
+        self.ws = np.array(self.manifest['ws'])
+
+    def __repr__(self):
+        m = self.manifest
+        return "ExportReader(%r, %s, %d chunks%s)" % (self.directory, m['dims'], len(m['chunks']),
+                                                     '' if m['complete'] else ', incomplete')
+
+    @property
+    def complete(self):
+        return self.manifest['complete']
+
+    @property
+    def files(self):
+        """Paths of the chunk files"""
+        return [os.path.join(self.directory, c['file']) for c in self.manifest['chunks']]
+
+    def open_chunk(self, c):
+        """Lazily opened xarray Dataset of chunk <c>. Close it after use"""
+        return xr.open_dataset(self.files[c], engine='netcdf4')
+
+    def _wd_mask(self, wd):
+        if wd is None:
+            return np.ones(len(self.wd), dtype=bool)
+        if isinstance(wd, slice):
+            start = -np.inf if wd.start is None else wd.start
+            stop = np.inf if wd.stop is None else wd.stop
+            return (self.wd >= start) & (self.wd <= stop)
+        mask = np.isin(self.wd, np.atleast_1d(wd))
+        if mask.sum() < len(np.unique(np.atleast_1d(wd))):
+            raise KeyError("Wind direction(s) not in the export: %s" % np.setdiff1d(wd, self.wd))
+        return mask
+
+    def sel(self, variables=None, wd=None, **indexers):
+        """Dataset of <variables> (default all) for the wind direction selection, <wd> (value, list or slice),
+        and the wt/ws indexers (see xarray.Dataset.sel). Only the overlapping chunks are read"""
+        mask = self._wd_mask(wd)
+        parts = []
+        for c, chunk in enumerate(self.manifest['chunks']):
+            index = np.where(mask[chunk['wd_start']:chunk['wd_stop']])[0]
+            if len(index) == 0:
+                continue
+            with self.open_chunk(c) as ds:
+                ds = ds if variables is None else ds[list(variables)]
+                parts.append(ds.isel(wd=index).sel(**indexers).load())
+        if not parts:
+            raise KeyError("No exported wind directions match the selection")
+        res = xr.concat(parts, 'wd') if len(parts) > 1 else parts[0]
+        res.attrs = {'farm': self.manifest['farm'], 'wake_model': self.manifest['wake_model']}
+        return res
+
+    def reduce(self, variable, func, dims):
+        """Apply func(DataArray, dims) to <variable> chunk by chunk and sum the results, e.g. the AEP per wind
+        turbine with reduce('AEP', xr.DataArray.sum, ('wd', 'ws')). func must be additive over wind directions"""
+        res = None
+        for c in range(len(self.manifest['chunks'])):
+            with self.open_chunk(c) as ds:
+                r = func(ds[variable].astype(float), dims).load()
+            res = r if res is None else res + r
+        return res
+
+
+def main(argv=None):
+    from offshore_farms.batch import get_wake_model
+    from offshore_farms.registry import farm_names, get_farm
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.export',
+                                     description='Stream the per turbine, wd and ws results of a farm to disk')
+    parser.add_argument('farm', choices=farm_names())
+    parser.add_argument('directory')
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-step', type=float, default=None, help='Wind direction step. Default: site default')
+    parser.add_argument('--ws-step', type=float, default=None, help='Wind speed step. Default: site default')
+    parser.add_argument('--memory-GB', type=float, default=1, help='Memory budget of a chunk')
+    parser.add_argument('--chunks', type=int, default=None, help='Number of chunks. Overrides --memory-GB')
+    parser.add_argument('--dtype', default='float32', choices=['float32', 'float64'], help='Stored data type')
+    parser.add_argument('--complevel', type=int, default=4, help='zlib compression level (0: none)')
+    parser.add_argument('--overwrite', action='store_true')
+    args = parser.parse_args(argv)
+
+    farm = get_farm(args.farm)
+    wd = None if args.wd_step is None else np.arange(0, 360, args.wd_step)
+    ws = None if args.ws_step is None else np.arange(3, 25 + args.ws_step / 2, args.ws_step)
+    m = export(farm, args.directory, args.wake_model and get_wake_model(args.wake_model), wd, ws, args.memory_GB,
+               args.chunks, args.dtype, args.complevel, overwrite=args.overwrite)
+    size = sum(c['bytes'] for c in m['chunks'])
+    print('%d chunks, %.1f MB written to %s in %.1f s. AEP: %.2f GWh' % (len(m['chunks']), size / 1024**2,
+                                                                       args.directory, m['time'], m['aep']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Headless export of the farm figures (layout, wind rose and power/Ct curves).
+
+The figures are rendered with the non-interactive Agg canvas on matplotlib Figure objects, not pyplot figures,
+so nothing is shown and the rendering is safe in threads. The figures are written to PNG/SVG files by a thread pool,
+so they render concurrently with each other and with simulations running in the main thread. Each worker thread
+reuses one figure per template (clearing it between farms) instead of creating new figures. Usage:
+
+    python -m offshore_farms.figures --farms hornsea2 borsselewfz --output figures --formats png svg
+
+or from Python:
+
+    with FigureExporter('figures', formats=('png', 'svg')) as exporter:
+        futures = exporter.submit('hornsea2')
+        ... # run simulations
+    # all figures are written when the with block exits
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+from offshore_farms import plotting
+from offshore_farms.registry import Farm, farm_names, get_farm, get_wind_turbine_classes, get_wind_turbines
+
+
+def _plot_layout(fig, farm):
+    plotting.plot_layout(farm.windTurbines, farm.x, farm.y, farm.type, ax=fig.add_subplot())
+    fig.axes[0].set_title('%s layout' % farm.label)
+
+
+def _plot_wind_rose(fig, farm):
+    plotting.plot_wind_rose(farm.site, ax=fig.add_subplot())
+    fig.axes[-1].set_title('%s wind rose' % farm.label)
+
+
+def _plot_power_ct(fig, farm):
+    wt_classes = get_wind_turbine_classes(farm.name)
+    width, height = templates['power_ct'][0]
+    fig.set_size_inches(width * len(wt_classes), height)  # one power/Ct plot per wind turbine type
+    for ax, wt_cls in zip(fig.subplots(1, len(wt_classes), squeeze=False)[0], wt_classes):
+        plotting.plot_power_ct(get_wind_turbines((wt_cls,)), title=wt_cls.__name__, ax=ax)
+
+
+# name: (figure size [inch], margins, plot function(figure, farm)). The fixed margins avoid the extra draw of
+# tight_layout
+templates = {'layout': ((8, 6), dict(left=.12, right=.95, bottom=.1, top=.93), _plot_layout),
+             'wind_rose': ((6, 6), dict(left=.08, right=.92, bottom=.06, top=.9), _plot_wind_rose),
+             'power_ct': ((8, 4.5), dict(left=.1, right=.9, bottom=.12, top=.9, wspace=.45), _plot_power_ct)}
+
+_local = threading.local()
+
+
+def _template_figure(name):
+    # figure of the template, <name>, reused by the current thread
+    figures = _local.__dict__.setdefault('figures', {})
+    if name not in figures:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = Figure(figsize=templates[name][0])
+        FigureCanvasAgg(fig)
+        figures[name] = fig
+    fig = figures[name]
+    fig.clf()
+    return fig
+
+
+def render(farm, kind, directory, formats=('png',), dpi=100):
+    """Render the figure, <kind>, of <farm> (Farm or name) and save it in <formats>. Returns the file names"""
+    if not isinstance(farm, Farm):
+        farm = get_farm(farm)
+    fig = _template_figure(kind)
+    size, margins, plot = templates[kind]
+    fig.set_size_inches(size)
+    fig.subplots_adjust(**margins)
+    plot(fig, farm)
+    filenames = []
+    for fmt in formats:
+        filename = os.path.join(directory, '%s_%s.%s' % (farm.name, kind, fmt))
+        fig.savefig(filename, dpi=dpi)
+        filenames.append(filename)
+    return filenames
+
+
+class FigureExporter():
+    """Render and save farm figures in a background thread pool"""
+
+    def __init__(self, directory, formats=('png',), workers=4, dpi=100):
+        """
+        Parameters
+        ----------
+        directory : str
+            Output directory, created if it does not exist
+        formats : sequence of str
+            File formats, e.g. ('png', 'svg')
+        workers : int, optional
+            Number of rendering threads
+        dpi : int, optional
+            Resolution of raster formats
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.formats = tuple(formats)
+        self.dpi = dpi
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='figures')
+
+    def submit(self, farm, kinds=tuple(templates)):
+        """Submit the figures, <kinds>, of <farm> (Farm or name). Returns a future per figure (result: file names)"""
+        unknown = set(kinds) - set(templates)
+        if unknown:
+            raise ValueError("Unknown figure(s): %s. Known figures are: %s" % (", ".join(sorted(unknown)),
+                                                                             ", ".join(templates)))
+        return [self.executor.submit(render, farm, kind, self.directory, self.formats, self.dpi) for kind in kinds]
+
+    def close(self):
+        """Wait for the submitted figures and stop the threads"""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def export_figures(farms, directory, kinds=tuple(templates), formats=('png',), workers=4, dpi=100):
+    """Render the figures of all <farms> concurrently and return the file names"""
+    with FigureExporter(directory, formats, workers, dpi) as exporter:
+        futures = [f for farm in farms for f in exporter.submit(farm, kinds)]
+        return [filename for f in futures for filename in f.result()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.figures',
+                                     description='Render the layout, wind rose and power/Ct figures of the farms')
+    parser.add_argument('--farms', nargs='+', default=farm_names(), choices=farm_names())
+    parser.add_argument('--figures', nargs='+', default=list(templates), choices=list(templates))
+    parser.add_argument('--formats', nargs='+', default=['png'])
+    parser.add_argument('--output', default='figures', help='Output directory')
+    parser.add_argument('--workers', type=int, default=4, help='Number of rendering threads')
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+    for filename in export_figures(args.farms, args.output, args.figures, args.formats, args.workers, args.dpi):
+        print(filename)
+
+
+if __name__ == '__main__':
+    main()
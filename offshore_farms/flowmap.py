@@ -0,0 +1,293 @@
+"""
+Tiled, multi-resolution flow maps.
+
+The plane at hub height is divided into square tiles of tile_size x tile_size points on a fixed quadtree: at level
+0 the points are <resolution> metres apart, and each level halves the spacing, so a tile of level n covers four
+tiles of level n + 1. The tile grid is anchored at the origin of the layout coordinates, so the tiles of a farm are
+the same for all requests. A flow map of a region (bbox) only computes the tiles that overlap it, and the coarse
+levels cover a farm with a few tiles, so an overview is available long before a fine map of the whole domain:
+
+    tiles = FlowMapTiles(get_farm('hornsea2'), n_workers=4, cache=TileCache(directory='flowmap_tiles'))
+    for level, fm in tiles.levels(270, 10, bbox=(0, 0, 20000, 20000), level=5):
+        ...  # show fm (xarray DataArray, (y, x)), from 800 m to 25 m resolution
+
+The flow case is simulated once per (wd, ws) and the tiles are computed from the simulation result with
+py_wake's flow_map, so the memory is bounded by one tile per worker rather than by the size of the map. Missing
+tiles are computed in parallel worker processes (or threads) and the tiles are cached in memory (least recently
+used eviction) and optionally in a directory, keyed by the farm (layout, site, wind turbines, wake model), the
+variable, wd, ws, level and tile index. Usage:
+
+    python -m offshore_farms.flowmap hornsea2 --wd 270 --ws 10 --bbox 0 0 20000 20000 --level 5 --workers 4 \\
+        --cache-dir flowmap_tiles --output hornsea2_270.png
+"""
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+import numpy
+import xarray as xr
+from py_wake import np
+from py_wake.flow_map import HorizontalGrid
+from offshore_farms.cache import LRUCache, _Hasher, cache_key
+
+# Increase to invalidate existing tiles on disk when the calculation changes
+tile_version = 1
+
+variables = ('WS_eff', 'TI_eff')
+
+
+class TileCache(LRUCache):
+    """Memory (and optionally disk) cache of flow map tiles"""
+
+    def __init__(self, max_items=4096, directory=None):
+        """
+        Parameters
+        ----------
+        max_items : int, optional
+            Number of tiles kept in memory. The least recently used tiles are evicted when exceeded
+        directory : str, optional
+            If specified, the tiles are also stored in and loaded from this directory
+        """
+        LRUCache.__init__(self, max_items, directory)
+
+    def put(self, key, tile):
+        tile.flags.writeable = False
+        LRUCache.put(self, key, tile)
+
+
+def _simulate(farm, wake_model, wd, ws):
+    return farm.wind_farm_model(wake_model)(farm.x, farm.y, type=farm.type, wd=[wd], ws=[ws])
+
+
+def _flow_map_tile(sim_res, x, y, h, variable):
+    fm = sim_res.flow_map(HorizontalGrid(x=x, y=y, h=h))
+    return numpy.asarray(fm[variable].values, dtype=numpy.float32).reshape(len(y), len(x))
+
+
+def _compute_tiles(farm, wake_model, wd, ws, h, variable, coordinates):
+    """Tiles of the (x, y) coordinates for one flow case, simulated in this (worker) process"""
+    sim_res = _simulate(farm, wake_model, wd, ws)
+    return [_flow_map_tile(sim_res, x, y, h, variable) for x, y in coordinates]
+
+
+class FlowMapTiles():
+    """Flow maps of a farm composed of cached, multi-resolution tiles"""
+
+    def __init__(self, farm, wake_model=None, tile_size=64, resolution=800, max_level=6, h=None,
+                 variable='WS_eff', cache=None, n_workers=1, parallel='process'):
+        """
+        Parameters
+        ----------
+        farm : Farm
+            Wind farm, see offshore_farms.get_farm
+        wake_model : WindFarmModel class, optional
+            Wind farm model, default is NOJ
+        tile_size : int, optional
+            Number of points along each side of a tile
+        resolution : float, optional
+            Distance [m] between the points at level 0. Halved at each level
+        max_level : int, optional
+            Finest level
+        h : float, optional
+            Height of the flow map. Default is the mean hub height of the wind turbines
+        variable : {'WS_eff', 'TI_eff'}
+            Variable of the flow map
+        cache : TileCache, optional
+            Tile cache. Default is a memory cache of this object
+        n_workers : int, optional
+            Number of workers computing missing tiles
+        parallel : {'process', 'thread'}
+            Compute the tiles in worker processes or threads (if n_workers > 1)
+        """
+        if variable not in variables:
+            raise ValueError("Unknown variable, '%s'. Must be one of %s" % (variable, ", ".join(variables)))
+        self.farm = farm
+        self.wake_model = wake_model
+        self.tile_size = tile_size
+        self.base_resolution = resolution
+        self.max_level = max_level
+        type_i = np.zeros(len(farm.x), dtype=int) + farm.type
+        self.h = float(np.mean(farm.windTurbines.hub_height(type_i)) if h is None else h)
+        self.variable = variable
+        self.cache = cache or TileCache()
+        self.n_workers = n_workers
+        self.parallel = parallel
+        self.n_computed = 0
+        self._key = _Hasher().update({'version': tile_version, 'farm': cache_key(farm, wake_model, [0], [0]),
+                                      'tile_size': tile_size, 'resolution': float(resolution), 'h': self.h,
+                                      'variable': variable}).hexdigest()
+        self._simulations = OrderedDict()
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def resolution(self, level):
+        """Distance [m] between the points of a tile at <level>"""
+        return self.base_resolution / 2**level
+
+    def tile_extent(self, level):
+        """Side length [m] of a tile at <level>"""
+        return self.tile_size * self.resolution(level)
+
+    def tile_coordinates(self, level, tx, ty):
+        """x and y coordinates of the points of tile (tx, ty) at <level>"""
+        res = self.resolution(level)
+        j = np.arange(self.tile_size) + .5
+        return (tx * self.tile_size + j) * res, (ty * self.tile_size + j) * res
+
+    def tile_indices(self, bbox, level):
+        """(tx, ty) of the tiles at <level> that overlap bbox, (x_min, y_min, x_max, y_max)"""
+        e = self.tile_extent(level)
+        x0, y0, x1, y1 = bbox
+        return [(tx, ty) for ty in range(int(np.floor(y0 / e)), int(np.ceil(y1 / e)))
+                for tx in range(int(np.floor(x0 / e)), int(np.ceil(x1 / e)))]
+
+    def default_bbox(self, margin=2000):
+        """Extent of the wind turbines plus <margin> [m]"""
+        return (np.min(self.farm.x) - margin, np.min(self.farm.y) - margin,
+                np.max(self.farm.x) + margin, np.max(self.farm.y) + margin)
+
+    def level_for(self, bbox, max_points=2**20):
+        """Finest level (up to max_level) where the flow map of bbox has at most max_points points"""
+        area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
+        level = int(np.floor(np.log2(np.sqrt(max_points * self.base_resolution**2 / area))))
+        return int(np.clip(level, 0, self.max_level))
+
+    def _tile_key(self, wd, ws, level, tx, ty):
+        return '%s_%g_%g_%d_%d_%d' % (self._key, wd, ws, level, tx, ty)
+
+    def _simulation(self, wd, ws):
+        key = (wd, ws)
+        if key not in self._simulations:
+            self._simulations[key] = _simulate(self.farm, self.wake_model, wd, ws)
+            while len(self._simulations) > 16:
+                self._simulations.popitem(last=False)
+        self._simulations.move_to_end(key)
+        return self._simulations[key]
+
+    def get_tiles(self, wd, ws, level, indices):
+        """Dict {(tx, ty): (tile_size, tile_size) array, (y, x)} of the tiles at <level>. Missing tiles are computed
+        by the workers"""
+        if not 0 <= level <= self.max_level:
+            raise ValueError("level must be between 0 and %d" % self.max_level)
+        wd, ws = float(wd), float(ws)
+        tiles, missing = {}, []
+        for tx, ty in indices:
+            tile = self.cache.get(self._tile_key(wd, ws, level, tx, ty))
+            if tile is None:
+                missing.append((tx, ty))
+            else:
+                tiles[(tx, ty)] = tile
+        if not missing:
+            return tiles
+        coordinates = [self.tile_coordinates(level, tx, ty) for tx, ty in missing]
+        if self.n_workers == 1 or len(missing) == 1:
+            sim_res = self._simulation(wd, ws)
+            computed = [_flow_map_tile(sim_res, x, y, self.h, self.variable) for x, y in coordinates]
+        else:
+            if self._executor is None:
+                executor_cls = {'process': ProcessPoolExecutor, 'thread': ThreadPoolExecutor}[self.parallel]
+                self._executor = executor_cls(max_workers=self.n_workers)
+            # one task per worker, each simulating the flow case once
+            n = min(self.n_workers, len(missing))
+            futures = [self._executor.submit(_compute_tiles, self.farm, self.wake_model, wd, ws, self.h,
+                                             self.variable, coordinates[w::n]) for w in range(n)]
+            computed = [None] * len(missing)
+            for w, future in enumerate(futures):
+                computed[w::n] = future.result()
+        self.n_computed += len(missing)
+        for (tx, ty), tile in zip(missing, computed):
+            self.cache.put(self._tile_key(wd, ws, level, tx, ty), tile)
+            tiles[(tx, ty)] = tile
+        return tiles
+
+    def flow_map(self, wd, ws, bbox=None, level=None, max_points=2**20):
+        """Flow map of the region, bbox (default: default_bbox()), as an xarray DataArray, (y, x)
+
+        level : int, optional
+            Resolution level. Default is the finest level with at most max_points points, see level_for
+        """
+        bbox = self.default_bbox() if bbox is None else bbox
+        level = self.level_for(bbox, max_points) if level is None else level
+        indices = self.tile_indices(bbox, level)
+        tiles = self.get_tiles(wd, ws, level, indices)
+        tx = sorted({i[0] for i in indices})
+        ty = sorted({i[1] for i in indices})
+        values = np.block([[tiles[(i, j)] for i in tx] for j in ty])
+        x = np.concatenate([self.tile_coordinates(level, i, ty[0])[0] for i in tx])
+        y = np.concatenate([self.tile_coordinates(level, tx[0], j)[1] for j in ty])
+        ix = (x >= bbox[0]) & (x <= bbox[2])
+        iy = (y >= bbox[1]) & (y <= bbox[3])
+        return xr.DataArray(values[iy][:, ix], dims=('y', 'x'), coords={'x': x[ix], 'y': y[iy]}, name=self.variable,
+                            attrs={'farm': self.farm.name, 'wd': wd, 'ws': ws, 'h': self.h, 'level': level,
+                                   'resolution': self.resolution(level)})
+
+    def levels(self, wd, ws, bbox=None, level=None, max_points=2**20):
+        """Yield (level, flow map) from level 0 to <level> (default: see flow_map), i.e. coarse overviews first"""
+        bbox = self.default_bbox() if bbox is None else bbox
+        level = self.level_for(bbox, max_points) if level is None else level
+        for lev in range(level + 1):
+            yield lev, self.flow_map(wd, ws, bbox, lev)
+
+
+def save_flow_map(fm, filename):
+    """Write a flow map to a NetCDF (.nc) or image file (e.g. .png, rendered headless with matplotlib)"""
+    if filename.endswith('.nc'):
+        fm.to_netcdf(filename)
+        return
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 8 * len(fm.y) / len(fm.x) + .5))
+    ax = fig.add_subplot()
+    c = ax.pcolormesh(fm.x, fm.y, fm.values, shading='nearest')
+    fig.colorbar(c, ax=ax, label=fm.name)
+    ax.set_aspect('equal')
+    ax.set_xlabel('x [m]')
+    ax.set_ylabel('y [m]')
+    ax.set_title('%s, wd=%g, ws=%g, %g m resolution' % (fm.farm, fm.wd, fm.ws, fm.resolution))
+    fig.savefig(filename)
+
+
+def main(argv=None):
+    from offshore_farms.batch import get_wake_model
+    from offshore_farms.registry import farm_names, get_farm
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.flowmap',
+                                     description='Tiled, multi-resolution flow map of a wind farm')
+    parser.add_argument('farm', choices=farm_names())
+    parser.add_argument('--wd', type=float, default=270)
+    parser.add_argument('--ws', type=float, default=10)
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--bbox', type=float, nargs=4, default=None, metavar=('X0', 'Y0', 'X1', 'Y1'),
+                        help='Region of the map. Default: the wind turbines + 2 km')
+    parser.add_argument('--level', type=int, default=None, help='Finest level. Default: see --max-points')
+    parser.add_argument('--max-points', type=int, default=2**20, help='Max number of points of the finest map')
+    parser.add_argument('--tile-size', type=int, default=64)
+    parser.add_argument('--resolution', type=float, default=800, help='Point distance at level 0 [m]')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--cache-dir', default=None, help='Directory of cached tiles. Default: no disk cache')
+    parser.add_argument('--output', default=None, help='Output file of the finest map (.nc or image)')
+    args = parser.parse_args(argv)
+
+    farm = get_farm(args.farm)
+    with FlowMapTiles(farm, args.wake_model and get_wake_model(args.wake_model), args.tile_size,
+                      args.resolution, max(6, args.level or 0), cache=TileCache(directory=args.cache_dir),
+                      n_workers=args.workers) as tiles:
+        t = time.perf_counter()
+        for level, fm in tiles.levels(args.wd, args.ws, args.bbox, args.level, args.max_points):
+            print('level %d: %5g m, %4d x %4d points, %4d tiles computed, %.2f s' % (
+                level, fm.resolution, len(fm.x), len(fm.y), tiles.n_computed, time.perf_counter() - t))
+    if args.output:
+        save_flow_map(fm, args.output)
+
+
+if __name__ == '__main__':
+    main()
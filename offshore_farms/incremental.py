@@ -0,0 +1,213 @@
+"""
+Incremental AEP re-evaluation after layout edits.
+
+In a wind farm model without upstream effects (PropagateDownwind, e.g. NOJ) the power of a wind turbine only
+depends on the free-stream inflow and the wakes of its upstream wind turbines. After moving, removing or changing
+the type of some wind turbines, the power therefore only changes for the edited wind turbines and, for each wind
+direction, the wind turbines downstream of their old or new position (and downstream of those).
+
+Only these wind turbines and wind directions are re-simulated, with the public wind farm model call, together with
+the wind turbines upstream of them that determine their inflow (the state of unchanged wind turbines cannot be
+passed to PyWake). Consecutive wind directions are simulated together as long as the union of their wind turbines
+stays small enough to be cheaper than separate simulations. All other wind turbines and wind directions keep the
+power of the previous evaluation. Edits are collected and evaluated together when the AEP is requested.
+
+As the inflow of an affected wind turbine depends on its whole upstream chain, the re-simulated part of a compact
+farm is a sizeable fraction of it. Moving one wind turbine of the Borssele wind farm zone (171 wind turbines, 360
+wind directions, 23 wind speeds) re-simulates about 40% of the wind turbine flow cases and takes 0.9-1.4 s compared
+to 2.1-2.6 s for a full NOJ simulation. For Borssele I & II (94 wind turbines) it is 50-75% of the flow cases and
+0.46-0.70 s compared to 0.63-0.76 s, and for the more compact Borssele III & IV there is no gain.
+
+Whether wind turbine j is in the wake of i is decided with a top-hat wake of radius D + k * dw, where D is the
+largest rotor diameter and dw is the downwind distance. By default k is the expansion coefficient of the NOJ deficit
+of the wind farm model, see offshore_farms.pruning.wake_cone_k, and the result equals a full simulation. For
+Gaussian and other deficit models without wake edge, wakes outside the cone are missed and the result is an
+approximation (increase k to include more of them).
+"""
+import numpy
+from py_wake import np
+from py_wake.wind_farm_models.engineering_models import PropagateDownwind
+from offshore_farms.pruning import wake_cone_k
+from offshore_farms.report import hours_pr_year
+
+# Cost of a PyWake call in wind turbine pairs x wind directions (~5 ms), used to group the wind directions
+call_overhead = 20000
+
+
+def in_wake(x_src, y_src, x, y, wd, diameter, k):
+    """(src, wt, wd) True if wind turbine at (x, y) is in the wake of the source at (x_src, y_src)"""
+    theta = np.deg2rad(wd)[np.newaxis, np.newaxis]
+    dx, dy = (np.asarray(x)[np.newaxis] - np.asarray(x_src)[:, np.newaxis])[:, :, np.newaxis], \
+        (np.asarray(y)[np.newaxis] - np.asarray(y_src)[:, np.newaxis])[:, :, np.newaxis]
+    dw = -dx * np.sin(theta) - dy * np.cos(theta)
+    cw = np.abs(dx * np.cos(theta) - dy * np.sin(theta))
+    return (dw > 0) & (cw < diameter + k * dw)
+
+
+def wake_levels(x, y, wd, seed_il, diameter, k):
+    """Level of the wind turbines and wind directions affected by the seeds, -1 if not affected
+
+    A wind turbine is affected in a wind direction if it is a seed or in the wake of an affected wind turbine.
+    Its level is the number of affected wind turbines in the longest wake chain upstream of it, i.e. all affected
+    wind turbines whose wakes it is in have a lower level.
+    """
+    x, y = np.asarray(x)[:, np.newaxis], np.asarray(y)[:, np.newaxis]
+    sin, cos = np.sin(np.deg2rad(wd)), np.cos(np.deg2rad(wd))
+    level_il = np.where(seed_il, 0, -1)
+    l = numpy.arange(len(wd))
+    # sweep the wind turbines in downwind order of each wind direction
+    for i_l in numpy.argsort(-x * sin - y * cos, 0, kind='stable'):
+        dx, dy = x[i_l, 0] - x, y[i_l, 0] - y
+        dw = -dx * sin - dy * cos
+        wake_il = (dw > 0) & (np.abs(dx * cos - dy * sin) < diameter + k * dw)
+        level_l = np.max(np.where(wake_il & (level_il >= 0), level_il + 1, -1), 0)
+        level_il[i_l, l] = np.maximum(level_il[i_l, l], level_l)
+    return level_il
+
+
+def upstream(x, y, wd, needed_il, diameter, k):
+    """<needed_il> extended with the wind turbines whose wakes reach a needed wind turbine, recursively"""
+    x, y = np.asarray(x)[:, np.newaxis], np.asarray(y)[:, np.newaxis]
+    sin, cos = np.sin(np.deg2rad(wd)), np.cos(np.deg2rad(wd))
+    needed_il = np.array(needed_il, dtype=bool)
+    l = numpy.arange(len(wd))
+    # sweep the wind turbines in upwind order of each wind direction
+    for i_l in numpy.argsort(x * sin + y * cos, 0, kind='stable'):
+        dx, dy = x - x[i_l, 0], y - y[i_l, 0]
+        dw = -dx * sin - dy * cos
+        wake_il = (dw > 0) & (np.abs(dx * cos - dy * sin) < diameter + k * dw)
+        needed_il[i_l, l] |= (wake_il & needed_il).any(0)
+    return needed_il
+
+
+def wd_groups(needed_il, overhead=call_overhead):
+    """Groups of consecutive wind directions with needed wind turbines, simulated together
+
+    A wind direction is added to the current group if simulating the union of their needed wind turbines costs less
+    than two simulations, where the cost is the number of wind turbine pairs x wind directions plus <overhead>
+    """
+    groups, group, union = [], [], None
+    for l in np.where(needed_il.any(0))[0]:
+        if group:
+            merged = union | needed_il[:, l]
+            if merged.sum()**2 * (len(group) + 1) <= union.sum()**2 * len(group) + needed_il[:, l].sum()**2 + overhead:
+                group.append(l)
+                union = merged
+                continue
+            groups.append(np.array(group))
+        group, union = [l], needed_il[:, l].copy()
+    if group:
+        groups.append(np.array(group))
+    return groups
+
+
+class IncrementalAEP():
+    """AEP of a wind farm layout that is edited wind turbine by wind turbine
+
+    Examples
+    --------
+    >>> farm = get_farm('borssele1and2')
+    >>> inc = IncrementalAEP(farm.wind_farm_model()(farm.x, farm.y, type=farm.type))
+    >>> inc.remove(10)
+    >>> inc.move(11, farm.x[11] + 200, farm.y[11])
+    >>> inc.aep()
+    """
+
+    def __init__(self, sim_res, k=None):
+        """
+        Parameters
+        ----------
+        sim_res : SimulationResult
+            Simulation result of the base layout of a PropagateDownwind wind farm model, e.g. NOJ
+        k : float or None, optional
+            Wake expansion coefficient used to find the wind turbines in the wake of others. Default is the
+            expansion coefficient of the NOJ deficit of the wind farm model, see offshore_farms.pruning.wake_cone_k
+        """
+        self.windFarmModel = sim_res.windFarmModel
+        if not isinstance(self.windFarmModel, PropagateDownwind):
+            raise ValueError("IncrementalAEP requires a PropagateDownwind wind farm model, not %s" %
+                             type(self.windFarmModel).__name__)
+        if 'time' in sim_res.dims:
+            raise ValueError("IncrementalAEP requires a wd/ws simulation result, not a time series")
+        self.x, self.y = sim_res.x.values.astype(float), sim_res.y.values.astype(float)
+        self.h = sim_res.h.values.astype(float)
+        self.type = sim_res.type.values.astype(int)
+        self.wd, self.ws = sim_res.wd.values, sim_res.ws.values
+        # free-stream inflow and power of all wind turbines, (wt, wd, ws)
+        shape = sim_res.Power.shape
+        self.WS_ilk, self.TI_ilk, self.P_ilk, self.power_ilk = [np.broadcast_to(sim_res[k].ilk(), shape).astype(float)
+                                                                for k in ['WS', 'TI', 'P', 'Power']]
+        self.active = np.ones(len(self.x), dtype=bool)
+        self.k = wake_cone_k(self.windFarmModel) if k is None else k
+        self.diameter = np.max(self.windTurbines.diameter(np.unique(self.type)))
+        # number of wind turbines x flow cases re-simulated by the edits
+        self.n_simulated = 0
+        # edited wind turbines and their old positions, not yet re-simulated
+        self._pending = []
+
+    @property
+    def windTurbines(self):
+        return self.windFarmModel.windTurbines
+
+    def move(self, i, x, y):
+        """Move wind turbine(s), i, to (x, y)"""
+        i = np.atleast_1d(i)
+        self._pending.append((i, self.x[i].copy(), self.y[i].copy()))
+        self.x[i], self.y[i] = x, y
+
+    def remove(self, i):
+        """Remove wind turbine(s), i"""
+        i = np.atleast_1d(i)
+        self._pending.append((i, self.x[i].copy(), self.y[i].copy()))
+        self.active[i] = False
+        self.power_ilk[i] = 0
+
+    def set_type(self, i, type):  # @ReservedAssignment
+        """Change the type of wind turbine(s), i"""
+        i = np.atleast_1d(i)
+        self._pending.append((i, self.x[i].copy(), self.y[i].copy()))
+        self.type[i] = type
+        self.diameter = max(self.diameter, np.max(self.windTurbines.diameter(np.unique(self.type))))
+
+    def _update_inflow(self, i):
+        # hub height and free-stream inflow of the edited wind turbines at their new position
+        self.h[i] = self.windTurbines.hub_height(self.type[i])
+        lw = self.windFarmModel.site.local_wind(self.x[i], self.y[i], self.h[i], wd=self.wd, ws=self.ws)
+        for v_ilk, v in [(self.WS_ilk, lw.WS_ilk), (self.TI_ilk, lw.TI_ilk), (self.P_ilk, lw.P_ilk)]:
+            v_ilk[i] = np.broadcast_to(v, (len(i),) + v_ilk.shape[1:])
+
+    def update(self):
+        """Re-simulate the wind turbines affected by the edits since the last update. Called by aep_il"""
+        if not self._pending:
+            return
+        changed, x_old, y_old = [np.concatenate(v) for v in zip(*self._pending)]
+        self._pending = []
+        self._update_inflow(np.unique(changed))
+        active = np.where(self.active)[0]
+        x, y, wd = self.x[active], self.y[active], self.wd
+        # edited wind turbines, wind turbines in the wake of the old position of the edited wind turbines and the
+        # wind turbines downstream of those
+        seed_il = np.isin(active, changed)[:, np.newaxis] | \
+            in_wake(x_old, y_old, x, y, wd, self.diameter, self.k).any(0)
+        affected_il = wake_levels(x, y, wd, seed_il, self.diameter, self.k) >= 0
+        needed_il = upstream(x, y, wd, affected_il, self.diameter, self.k)
+        for l in wd_groups(needed_il):
+            m = needed_il[:, l].any(1)
+            i = active[m]
+            il = np.ix_(i, l)
+            power_ilk = self.windFarmModel(self.x[i], self.y[i], h=self.h[i], type=self.type[i], wd=wd[l], ws=self.ws,
+                                           WS=self.WS_ilk[il], TI=self.TI_ilk[il], return_simulationResult=False)[2]
+            self.n_simulated += len(i) * len(l) * len(self.ws)
+            update_il = affected_il[m][:, l]
+            power_il_k = self.power_ilk[il]
+            power_il_k[update_il] = np.broadcast_to(power_ilk, power_il_k.shape)[update_il]
+            self.power_ilk[il] = power_il_k
+
+    def aep_il(self):
+        """AEP [GWh] per wind turbine and wind direction. Removed wind turbines have zero AEP"""
+        self.update()
+        return (self.power_ilk * self.P_ilk).sum(2) * hours_pr_year * 1e-9
+
+    def aep(self):
+        """Total AEP [GWh]"""
+        return self.aep_il().sum()
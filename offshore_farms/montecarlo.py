@@ -0,0 +1,197 @@
+"""
+Monte Carlo AEP distribution under random wind turbine outages.
+
+Each sample is an outage pattern where each wind turbine is independently out of operation with probability
+1 - availability. A wind turbine that is out of operation produces no power and has no wake (Ct = 0), so the
+outages also change the wake losses of the other wind turbines.
+
+The samples of a batch are simulated together: the wind speed axis is repeated once per sample and the operating
+state of each wind turbine is passed to the wind farm model through the 'operating' input of the wind turbines,
+so the layout geometry is computed once per batch. The batches run in a pool of worker processes and P50/P90
+statistics are streamed as the batches complete. Usage:
+
+    python -m offshore_farms.montecarlo hornsea2 --samples 10000 --availability 0.97 --wd-step 5 --workers 8
+"""
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import copy
+import os
+import sys
+from py_wake import np
+from py_wake.wind_turbines.power_ct_functions import PowerCtFunctionList, PowerCtTabular
+from offshore_farms.batch import get_wake_model
+from offshore_farms.chunking import batched_power_P
+from offshore_farms.precision import precisions
+from offshore_farms.probability import probability
+from offshore_farms.registry import Farm, farm_names, get_farm
+from offshore_farms.report import hours_pr_year
+
+# Wind farm models of this worker process, reused by all its batches
+_worker_models = {}
+
+
+def outage_wind_turbines(windTurbines):
+    """Copy of windTurbines with the additional input, operating (0: out of operation, 1: operating (default))"""
+    wts = copy.copy(windTurbines)
+    off = PowerCtTabular([0, 100], [0, 0], 'w', [0, 0])
+    wts.powerCtFunction = PowerCtFunctionList('operating', [off, windTurbines.powerCtFunction], default_value=1)
+    return wts
+
+
+def outage_samples(n_wt, n_samples, availability=.97, rng=None):
+    """(n_samples, n_wt) operating state (True: operating) of random outage patterns"""
+    rng = rng or np.random.default_rng()
+    return rng.random((n_samples, n_wt)) < availability
+
+
+def sample_aep(farm, operating_si, wake_model=None, wd=None, ws=None, memory_GB=1, precision='float64'):
+    """AEP [GWh] of each outage pattern in operating_si, (sample, wt)
+
+    The samples are simulated in as few simulations as the memory budget, memory_GB, allows. With
+    precision='float32' twice as many samples fit the budget, see offshore_farms.precision
+    """
+    wd, ws = farm.site.get_defaults(wd, ws)
+    I, L, K = len(farm.x), len(wd), len(ws)
+    type_i = np.zeros(I, dtype=int) + farm.type
+    P_ilk = probability(farm.site, wd, ws, farm.x, farm.y, farm.windTurbines.hub_height(type_i))
+    outage_farm = Farm(farm.name, farm.label, farm.site, outage_wind_turbines(farm.windTurbines), farm.x, farm.y,
+                       farm.type, farm.subfarms)
+    wfm = outage_farm.wind_farm_model(wake_model)
+
+    def batch_kwargs(s):
+        op_si = operating_si[s]
+        return {'operating': np.broadcast_to(np.repeat(op_si.T.astype(int), K, 1)[:, np.newaxis],
+                                             (I, L, len(op_si) * K))}
+    aep_s = batched_power_P(farm, wfm, wd, ws, P_ilk, len(operating_si), batch_kwargs, memory_GB, precision).sum((0, 1))
+    return aep_s * hours_pr_year * 1e-9
+
+
+def _run_batch(name, ti, wake_model, wd, ws, precision, operating_si, memory_GB):
+    key = (name, ti)
+    if key not in _worker_models:
+        _worker_models[key] = get_farm(name, ti=ti)
+    return sample_aep(_worker_models[key], operating_si, wake_model and get_wake_model(wake_model), wd, ws,
+                      memory_GB, precision)
+
+
+def aep_statistics(aep_s, z=1.96):
+    """Mean, standard deviation, P50 and P90 of the sample AEPs with <z>-sigma confidence intervals of P50 and P90
+
+    P90 is the AEP exceeded with 90% probability, i.e. the 10% quantile. The confidence intervals are the order
+    statistics around the quantile given by the normal approximation of the binomial distribution
+    """
+    aep_s = np.sort(aep_s)
+    n = len(aep_s)
+    stat = {'n': n, 'mean': aep_s.mean(), 'std': aep_s.std(ddof=1) if n > 1 else np.nan}
+    for name, q in [('P50', .5), ('P90', .1)]:
+        stat[name] = np.quantile(aep_s, q)
+        dq = z * np.sqrt(n * q * (1 - q))
+        stat[name + '_low'] = aep_s[int(max(0, np.floor(n * q - dq)))]
+        stat[name + '_high'] = aep_s[int(min(n - 1, np.ceil(n * q + dq)))]
+    return stat
+
+
+def monte_carlo(name, n_samples=10000, availability=.97, ti=.1, wake_model=None, wd=None, ws=None,
+                batch_size=100, workers=1, seed=None, rtol=None, memory_GB=1, precision='float64'):
+    """Run the Monte Carlo outage simulation and yield the statistics (see aep_statistics) after each batch
+
+    Parameters
+    ----------
+    name : str
+        Name of the wind farm, see farm_names()
+    n_samples : int, optional
+        Maximum number of outage patterns
+    availability : float, optional
+        Probability that a wind turbine is operating
+    ti : float, optional
+        Turbulence intensity of the site
+    wake_model : str, optional
+        Name of the wind farm model in the py_wake namespace, default is NOJ
+    wd, ws : array_like, optional
+        Wind directions and wind speeds. Default is the default grid of the site
+    batch_size : int, optional
+        Number of samples per batch
+    workers : int or None, optional
+        Number of worker processes. None: number of CPUs. 1: run in this process
+    seed : int, optional
+        Seed of the outage patterns. The patterns do not depend on the number of workers
+    rtol : float, optional
+        If specified, stop when the confidence interval of P90 is narrower than rtol * P90
+    memory_GB : float, optional
+        Memory budget of each worker
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    """
+    rng = np.random.default_rng(seed)
+    n_wt = len(get_farm(name).x)
+    batches = (outage_samples(n_wt, min(batch_size, n_samples - s), availability, rng)
+               for s in range(0, n_samples, batch_size))
+    args = (name, ti, wake_model, wd, ws, precision)
+    aep_s = np.zeros(0)
+
+    def converged(stat):
+        return rtol is not None and stat['n'] > 1 and stat['P90_high'] - stat['P90_low'] < rtol * stat['P90']
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for operating_si in batches:
+            aep_s = np.r_[aep_s, _run_batch(*args, operating_si, memory_GB)]
+            stat = aep_statistics(aep_s)
+            yield stat
+            if converged(stat):
+                return
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # keep two batches per worker in flight, so the remaining batches can be skipped when converged
+        pending = set()
+        for operating_si in batches:
+            pending.add(executor.submit(_run_batch, *args, operating_si, memory_GB))
+            if len(pending) < 2 * workers:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                aep_s = np.r_[aep_s, future.result()]
+                stat = aep_statistics(aep_s)
+                yield stat
+                if converged(stat):
+                    for f in pending:
+                        f.cancel()
+                    return
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                aep_s = np.r_[aep_s, future.result()]
+                yield aep_statistics(aep_s)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.montecarlo',
+                                     description='AEP distribution under random wind turbine outages')
+    parser.add_argument('farm', choices=farm_names())
+    parser.add_argument('--samples', type=int, default=10000, help='Maximum number of outage patterns')
+    parser.add_argument('--availability', type=float, default=.97)
+    parser.add_argument('--ti', type=float, default=.1)
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-step', type=float, default=None, help='Wind direction step. Default: site default')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes. Default: all CPUs')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rtol', type=float, default=None, help='Stop when the P90 confidence interval is '
+                        'narrower than rtol * P90')
+    parser.add_argument('--precision', default='float64', choices=precisions,
+                        help='Floating point precision of the simulations')
+    args = parser.parse_args(argv)
+
+    wd = None if args.wd_step is None else np.arange(0, 360, args.wd_step)
+    print('%8s %10s %8s %10s %21s %10s %21s' % ('samples', 'mean', 'std', 'P50', 'P50 interval', 'P90',
+                                                 'P90 interval'))
+    for stat in monte_carlo(args.farm, args.samples, args.availability, args.ti, args.wake_model, wd,
+                            batch_size=args.batch_size, workers=args.workers, seed=args.seed, rtol=args.rtol,
+                            precision=args.precision):
+        print('%(n)8d %(mean)10.2f %(std)8.2f %(P50)10.2f [%(P50_low)9.2f,%(P50_high)9.2f] '
+              '%(P90)10.2f [%(P90_low)9.2f,%(P90_high)9.2f]' % stat)
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
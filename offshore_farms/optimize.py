@@ -0,0 +1,353 @@
+"""
+Multi-start layout optimization of the wind farms.
+
+The layout is optimized for AEP within the current area of the farm and with a minimum spacing between the wind
+turbines in rotor diameters. The area is the union of the convex hulls of groups of wind turbines (layout_groups):
+the subfarms of the farm, split further along a Ward clustering tree while the hull of a group has an empty area
+wider than max_gap turbine spacings, e.g. the empty triangle between the two clusters of Hornsea Project 2. Each
+wind turbine stays within the hull of its group. Each start is a projected gradient ascent: the wind turbines are moved
+along the AEP gradient, computed with autograd through the pchip power/Ct curves (get_farm(method='pchip')),
+and then projected back into the hull and pushed apart to the minimum spacing. A step is accepted if it
+increases the AEP, otherwise the step size is halved. Start 0 is the current layout (initial_position of the
+site), which must satisfy the minimum spacing, and the other starts are random perturbations of it.
+
+The starts run in rounds of a few steps in a pool of worker processes. After each round, the starts whose AEP
+cannot reach the best AEP within the remaining rounds, even if they keep improving as much as in the last round,
+are terminated. Each worker caches the AEP and gradient of the layouts it has evaluated, e.g. the current layout
+of a start that continues in the next round. Usage:
+
+    python -m offshore_farms.optimize --farms borkumriffgrund2 --starts 8 --workers 8 --output optimized_layouts
+
+The AEP gain of the best layout is finally evaluated on the full default wd/ws grid of the site with the same pchip
+curves, so the reported AEP is a bit different from aep_report of the farm with its default linear curves.
+"""
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import os
+import xarray as xr
+from py_wake import np
+from py_wake.utils.gradients import autograd
+from scipy.cluster.hierarchy import linkage, to_tree
+from scipy.spatial import ConvexHull, Delaunay, cKDTree
+from offshore_farms import storage
+from offshore_farms.batch import get_wake_model
+from offshore_farms.registry import farm_names, get_farm
+from offshore_farms.report import aep_report
+
+# Evaluators of this worker process, reused by all its rounds
+_worker_evaluators = {}
+
+
+def _empty_width(xy, n=60):
+    # largest distance from a point in the convex hull of xy to the nearest of xy, on an n x n grid
+    g = np.stack(np.meshgrid(*np.linspace(xy.min(0), xy.max(0), n).T), -1).reshape(-1, 2)
+    g = g[Delaunay(xy[ConvexHull(xy).vertices]).find_simplex(g) >= 0]
+    return cKDTree(xy).query(g)[0].max()
+
+
+def layout_groups(x, y, subfarms=None, max_gap=3, min_size=10):
+    """Index arrays of the groups of wind turbines that each get their own convex hull
+
+    The groups are the subfarms, {name: index or slice}, or all wind turbines. A group is split along its Ward
+    clustering tree while its hull has an empty area wider than max_gap times the median nearest neighbour distance
+    and both parts have at least min_size wind turbines
+    """
+    xy = np.array([x, y], dtype=float).T
+    spacing = np.median(cKDTree(xy).query(xy, 2)[0][:, 1])
+    groups = []
+
+    def split(node, i):
+        left, right = node.get_left(), node.get_right()
+        if (node.is_leaf() or min(left.get_count(), right.get_count()) < min_size or
+                _empty_width(xy[i]) <= max_gap * spacing):
+            groups.append(i)
+        else:
+            split(left, i[left.pre_order()])
+            split(right, i[right.pre_order()])
+    for i in [np.arange(len(xy))[s] for s in (subfarms or {}).values()] or [np.arange(len(xy))]:
+        split(to_tree(linkage(xy[i], 'ward')), i)
+    return groups
+
+
+def hull_constraints(x, y, groups=None):
+    """(A, b) of the convex hull of the group (default: all) of each wind turbine
+
+    A (wt, side, 2) and b (wt, side) such that A[i] @ [x_i, y_i] + b[i] <= 0 inside. Hulls with fewer sides are
+    padded with sides that are always satisfied
+    """
+    xy = np.array([x, y], dtype=float).T
+    equations = [(i, ConvexHull(xy[i]).equations) for i in (groups or [np.arange(len(xy))])]
+    A = np.zeros((len(xy), max(len(e) for _, e in equations), 2))
+    b = np.full(A.shape[:2], -1.)
+    for i, e in equations:
+        A[i, :len(e)], b[i, :len(e)] = e[:, :2], e[:, 2]
+    return A, b
+
+
+def project(x, y, A, b, min_distance, iterations=20):
+    """Positions moved into their hulls, (A, b), and at least min_distance apart (alternating projections)"""
+    xy = np.array([x, y], dtype=float).T
+    for _ in range(iterations):
+        for _ in range(A.shape[1]):  # move outside points onto the violated hull sides
+            d_ih = np.einsum('ihd,id->ih', A, xy) + b
+            if d_ih.max() <= 1e-9:
+                break
+            h = d_ih.argmax(1)
+            i = np.arange(len(xy))
+            xy -= np.maximum(d_ih[i, h], 0)[:, np.newaxis] * A[i, h]
+        pairs = cKDTree(xy).query_pairs(min_distance * (1 - 1e-9), output_type='ndarray')
+        if not len(pairs):
+            break
+        i, j = pairs.T
+        dxy = xy[j] - xy[i]
+        dist = np.maximum(np.hypot(*dxy.T), 1e-9)
+        push = ((min_distance - dist) / 2 / dist)[:, np.newaxis] * dxy
+        np.add.at(xy, i, -push)
+        np.add.at(xy, j, push)
+    return xy[:, 0], xy[:, 1]
+
+
+def violation(x, y, A, b, min_distance):
+    """Largest violation [m] of the hull and spacing constraints (<= 0: feasible)"""
+    xy = np.array([x, y]).T
+    d = (np.einsum('ihd,id->ih', A, xy) + b).max()
+    pairs = cKDTree(xy).query_pairs(min_distance, output_type='ndarray')
+    if len(pairs):
+        d = max(d, (min_distance - np.hypot(*(xy[pairs[:, 0]] - xy[pairs[:, 1]]).T)).max())
+    return d
+
+
+class Evaluator():
+    """AEP [GWh] and AEP gradients [GWh/m] of layouts of a farm with a cache of the evaluated layouts"""
+
+    def __init__(self, name, wake_model=None, ti=.1, wd=None, ws=None, cache_size=256):
+        self.farm = get_farm(name, ti=ti, method='pchip')
+        self.wfm = self.farm.wind_farm_model(wake_model)
+        self.wd, self.ws = wd, ws
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # number of AEP and gradient evaluations, i.e. not found in the cache
+        self.n_aep = self.n_gradient = 0
+
+    def _cached(self, kind, x, y, f):
+        key = (kind, np.round(x, 3).tobytes(), np.round(y, 3).tobytes())
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        v = self._cache[key] = f()
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return v
+
+    def aep(self, x, y):
+        def f():
+            self.n_aep += 1
+            return float(self.wfm.aep(x, y, type=self.farm.type, wd=self.wd, ws=self.ws))
+        return self._cached('aep', x, y, f)
+
+    def gradient(self, x, y):
+        """(2, wt) gradient of the AEP with respect to x and y"""
+        def f():
+            self.n_gradient += 1
+            return np.array(self.wfm.aep_gradients(autograd, ['x', 'y'], x=x, y=y, type=self.farm.type,
+                                                   wd=self.wd, ws=self.ws))
+        return self._cached('gradient', x, y, f)
+
+
+def _evaluator(name, wake_model, ti, wd, ws):
+    key = (name, wake_model, ti, None if wd is None else tuple(wd), None if ws is None else tuple(ws))
+    if key not in _worker_evaluators:
+        _worker_evaluators[key] = Evaluator(name, wake_model and get_wake_model(wake_model), ti, wd, ws)
+    return _worker_evaluators[key]
+
+
+def run_steps(state, n_steps, problem):
+    """Run <n_steps> projected gradient steps of a start and return its new state
+
+    state is a dict with x, y, aep, step [m], done and the counters n_aep and n_gradient. The new state also has
+    the AEP gain of the steps, gain. problem is (name, wake_model, ti, wd, ws, A, b, min_distance,
+    min_step)
+    """
+    name, wake_model, ti, wd, ws, A, b, min_distance, min_step = problem
+    ev = _evaluator(name, wake_model, ti, wd, ws)
+    n_aep, n_gradient = ev.n_aep, ev.n_gradient
+    state = dict(state)
+    x, y, aep, step = state['x'], state['y'], state['aep'], state['step']
+    if aep is None:
+        aep = ev.aep(x, y)
+    aep_start = aep
+    for _ in range(n_steps):
+        if step < min_step:
+            state['done'] = True
+            break
+        dxy = ev.gradient(x, y)
+        dxy = dxy / max(np.abs(dxy).max(), 1e-300)  # largest move is <step>
+        x_new, y_new = project(x + step * dxy[0], y + step * dxy[1], A, b, min_distance)
+        aep_new = ev.aep(x_new, y_new)
+        if aep_new > aep:
+            x, y, aep = x_new, y_new, aep_new
+            step *= 1.2
+        else:
+            step /= 2
+    state.update(x=x, y=y, aep=aep, step=step, gain=aep - aep_start, n_aep=state['n_aep'] + ev.n_aep - n_aep,
+                 n_gradient=state['n_gradient'] + ev.n_gradient - n_gradient)
+    return state
+
+
+def _dominated(states, best, rounds_left):
+    # starts that cannot reach the best AEP, even if they keep the gain of their last round for all remaining rounds
+    return [s['aep'] + max(s['gain'], 0) * rounds_left < best for s in states]
+
+
+def optimize(name, n_starts=8, min_spacing=3.5, wake_model=None, ti=.1, wd_step=10, ws=np.arange(4, 25, 2),
+             perturbation=1, step=.5, min_step=1, max_rounds=20, steps_per_round=5, workers=1, seed=None):
+    """Optimize the layout of the farm, <name>, and yield the states of the starts after each round
+
+    Parameters
+    ----------
+    name : str
+        Name of the wind farm, see farm_names()
+    n_starts : int, optional
+        Number of starts
+    min_spacing : float, optional
+        Minimum distance between wind turbines [rotor diameters]
+    wake_model : str, optional
+        Name of the wind farm model in the py_wake namespace, default is NOJ
+    ti : float, optional
+        Turbulence intensity of the site
+    wd_step : float, optional
+        Wind direction step [deg] of the AEP evaluated during the optimization
+    ws : array_like, optional
+        Wind speeds of the AEP evaluated during the optimization
+    perturbation : float, optional
+        Standard deviation of the random displacement of the wind turbines of the starts > 0 [rotor diameters]
+    step, min_step : float, optional
+        Initial step of the largest move [rotor diameters] and the step [m] below which a start has converged
+    max_rounds, steps_per_round : int, optional
+        Maximum number of rounds and number of steps of each start per round
+    workers : int or None, optional
+        Number of worker processes. None: number of CPUs. 1: run in this process
+    seed : int, optional
+        Seed of the perturbations
+
+    Yields
+    ------
+    list of state dicts, one per start, with x, y, aep, gain (of the last round), step, done (converged), dominated,
+    n_aep and n_gradient
+
+    Raises ValueError if the current layout (start 0) violates the minimum spacing
+    """
+    farm = get_farm(name)
+    D = np.max(farm.windTurbines.diameter(np.unique(np.zeros(len(farm.x), dtype=int) + farm.type)))
+    A, b = hull_constraints(farm.x, farm.y, layout_groups(farm.x, farm.y, farm.subfarms))
+    if violation(farm.x, farm.y, A, b, min_spacing * D) > 1e-6 * D:
+        raise ValueError("The layout of %s has wind turbines closer than min_spacing=%g rotor diameters"
+                         % (name, min_spacing))
+    wd = np.arange(0, 360, wd_step)
+    problem = (name, wake_model, ti, wd, ws, A, b, min_spacing * D, min_step)
+    rng = np.random.default_rng(seed)
+    states = []
+    for s in range(n_starts):
+        x, y = np.array(farm.x, dtype=float), np.array(farm.y, dtype=float)
+        if s > 0:  # start 0 is the current (feasible) layout
+            x, y = project(x + rng.normal(0, perturbation * D, len(x)), y + rng.normal(0, perturbation * D, len(y)),
+                           A, b, min_spacing * D)
+        states.append({'start': s, 'x': x, 'y': y, 'aep': None, 'step': step * D, 'done': False,
+                       'gain': 0, 'dominated': False, 'n_aep': 0, 'n_gradient': 0})
+
+    workers = workers or os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for r in range(max_rounds):
+            active = [s for s in states if not (s['done'] or s['dominated'])]
+            if not active:
+                break
+            if executor:
+                new = list(executor.map(run_steps, active, [steps_per_round] * len(active),
+                                        [problem] * len(active)))
+            else:
+                new = [run_steps(s, steps_per_round, problem) for s in active]
+            for s in new:
+                states[s['start']] = s
+            best = max(s['aep'] for s in states if s['aep'] is not None)
+            for s, dominated in zip(new, _dominated(new, best, max_rounds - r - 1)):
+                s['dominated'] = dominated and not s['done']
+            yield states
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def optimize_farm(name, wake_model=None, ti=.1, verbose=False, **kwargs):
+    """Optimize the layout of the farm, <name> (see optimize for kwargs) and return the best layout
+
+    Returns
+    -------
+    xarray Dataset with
+        x, y, x_initial, y_initial : (wt) best and initial layout
+        aep_start, status : (start) optimization AEP and status (converged, dominated or stopped) of each start
+        aep_initial, aep, gain, gain_pct : AEP [GWh] of the initial and best layout on the full default grid of the
+        site and the AEP gain [GWh, %], both with the pchip curves of the optimization
+    Without rounds (max_rounds=0), the best layout is the initial layout and there are no starts
+    """
+    states = []
+    for states in optimize(name, wake_model=wake_model, ti=ti, **kwargs):
+        if verbose:
+            print(' '.join('%10.3f%s' % (s['aep'], ' *'[s['done']] if not s['dominated'] else 'x')
+                           for s in states))
+    farm = get_farm(name, ti=ti, method='pchip')
+    x_initial, y_initial = np.asarray(farm.x, dtype=float), np.asarray(farm.y, dtype=float)
+    best = max(states, key=lambda s: s['aep'], default={'x': x_initial, 'y': y_initial, 'start': -1})
+    wm = wake_model and get_wake_model(wake_model)
+    aep_initial = float(aep_report(farm, wm).aep)
+    if states:
+        farm.x, farm.y = best['x'], best['y']
+        aep = float(aep_report(farm, wm).aep)
+    else:
+        aep = aep_initial
+    status = ['dominated' if s['dominated'] else ('converged' if s['done'] else 'stopped') for s in states]
+    return xr.Dataset(
+        data_vars={'x': ('wt', best['x']), 'y': ('wt', best['y']),
+                   'x_initial': ('wt', x_initial), 'y_initial': ('wt', y_initial),
+                   'aep_start': ('start', [s['aep'] for s in states],
+                                 {'Description': 'AEP of the optimization grid [GWh]'}),
+                   'status': ('start', status),
+                   'aep_initial': ((), aep_initial, {'Description': 'AEP of the initial layout [GWh]'}),
+                   'aep': ((), aep, {'Description': 'AEP of the best layout [GWh]'}),
+                   'gain': ((), aep - aep_initial, {'Description': 'AEP gain [GWh]'}),
+                   'gain_pct': ((), (aep / aep_initial - 1) * 100, {'Description': 'AEP gain [%]'})},
+        coords={'wt': np.arange(len(best['x'])), 'start': np.arange(len(states))},
+        attrs={'farm': name, 'label': farm.label, 'best_start': best['start'],
+               'n_aep': sum(s['n_aep'] for s in states), 'n_gradient': sum(s['n_gradient'] for s in states)})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.optimize',
+                                     description='Multi-start layout optimization of the wind farms')
+    parser.add_argument('--farms', nargs='+', default=farm_names(), choices=farm_names())
+    parser.add_argument('--starts', type=int, default=8)
+    parser.add_argument('--min-spacing', type=float, default=3.5, help='Minimum spacing [rotor diameters]')
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-step', type=float, default=10, help='Wind direction step during the optimization')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--steps-per-round', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes. Default: all CPUs')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='Directory where the best layouts are stored, '
+                        'see offshore_farms.storage.load_layout')
+    args = parser.parse_args(argv)
+
+    print('%-18s %12s %12s %10s %8s %6s' % ('farm', 'AEP initial', 'AEP best', 'gain', 'gain %', 'start'))
+    for name in args.farms:
+        res = optimize_farm(name, args.wake_model, n_starts=args.starts, min_spacing=args.min_spacing,
+                            wd_step=args.wd_step, max_rounds=args.rounds, steps_per_round=args.steps_per_round,
+                            workers=args.workers, seed=args.seed)
+        print('%-18s %12.2f %12.2f %10.2f %8.3f %6d' % (name, res.aep_initial, res.aep, res.gain, res.gain_pct,
+                                                        res.best_start))
+        if args.output:
+            storage.save_layout(name, res.x.values, res.y.values, args.output)
+
+
+if __name__ == '__main__':
+    main()
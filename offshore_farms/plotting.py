@@ -0,0 +1,61 @@
+"""
+Plotting helpers for the wind farm models.
+matplotlib is only imported when one of these functions is called, so importing a farm model stays cheap, and
+pyplot is only used if no axes is given (see offshore_farms.figures for headless rendering).
+"""
+from py_wake import np
+
+
+def plot_power_ct(wt, title=None, ax=None):
+    """Plot the power and Ct curve of a wind turbine
+
+    Parameters
+    ----------
+    wt : WindTurbine
+        Wind turbine to plot
+    title : str, optional
+        Figure title
+    ax : matplotlib axes, optional
+        Axes to plot the power curve in. The Ct curve is plotted on a twin axis.
+    """
+    if ax is None:
+        import matplotlib.pyplot as plt
+        plt.figure()
+        ax = plt.gca()
+    ws = np.linspace(3, 20, 100)
+    ax.plot(ws, wt.power(ws) * 1e-3, label='Power')
+    c = ax.plot([], [], label='Ct')[0].get_color()
+    ax.set_ylabel('Power [kW]')
+    ax.set_xlabel('Wind speed [m/s]')
+    ax2 = ax.twinx()
+    ax2.plot(ws, wt.ct(ws), color=c)
+    ax2.set_ylabel('Ct')
+    ax.legend(loc=1)
+    if title:
+        ax.set_title(title)
+    return ax
+
+
+def plot_layout(wt, x, y, type=0, ax=None):  # @ReservedAssignment
+    """Plot the wind turbine positions"""
+    if ax is None:
+        import matplotlib.pyplot as plt
+        plt.figure()
+        ax = plt.gca()
+    wt.plot_xy(x, y, type, ax=ax)
+    ax.set_xlabel('x [m]')
+    ax.set_ylabel('y [m]')
+    ax.legend()
+    return ax
+
+
+def plot_wind_rose(site, n_wd=12, ax=None):
+    """Plot the wind direction distribution of a site"""
+    if ax is None:
+        import matplotlib.pyplot as plt
+        plt.figure()
+        ax = plt.gca()
+    site.plot_wd_distribution(n_wd=n_wd, ax=ax)
+    ax = ax.figure.axes[-1]  # plot_wd_distribution replaces ax with a polar axes
+    ax.set_title('Wind rose')
+    return ax
@@ -0,0 +1,111 @@
+"""
+Cached probability tables of the wind direction and wind speed bins of a site.
+
+The probability of a (wd, ws) flow case of a Weibull site is the sector frequency times the Weibull probability
+of the wind speed bin. It only depends on the sector frequencies and Weibull parameters of the site and on the
+wd/ws grid, not on the turbulence intensity, shear, wind turbines or wake model. The tables are therefore computed
+once per (site parameters, wd grid, ws grid), kept in memory with least-recently-used eviction and optionally
+stored as .npy files on disk, and reused by all AEP calculations on the same grid:
+
+    P_ilk = probability(farm.site, wd, ws)
+
+Sites whose probabilities depend on the position (e.g. with Speedup or position dependent Weibull parameters)
+are not tabulated; their probabilities are computed by the site at the requested positions as before.
+"""
+from py_wake import np
+from offshore_farms.cache import LRUCache, _Hasher
+
+# Increase to invalidate existing tables on disk when the calculation changes
+table_version = 1
+
+# Site data variables that the probabilities depend on
+probability_vars = ('P', 'Sector_frequency', 'Weibull_A', 'Weibull_k')
+
+
+def uniform(site):
+    """True if the probabilities of <site> are the same at all positions"""
+    return not {'Speedup', 'Turning'} & set(site.ds.data_vars) and \
+        all(set(site.ds[k].dims) <= {'wd', 'ws'} for k in probability_vars if k in site.ds)
+
+
+def table_key(site, wd, ws, wd_bin_size=None, ws_bins=None):
+    """Hash of the site parameters and grid that the probability table depends on"""
+    ds = site.ds
+    return _Hasher().update({
+        'version': table_version,
+        'class': type(site),
+        'data': {k: [ds[k].dims, ds[k].values] for k in probability_vars if k in ds},
+        'coords': {k: ds[k].values for k in ('wd', 'ws') if k in ds.coords},
+        'sector_width': ds.attrs.get('sector_width'),
+        'interp_method': site.interp_method,
+        'wd': np.asarray(wd, dtype=float), 'ws': np.asarray(ws, dtype=float),
+        'wd_bin_size': site.wd_bin_size(wd, wd_bin_size),
+        'ws_bins': None if ws_bins is None else np.asarray(ws_bins, dtype=float)}).hexdigest()
+
+
+class ProbabilityTables():
+    """Memory (and optionally disk) cache of (wd, ws) probability tables"""
+
+    def __init__(self, max_items=128, directory=None):
+        """
+        Parameters
+        ----------
+        max_items : int, optional
+            Number of tables kept in memory. The least recently used tables are evicted when exceeded
+        directory : str, optional
+            If specified, the tables are also stored in and loaded from this directory
+        """
+        self.cache = LRUCache(max_items, directory)
+        # number of tables computed, i.e. not found in memory or on disk
+        self.n_computed = 0
+
+    def get(self, site, wd=None, ws=None, wd_bin_size=None, ws_bins=None):
+        """Read-only (1, wd, ws) probability table of <site> (must be uniform, see uniform)"""
+        wd, ws = site.get_defaults(wd, ws)
+        key = table_key(site, wd, ws, wd_bin_size, ws_bins)
+        P_ilk = self.cache.get(key)
+        if P_ilk is None:
+            P_ilk = self._compute(site, wd, ws, wd_bin_size, ws_bins)
+            self.cache.put(key, P_ilk)
+        P_ilk.flags.writeable = False
+        return P_ilk
+
+    def _compute(self, site, wd, ws, wd_bin_size, ws_bins):
+        self.n_computed += 1
+        # the probabilities of a uniform site do not depend on the position and height
+        lw = site.local_wind([0], [0], [100], wd, ws, wd_bin_size=wd_bin_size, ws_bins=ws_bins)
+        return np.array(np.broadcast_to(lw.P_ilk, (1, len(wd), len(ws))), dtype=float)
+
+    def clear(self):
+        """Remove the tables from memory (the tables on disk are kept)"""
+        self.cache.clear()
+
+
+_default_tables = ProbabilityTables()
+
+
+def default_tables():
+    """ProbabilityTables shared within the process (memory only)"""
+    return _default_tables
+
+
+def free_stream_wind(site, x, y, h, wd, ws):
+    """Local wind of <site> for the free-stream wind speed and turbulence intensity (WS_ilk and TI_ilk)
+
+    The probabilities are taken from probability() instead, so for uniform sites where only the probabilities
+    depend on the wind direction, the local wind is computed for the first wind direction only (l=1)
+    """
+    if uniform(site) and all('wd' not in site.ds[k].dims for k in site.ds.data_vars if k not in probability_vars):
+        wd = np.atleast_1d(wd)[:1]
+    return site.local_wind(x, y, h, wd, ws)
+
+
+def probability(site, wd=None, ws=None, x=None, y=None, h=None, tables=None, wd_bin_size=None, ws_bins=None):
+    """(i, wd, ws) probability of the flow cases of <site>
+
+    The table of uniform sites is looked up in <tables> (default: default_tables()) and has i=1. For other sites,
+    the probabilities are computed at the positions, x, y, h
+    """
+    if uniform(site):
+        return (default_tables() if tables is None else tables).get(site, wd, ws, wd_bin_size, ws_bins)
+    return site.local_wind(x, y, h, wd, ws, wd_bin_size=wd_bin_size, ws_bins=ws_bins).P_ilk
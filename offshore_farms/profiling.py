@@ -0,0 +1,271 @@
+"""
+Opt-in stage-level profiling of the wind farm simulations.
+
+Within a profile() block, the time of the following stages is recorded:
+- simulation: wind farm simulations of offshore_farms (precision.simulate)
+- site: site localization, Site.local_wind
+- wake_deficit: wake (and blockage) deficit calculation of engineering wind farm models
+- power_ct: power/Ct interpolation of the wind turbines
+- aggregation: AEP aggregation of the offshore_farms reports, sweeps and Monte Carlo batches
+Nested stages are included in the time of their parent, e.g. site, wake_deficit and power_ct in simulation.
+For each stage the number of calls, the wall time, the largest array shape, the total number of array elements
+and, if memory=True, the peak traced memory are recorded. The PyWake stages are recorded by the wind farm models
+that Farm.wind_farm_model creates while profiling is enabled: they are copies, see instrument, whose site, wind
+turbines and wake deficit methods are wrapped per instance. The PyWake classes are not changed. Outside a profile()
+block the models are not wrapped and the stage() markers of offshore_farms are no-ops, so the instrumentation has no
+measurable overhead when disabled.
+
+    with profile() as prof:
+        aep_report(get_farm('borsselewfz'))
+    prof.save_json('profile.json')          # summary per stage
+    prof.save_chrome_trace('profile.trace')  # open in chrome://tracing or https://ui.perfetto.dev
+
+or from the command line:
+
+    python -m offshore_farms.profiling borsselewfz --wd-step 1 --json profile.json --trace profile.trace
+
+Profiling is enabled for the calling thread only, so the simulations of other threads (e.g. the worker of
+offshore_farms.service or the figure threads) are not recorded, and neither are worker threads and processes of
+n_workers/workers. Memory tracing is process wide, so the peak memory of stages running concurrently in other
+threads is mixed in; it also slows down the code.
+"""
+import argparse
+from contextlib import contextmanager, nullcontext
+import copy
+import json
+import os
+import threading
+import time
+import tracemalloc
+from py_wake import np
+
+_local = threading.local()
+_disabled = nullcontext()
+
+
+def _site_shape(args, kwargs, res):
+    return np.shape(res.WS_ilk if res.WS_ilk.size > res.P_ilk.size else res.P_ilk)
+
+
+def _deficit_shape(args, kwargs, res):
+    return np.shape(res[0])
+
+
+def _power_ct_shape(args, kwargs, res):
+    return np.shape(args[0] if args else kwargs['ws'])
+
+
+class _Stage():
+    """Instance attribute that records the calls of the method, <method>, of <obj> as stage, <name>
+
+    A class, not a closure, so instrumented models can be pickled, e.g. by PyWake with n_cpu > 1
+    """
+
+    def __init__(self, obj, method, name, shape):
+        self.obj, self.method, self.name, self.shape = obj, method, name, shape
+        # an instance attribute that is wrapped in turn, e.g. the float32 deficits of precision.float32_model
+        self.instance_method = obj.__dict__.get(method)
+
+    def __call__(self, *args, **kwargs):
+        f = self.instance_method or getattr(type(self.obj), self.method).__get__(self.obj)
+        profiler = _active()
+        if profiler is None:
+            return f(*args, **kwargs)
+        with profiler.stage(self.name) as frame:
+            res = f(*args, **kwargs)
+            if frame is not None:
+                frame.shape = self.shape(args, kwargs, res)
+            return res
+
+
+def instrument(wfm):
+    """Copy of the wind farm model, <wfm>, that records its site, wake_deficit and power_ct stages in the profiler of
+    the calling thread. <wfm>, its site and its wind turbines are not changed"""
+    wfm = copy.copy(wfm)
+    wfm.site = copy.copy(wfm.site)
+    wfm.windTurbines = copy.copy(wfm.windTurbines)
+    for obj, method, name, shape in [(wfm, '_calc_deficit', 'wake_deficit', _deficit_shape),
+                                     (wfm.site, 'local_wind', 'site', _site_shape),
+                                     (wfm.windTurbines, 'power', 'power_ct', _power_ct_shape),
+                                     (wfm.windTurbines, 'ct', 'power_ct', _power_ct_shape),
+                                     (wfm.windTurbines, 'power_ct', 'power_ct', _power_ct_shape)]:
+        setattr(obj, method, _Stage(obj, method, name, shape))
+    return wfm
+
+
+class _Frame():
+    __slots__ = ['name', 'shape', 't0', 'mem0', 'peak']
+
+    def __init__(self, name, shape):
+        self.name, self.shape = name, shape
+        self.t0 = self.mem0 = self.peak = 0
+
+
+class Profiler():
+    """Recorded stages of a profile() block"""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        # (stage, thread, start [s], duration [s], shape, number of elements, peak memory [B] or None)
+        self.events = []
+        self.t0 = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        return self._local.__dict__.setdefault('stack', [])
+
+    @contextmanager
+    def stage(self, name, shape=()):
+        """Record the block as a call of stage, <name>. Re-entrant calls of the same stage are not recorded"""
+        stack = self._stack()
+        if any(f.name == name for f in stack):
+            yield
+            return
+        frame = _Frame(name, shape)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            frame.mem0 = frame.peak = current
+        stack.append(frame)
+        frame.t0 = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            dt = time.perf_counter() - frame.t0
+            stack.pop()
+            peak = None
+            if self.memory:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1].peak = max(stack[-1].peak, frame.peak)
+                peak = frame.peak - frame.mem0
+            shape = frame.shape
+            with self._lock:
+                self.events.append((name, threading.get_ident(), frame.t0 - self.t0, dt, tuple(shape),
+                                    int(np.prod(shape)), peak))
+
+    def summary(self):
+        """{stage: {calls, time, time_pr_call, max_shape, elements[, peak_MB]}} of the recorded stages"""
+        summary = {}
+        for name, _, _, dt, shape, n, peak in self.events:
+            s = summary.setdefault(name, {'calls': 0, 'time': 0., 'max_shape': (), 'elements': 0})
+            s['calls'] += 1
+            s['time'] += dt
+            s['elements'] += n
+            if n >= np.prod(s['max_shape']):
+                s['max_shape'] = shape
+            if peak is not None:
+                s['peak_MB'] = max(s.get('peak_MB', 0), peak / 1024**2)
+        for s in summary.values():
+            s['time_pr_call'] = s['time'] / s['calls']
+            s['max_shape'] = list(s['max_shape'])
+        return summary
+
+    def save_json(self, filename, **info):
+        """Write the summary and <info>, e.g. farm and grid, as JSON"""
+        with open(filename, 'w') as fid:
+            json.dump({**info, 'memory': self.memory, 'stages': self.summary()}, fid, indent=1)
+            fid.write('\n')
+
+    def chrome_trace(self):
+        """The recorded stages in the Chrome trace event format"""
+        pid = os.getpid()
+        events = []
+        for name, tid, t, dt, shape, n, peak in self.events:
+            args = {'shape': list(shape), 'elements': n}
+            if peak is not None:
+                args['peak_MB'] = peak / 1024**2
+            events.append({'name': name, 'cat': 'offshore_farms', 'ph': 'X', 'ts': t * 1e6, 'dur': dt * 1e6,
+                           'pid': pid, 'tid': tid, 'args': args})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, filename):
+        with open(filename, 'w') as fid:
+            json.dump(self.chrome_trace(), fid)
+
+    def print_summary(self):
+        print('%-14s %8s %10s %12s %14s %20s' % ('stage', 'calls', 'time [s]', 'per call [ms]', 'elements',
+                                                  'max shape') + ('  peak [MB]' if self.memory else ''))
+        for name, s in sorted(self.summary().items(), key=lambda kv: -kv[1]['time']):
+            print('%-14s %8d %10.4f %12.3f %14d %20s' % (name, s['calls'], s['time'], s['time_pr_call'] * 1e3,
+                                                         s['elements'], tuple(s['max_shape'])) +
+                  ('  %9.1f' % s['peak_MB'] if 'peak_MB' in s else ''))
+
+
+def _active():
+    return getattr(_local, 'profiler', None)
+
+
+def enabled():
+    """True if profiling is enabled in the calling thread"""
+    return _active() is not None
+
+
+def stage(name, shape=()):
+    """Context manager that records the block as a call of stage, <name>, if profiling is enabled in this thread"""
+    profiler = _active()
+    if profiler is None:
+        return _disabled
+    return profiler.stage(name, shape)
+
+
+@contextmanager
+def profile(memory=False):
+    """Profile the stages of the simulations run by the calling thread in the block. Yields the Profiler
+
+    Parameters
+    ----------
+    memory : bool, optional
+        If True, the peak memory of each stage is traced with tracemalloc (slows down the code)
+    """
+    if enabled():
+        raise RuntimeError("Profiling is already enabled")
+    profiler = Profiler(memory)
+    started = memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = None
+        if started:
+            tracemalloc.stop()
+
+
+def main(argv=None):
+    from offshore_farms.registry import farm_names, get_farm
+    from offshore_farms.report import aep_report
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.profiling',
+                                     description='Profile the stages of an AEP report of a farm')
+    parser.add_argument('farm', choices=farm_names())
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-step', type=float, default=None, help='Wind direction step. Default: site default')
+    parser.add_argument('--ws-step', type=float, default=None, help='Wind speed step. Default: site default')
+    parser.add_argument('--memory', action='store_true', help='Trace the peak memory of each stage (slower)')
+    parser.add_argument('--json', help='Write the summary to this JSON file')
+    parser.add_argument('--trace', help='Write a Chrome trace to this file')
+    args = parser.parse_args(argv)
+
+    from offshore_farms import profiling  # the module, not __main__, holds the profiler seen by the stage markers
+    from offshore_farms.batch import get_wake_model
+    farm = get_farm(args.farm)
+    wd = None if args.wd_step is None else np.arange(0, 360, args.wd_step)
+    ws = None if args.ws_step is None else np.arange(3, 25 + args.ws_step / 2, args.ws_step)
+    wake_model = args.wake_model and get_wake_model(args.wake_model)
+    with profiling.profile(args.memory) as prof:
+        with prof.stage('aep_report'):
+            aep_report(farm, wake_model, wd, ws)
+    prof.print_summary()
+    if args.json:
+        prof.save_json(args.json, farm=args.farm, wake_model=args.wake_model or 'NOJ', wd_step=args.wd_step,
+                       ws_step=args.ws_step)
+    if args.trace:
+        prof.save_chrome_trace(args.trace)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Spatial pruning of wind turbine pairs that cannot interact.
+
+A wind turbine, j, can only be in the wake of another wind turbine, i, if j is downstream of i, closer than a
+maximum wake distance and inside a wake cone of i, i.e. if the wind direction is within
+
+    asin((D + k * d) / d)
+
+of the direction from j to i, where d is the distance between i and j, D is the largest rotor diameter and k is the
+wake expansion coefficient of the cone. The cone only contains the whole wake for top-hat wake deficit models,
+e.g. NOJ, whose wake radius D/2 + k * d grows with an expansion coefficient of at most k. By default k is therefore
+taken from the NOJ deficit of the wind farm model, see wake_cone_k. Gaussian and other deficit models have no wake
+edge: for them the cone is an approximation that neglects the wake tails outside it (increase k to include more of
+them). Candidate pairs within the maximum distance are found with a KD-tree, and for each wind direction sector
+the wind turbines are split into clusters that cannot interact for any of the wind directions of the sector
+(connected components of the interaction graph). Each cluster is simulated alone, so the cost scales with the sum
+of the squared cluster sizes instead of the squared number of wind turbines, e.g. for wind farm clusters where the
+individual farms are far apart.
+
+Wakes beyond the maximum distance (and, for non top-hat wakes, outside the cone) are neglected, which makes the AEP
+slightly higher than the AEP of the full simulation. The deviation is controlled by max_distance (and k). The
+pruning assumes a wind farm model without upstream effects (blockage), e.g. NOJ and the other PropagateDownwind
+models.
+"""
+from py_wake import np
+from py_wake.deficit_models.deficit_model import WakeRadiusTopHat
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from offshore_farms.precision import simulate
+
+
+def wake_cone_k(wfm, k=.1):
+    """Wake expansion coefficient of the wake cone of the wind farm model, <wfm>
+
+    For top-hat NOJ deficits this is the expansion coefficient of the model, a[0] * TI + a[1], at the largest
+    turbulence intensity of the site (added turbulence of a turbulence model is not included). Other deficit models
+    have no wake edge and <k> is returned
+    """
+    deficit = wfm.wake_deficitModel
+    if isinstance(deficit, WakeRadiusTopHat) and hasattr(deficit, 'a'):
+        TI = float(np.max(wfm.site.ds.TI)) if 'TI' in wfm.site.ds else 0
+        return deficit.a[0] * TI + deficit.a[1]
+    return k
+
+
+def interacting_pairs(x, y, max_distance, diameter, k=.1):
+    """Candidate pairs and their wind direction interval
+
+    Returns
+    -------
+    i, j : array_like
+        Indices of wind turbine pairs closer than max_distance. Both (i, j) and (j, i) are included
+    wd_ij : array_like
+        Wind direction [deg] for which j is directly downstream of i
+    half_angle : array_like
+        Half angle [deg] of the wake cone of i seen from j
+    """
+    xy = np.array([x, y], dtype=float).T
+    pairs = cKDTree(xy).query_pairs(max_distance, output_type='ndarray')
+    i, j = np.r_[pairs[:, 0], pairs[:, 1]], np.r_[pairs[:, 1], pairs[:, 0]]
+    dx, dy = xy[i, 0] - xy[j, 0], xy[i, 1] - xy[j, 1]
+    d = np.hypot(dx, dy)
+    wd_ij = np.rad2deg(np.arctan2(dx, dy)) % 360  # direction from j towards i, i.e. where the wind comes from
+    half_angle = np.rad2deg(np.arcsin(np.minimum(1, (diameter + k * d) / d)))
+    return i, j, wd_ij, half_angle
+
+
+def wd_sectors(wd, n_sectors):
+    """Split the wind directions into <n_sectors> (near) equal-sized contiguous sectors (list of index arrays)"""
+    return [s for s in np.array_split(np.arange(len(wd)), min(n_sectors, len(wd))) if len(s)]
+
+
+def sector_clusters(I, pairs, wd):
+    """Cluster label of each of the I wind turbines for the wind directions, wd, of a sector"""
+    i, j, wd_ij, half_angle = pairs
+    angle = np.abs((np.asarray(wd)[np.newaxis] - wd_ij[:, np.newaxis] + 180) % 360 - 180)
+    m = (angle <= half_angle[:, np.newaxis]).any(1)
+    graph = coo_matrix((np.ones(m.sum()), (i[m], j[m])), shape=(I, I))
+    return connected_components(graph, directed=False)[1]
+
+
+def merge_clusters(labels, min_size):
+    """Merge the smallest clusters into groups of at least <min_size> wind turbines (list of index arrays)
+
+    Simulating small clusters together is exact (they cannot interact) and avoids the overhead of many small
+    simulations
+    """
+    clusters = sorted([np.where(labels == c)[0] for c in np.unique(labels)], key=len)
+    groups, group = [], []
+    for c in clusters:
+        group.append(c)
+        if sum(map(len, group)) >= min_size:
+            groups.append(np.concatenate(group))
+            group = []
+    if group:
+        if groups:
+            groups[0] = np.concatenate([groups[0]] + group)
+        else:
+            groups.append(np.concatenate(group))
+    return groups
+
+
+def pruned_power_P(farm, wake_model, wd, ws, P_ilk, max_distance, n_sectors=1, k=None, min_size=32,
+                   precision='float64', info=None, wt_kwargs=None, **kwargs):
+    """Sum over wind speeds of power times probability, (wt, wd), from independent clusters of each wd sector
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm
+    wake_model : WindFarmModel class or None
+        Wind farm model without blockage, default is NOJ
+    wd, ws : array_like
+        Wind directions and wind speeds
+    P_ilk : array_like
+        Probability of the flow cases of the full wd/ws grid
+    max_distance : float
+        Wakes are neglected beyond this distance [m]
+    n_sectors : int, optional
+        Number of wind direction sectors. Default is 1, i.e. clusters that cannot interact for any wind direction.
+        More sectors give smaller clusters, but more simulations. As the cost of a simulation includes a part
+        proportional to the number of wind turbines, more sectors only pay off if the clusters become much smaller
+    k : float or None, optional
+        Wake expansion coefficient of the wake cone. Default (None) is wake_cone_k of the wind farm model
+    min_size : int, optional
+        Clusters smaller than this are simulated together, see merge_clusters
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    info : dict, optional
+        If specified, the number of candidate pairs, 'pairs', of simulations, 'simulations', and of simulated wind
+        turbine pairs times flow cases, 'pair_flow_cases' (the cost; I * I * L * K without pruning), are added to it
+    wt_kwargs : dict, optional
+        Additional (wt, wd, ws) arguments for the wind farm model call, e.g. the free-stream WS and TI of each wind
+        turbine. The simulation of each cluster gets the values of its wind turbines and wind directions
+    kwargs : dict
+        Additional arguments for the wind farm model call. Must be scalars
+    """
+    wd, ws = np.asarray(wd), np.asarray(ws)
+    I = len(farm.x)
+    type_i = np.zeros(I, dtype=int) + farm.type
+    diameter = np.max(farm.windTurbines.diameter(np.unique(type_i)))
+    wfm = farm.wind_farm_model(wake_model)
+    pairs = interacting_pairs(farm.x, farm.y, max_distance, diameter, wake_cone_k(wfm) if k is None else k)
+    P_ilk = np.broadcast_to(P_ilk, (I, len(wd), P_ilk.shape[2]))
+    wt_kwargs = {k: np.broadcast_to(v, (I, len(wd), len(ws))) for k, v in (wt_kwargs or {}).items()}
+    power_P_il = np.zeros((I, len(wd)))
+    n_simulations = pair_flow_cases = 0
+    for l in wd_sectors(wd, n_sectors):
+        for i in merge_clusters(sector_clusters(I, pairs, wd[l]), min_size):
+            power_ilk = simulate(wfm, farm.x[i], farm.y[i], precision, type=type_i[i], wd=wd[l], ws=ws, **kwargs,
+                                 **{k: v[np.ix_(i, l)] for k, v in wt_kwargs.items()})[2]
+            power_P_il[np.ix_(i, l)] = (power_ilk * P_ilk[i][:, l]).sum(2, dtype=float)
+            n_simulations += 1
+            pair_flow_cases += len(i)**2 * len(l) * len(ws)
+    if info is not None:
+        info.update(pairs=len(pairs[0]) // 2, simulations=n_simulations, pair_flow_cases=pair_flow_cases)
+    return power_P_il
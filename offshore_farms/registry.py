@@ -0,0 +1,196 @@
+"""
+Registry of the wind farm models.
+
+The site classes of the farm modules register themselves with the register_farm decorator, e.g.
+
+    @register_farm('hornsea2', 'Hornsea Project 2', SG8_167, wt_x, wt_y)
+    class Hornsea2(UniformWeibullSite):
+        ...
+
+and get_farm('hornsea2') returns the site, wind turbines and layout of the farm.
+The farm module is imported the first time the farm is requested.
+"""
+from functools import lru_cache
+import importlib
+from py_wake import np
+from py_wake.site.shear import PowerShear
+from py_wake.wind_turbines import WindTurbines
+
+# Module of each farm. The module is imported, and the farm thereby registered, by get_farm
+farm_modules = {'hornsea2': 'HornseaProject2',
+                'borkumriffgrund2': 'BorkumRiffgrundII',
+                'borssele1and2': 'BorsseleIandII',
+                'borssele3and4': 'BorsseleIIIandIV',
+                'borsselewfz': 'BorsseleWFZ'}
+
+_farms = {}
+
+# Height of the Global Wind Atlas data that the Weibull parameters of the sites are based on
+shear_h_ref = 100
+
+
+class Farm():
+    """Site, wind turbines and layout of a registered wind farm"""
+
+    def __init__(self, name, label, site, windTurbines, x, y, type=0, subfarms=None):  # @ReservedAssignment
+        self.name = name
+        self.label = label
+        self.site = site
+        self.windTurbines = windTurbines
+        self.x = x
+        self.y = y
+        self.type = type
+        self.subfarms = subfarms or {}
+
+    def subfarm_i(self):
+        """Name of the subfarm of each wind turbine or None if the farm has no subfarms"""
+        if not self.subfarms:
+            return None
+        subfarm_i = np.full(len(self.x), '', dtype=object)
+        for name, index in self.subfarms.items():
+            subfarm_i[index] = name
+        return subfarm_i.astype(str)
+
+    def __repr__(self):
+        return "Farm(%r, %d wind turbines)" % (self.name, len(self.x))
+
+    def wind_farm_model(self, wake_model=None, **kwargs):
+        """Wind farm model of the farm, default NOJ
+
+        If profiling is enabled in the calling thread, the model is instrumented, see offshore_farms.profiling
+        """
+        if wake_model is None:
+            from py_wake import NOJ
+            wake_model = NOJ
+        from offshore_farms import profiling  # imported here, so python -m offshore_farms.profiling runs cleanly
+        wfm = wake_model(self.site, self.windTurbines, **kwargs)
+        return profiling.instrument(wfm) if profiling.enabled() else wfm
+
+
+class _FarmSpec():
+    def __init__(self, name, label, site_cls, wt_classes, x, y, type, subfarms, anchor):  # @ReservedAssignment
+        self.name = name
+        self.label = label
+        self.site_cls = site_cls
+        self.wt_classes = wt_classes
+        self.subfarms = subfarms
+        self.anchor = anchor
+        self.type = np.asarray(type, dtype=int) if np.ndim(type) else type
+        self._xy = (x, y)
+        self._positions = None
+
+    @property
+    def positions(self):
+        # (n_wt, 2) array loaded on first use. Farms with a binary layout use the memory-mapped positions, which
+        # must equal the registered positions (ValueError if the binary layout is stale)
+        if self._positions is None:
+            from offshore_farms import storage  # not at module level, so storage can run with python -m
+            xy = np.array(self._xy, dtype=float).T
+            if storage.has_layout(self.name):
+                self._positions = storage.load_layout(self.name, reference=xy)
+            else:
+                self._positions = xy
+        return self._positions
+
+    @property
+    def layout(self):
+        return self.positions[:, 0], self.positions[:, 1], self.type
+
+
+def register_farm(name, label, wind_turbines, x, y, type=0, subfarms=None, anchor=None):  # @ReservedAssignment
+    """Class decorator that registers a site class as the site of a wind farm
+
+    Parameters
+    ----------
+    name : str
+        Name used to look up the farm with get_farm
+    label : str
+        Human readable name of the farm
+    wind_turbines : WindTurbine class or list of WindTurbine classes
+        Wind turbine type(s) of the farm
+    x, y : array_like
+        Wind turbine positions
+    type : int or array_like, optional
+        Wind turbine types, i.e. index in wind_turbines, default is 0
+    subfarms : dict, optional
+        Wind farms that the farm consists of, {name: index or slice of their wind turbines}.
+        The AEP and wake loss of each subfarm is reported separately
+    anchor : (float, float), optional
+        Latitude and longitude [deg] of the origin of the layout coordinates. Places the farm in a cluster of farms,
+        see offshore_farms.cluster
+    """
+    def register(site_cls):
+        wt_classes = tuple(np.atleast_1d(wind_turbines))
+        _farms[name] = _FarmSpec(name, label, site_cls, wt_classes, x, y, type, subfarms, anchor)
+        site_cls.farm_name = name
+        return site_cls
+    return register
+
+
+@lru_cache(maxsize=None)
+def get_wind_turbines(wt_classes, method='linear'):
+    """Wind turbine object of the wind turbine class(es), <wt_classes>, shared by all farms"""
+    wts = [wt_cls(method=method) for wt_cls in wt_classes]
+    if len(wts) == 1:
+        return wts[0]
+    return WindTurbines.from_WindTurbine_lst(wts)
+
+
+def farm_names():
+    """Names of the known wind farms"""
+    return sorted(set(farm_modules) | set(_farms))
+
+
+def _get_spec(name):
+    if name not in _farms and name in farm_modules:
+        importlib.import_module(farm_modules[name])
+    if name not in _farms:
+        raise KeyError("Unknown wind farm, '%s'. Known wind farms are: %s" % (name, ", ".join(farm_names())))
+    return _farms[name]
+
+
+def get_positions(name):
+    """(n_wt, 2) wind turbine positions of the farm, <name>, e.g. for the initial_position of the site"""
+    return _get_spec(name).positions
+
+
+def get_site_class(name):
+    """Site class of the farm, <name>"""
+    return _get_spec(name).site_cls
+
+
+def get_wind_turbine_classes(name):
+    """Wind turbine class of each wind turbine type of the farm, <name>"""
+    return _get_spec(name).wt_classes
+
+
+def get_anchor(name):
+    """(latitude, longitude) [deg] of the origin of the layout coordinates of the farm, <name>, or None"""
+    return _get_spec(name).anchor
+
+
+def get_farm(name, ti=.1, shear=None, method='linear'):
+    """Site, wind turbines and layout of a registered wind farm
+
+    Parameters
+    ----------
+    name : str
+        Name of the wind farm, see farm_names()
+    ti : float, optional
+        Turbulence intensity of the site
+    shear : Shear object, float or None, optional
+        Shear of the site. A float is interpreted as the exponent of a power law shear
+        with reference height 100m (the height of the Weibull parameters)
+    method : {'linear', 'pchip'}
+        linear(fast) or pchip(smooth and gradient friendly) interpolation of the power and Ct curves
+
+    Returns
+    -------
+    Farm
+    """
+    spec = _get_spec(name)
+    if isinstance(shear, (int, float)):
+        shear = PowerShear(h_ref=shear_h_ref, alpha=shear)
+    x, y, type = spec.layout  # @ReservedAssignment
+    return Farm(name, spec.label, spec.site_cls(ti=ti, shear=shear), get_wind_turbines(spec.wt_classes, method),
+                x, y, type, spec.subfarms)
@@ -0,0 +1,171 @@
+"""
+AEP and wake loss report of a wind farm from a single simulation.
+"""
+import xarray as xr
+from py_wake import np
+from offshore_farms import profiling
+from offshore_farms.adaptive import adaptive_power_P
+from offshore_farms.cache import cache_key, default_cache, execution_kwargs
+from offshore_farms.chunking import chunked_power_P
+from offshore_farms.precision import check_precision, simulate
+from offshore_farms.probability import free_stream_wind, probability
+from offshore_farms.pruning import pruned_power_P
+
+hours_pr_year = 24 * 365
+
+
+def free_stream_power(wfm, lw, kwargs_ilk):
+    """Power of the wind turbines at the local free-stream wind speed [W]
+
+    The power is evaluated on the free-stream wind speed of the local wind, which for uniform sites only
+    depends on the wind speed (and wind turbine type), instead of on the full (wt, wd, ws) grid
+    """
+    return wfm.windTurbines.power(ws=lw.WS_ilk, **wfm.get_wt_kwargs(lw.TI_ilk, kwargs_ilk))
+
+
+def aep_report(farm, wake_model=None, wd=None, ws=None, cache=None, n_workers=1, memory_GB=None, parallel='process',
+               max_wake_distance=None, wake_cone_k=None, adaptive_rtol=None, precision='float64', **kwargs):
+    """AEP with and without wake loss of a wind farm from a single simulation
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm, see offshore_farms.get_farm
+    wake_model : WindFarmModel class, optional
+        Wind farm model, default is NOJ
+    wd, ws : array_like, optional
+        Wind directions and wind speeds. Default is the default grid of the site
+    cache : AEPCache or bool, optional
+        If True or an AEPCache, the report is looked up in and stored in the cache (True: default_cache()).
+        Default is no caching
+    n_workers : int, optional
+        Number of wind direction chunks simulated in parallel, see offshore_farms.chunking
+    memory_GB : float or None, optional
+        Memory budget of the simulation. If specified, the wind directions are simulated in as many chunks as needed
+        to keep the estimated memory within the budget, see offshore_farms.chunking.n_wd_chunks
+    parallel : {'process', 'thread'}
+        Run parallel chunks in worker processes (default) or threads
+    max_wake_distance : float or None, optional
+        If specified, wakes beyond this distance [m] are neglected and wind turbine clusters that cannot interact
+        are simulated independently, see offshore_farms.pruning
+    wake_cone_k : float or None, optional
+        Wake expansion coefficient of the wake cone used with max_wake_distance. Default is the expansion coefficient
+        of the NOJ deficit of the wind farm model, or 0.1 for other deficit models, see offshore_farms.pruning
+    adaptive_rtol : float or None, optional
+        If specified, only a subset of the wind directions, refined until the AEP changes less than about
+        adaptive_rtol (relative), is simulated and the wake losses are interpolated to the full grid,
+        see offshore_farms.adaptive
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulation. The AEP is accumulated in float64, see offshore_farms.precision
+    kwargs : dict
+        Additional arguments for the wind farm model call, e.g. n_cpu and wd_chunks
+
+    Returns
+    -------
+    xarray Dataset with
+        AEP : (wt, wd) AEP including wake loss [GWh]
+        AEP_gross : (wt, wd) AEP without wake loss [GWh]
+        aep, aep_gross, wake_loss : total AEP, AEP without wake loss and wake loss [GWh]
+    The per turbine and per sector breakdowns are e.g. AEP.sum('wd') and AEP.sum('wt')
+    """
+    check_precision(precision)
+    if cache is True:
+        cache = default_cache()
+    if cache:
+        # the approximations are part of the key
+        approximations = {'max_wake_distance': max_wake_distance, 'wake_cone_k': wake_cone_k,
+                          'adaptive_rtol': adaptive_rtol,
+                          'precision': None if precision == 'float64' else precision}
+        key = cache_key(farm, wake_model, wd, ws, **kwargs,
+                        **{k: v for k, v in approximations.items() if v is not None})
+        report = cache.get(key)
+        if report is not None:
+            return report
+
+    wfm = farm.wind_farm_model(wake_model)
+    if max_wake_distance is not None:
+        report = _split_report(farm, wfm, wd, ws, kwargs, pruned_power_P, wake_model, max_distance=max_wake_distance,
+                               k=wake_cone_k, precision=precision)
+    elif adaptive_rtol is not None:
+        report = _split_report(farm, wfm, wd, ws, kwargs, adaptive_power_P, wake_model, rtol=adaptive_rtol,
+                               precision=precision)
+    elif n_workers == 1 and memory_GB is None:
+        _, _, power_ilk, _, lw, kwargs_ilk = simulate(wfm, farm.x, farm.y, precision, type=farm.type, wd=wd, ws=ws,
+                                                      **kwargs)
+        wd, ws = farm.site.get_defaults(wd, ws)
+        P_ilk = probability(farm.site, wd, ws, farm.x, farm.y, farm.windTurbines.hub_height(kwargs_ilk['type_i']))
+        with profiling.stage('aggregation', power_ilk.shape):
+            power_P_il = (power_ilk * P_ilk).sum(2, dtype=float)
+        report = make_report(farm, wd, P_ilk, power_P_il, free_stream_power(wfm, lw, kwargs_ilk))
+    else:
+        report = _split_report(farm, wfm, wd, ws, kwargs, chunked_power_P, wake_model,
+                               memory_GB=memory_GB, n_workers=n_workers, parallel=parallel, precision=precision)
+    if cache:
+        cache.put(key, report)
+    return report
+
+
+def _split_report(farm, wfm, wd, ws, kwargs, power_P_func, wake_model, **options):
+    # Report from simulations of parts of the wind directions and/or wind turbines, <power_P_func>
+    if execution_kwargs & set(kwargs) - {'verbose'}:
+        raise ValueError("n_cpu, wd_chunks and ws_chunks cannot be combined with n_workers, memory_GB, "
+                         "max_wake_distance and adaptive_rtol")
+    # The probabilities of the full grid are used, as the wind direction bin size, and thereby the probability, of a
+    # part alone may differ from the bin size of the full grid
+    wd, ws = farm.site.get_defaults(wd, ws)
+    type_i = np.zeros(len(farm.x), dtype=int) + farm.type
+    h_i = farm.windTurbines.hub_height(type_i)
+    P_ilk = probability(farm.site, wd, ws, farm.x, farm.y, h_i)
+    lw = free_stream_wind(farm.site, farm.x, farm.y, h_i, wd, ws)
+    kwargs_ilk = {'type_i': type_i, **{k + '_ilk': v for k, v in kwargs.items() if k not in execution_kwargs}}
+    power_P_il = power_P_func(farm, wake_model, wd, ws, P_ilk, **options, **kwargs)
+    return make_report(farm, wd, P_ilk, power_P_il, free_stream_power(wfm, lw, kwargs_ilk))
+
+
+def make_report(farm, wd, P_ilk, power_P_il, power_gross_ilk):
+    """aep_report Dataset of <farm> from the probabilities, P_ilk, of the wind directions, wd, the sum over wind
+    speeds of the power times probability, power_P_il [W], and the free-stream power, power_gross_ilk [W]"""
+    with profiling.stage('aggregation', np.shape(power_gross_ilk)):
+        aep_il = power_P_il * hours_pr_year * 1e-9
+        aep_gross_il = np.broadcast_to((power_gross_ilk * P_ilk).sum(2, dtype=float),
+                                       aep_il.shape) * hours_pr_year * 1e-9
+    return report_dataset(farm.name, farm.label, farm.x, farm.y, farm.type, np.asarray(wd, dtype=float), aep_il,
+                          aep_gross_il, farm.subfarm_i())
+
+
+def report_dataset(name, label, x, y, type, wd, aep_il, aep_gross_il, subfarm=None):  # @ReservedAssignment
+    """Build the aep_report Dataset from the per turbine and wind direction AEP with and without wake loss"""
+    I = len(x)
+    aep, aep_gross = aep_il.sum(), aep_gross_il.sum()
+    ds = xr.Dataset(
+        data_vars={'AEP': (('wt', 'wd'), aep_il, {'Description': 'Annual energy production [GWh]'}),
+                   'AEP_gross': (('wt', 'wd'), aep_gross_il,
+                                 {'Description': 'Annual energy production without wake loss [GWh]'}),
+                   'aep': ((), aep, {'Description': 'Total annual energy production [GWh]'}),
+                   'aep_gross': ((), aep_gross,
+                                 {'Description': 'Total annual energy production without wake loss [GWh]'}),
+                   'wake_loss': ((), aep_gross - aep, {'Description': 'Wake loss [GWh]'})},
+        coords={'wt': np.arange(I), 'wd': wd,
+                'x': ('wt', x), 'y': ('wt', y), 'type': ('wt', np.zeros(I, dtype=int) + type)},
+        attrs={'farm': name, 'label': label})
+    if subfarm is not None:
+        ds.coords['subfarm'] = ('wt', subfarm)
+    return ds
+
+
+def subfarm_report(report):
+    """AEP, AEP without wake loss and wake loss [GWh] of each subfarm of an aep_report of a farm with subfarms"""
+    aep = report[['AEP', 'AEP_gross']].sum('wd').groupby('subfarm').sum()
+    return xr.Dataset({'aep': aep.AEP, 'aep_gross': aep.AEP_gross, 'wake_loss': aep.AEP_gross - aep.AEP},
+                      attrs=report.attrs)
+
+
+def print_report(report):
+    """Print total AEP and wake loss of an aep_report"""
+    print("Total AEP of %s: %f GWh" % (report.label, report.aep))
+    print('wake loss: %f' % report.wake_loss, 'GWh per year')
+    if 'subfarm' in report.coords:
+        sub = subfarm_report(report)
+        for name in sub.subfarm.values:
+            print("  %s: AEP %f GWh, wake loss %f GWh per year" % (
+                name, sub.aep.sel(subfarm=name), sub.wake_loss.sel(subfarm=name)))
@@ -0,0 +1,242 @@
+"""
+Local HTTP/JSON AEP service.
+
+A long-running process that keeps the farms (sites, wind turbine interpolants and layouts) loaded and answers AEP
+queries over HTTP on localhost:
+
+    python -m offshore_farms.service --port 8765 --preload hornsea2 borsselewfz
+
+    curl -d '{"farm": "hornsea2", "ti": 0.08, "shear": 0.12}' http://127.0.0.1:8765/aep
+    {"farm": "hornsea2", "ti": 0.08, "shear": 0.12, "wake_model": "NOJ", "aep": ..., "aep_gross": ...,
+     "wake_loss": ..., "n_wt": 165, "cached": false, "batch_size": 1}
+
+A query has the fields farm (required), ti (default 0.1), shear (power law exponent, default none), wake_model
+(name in the py_wake namespace, default NOJ), wd or wd_step, ws, and optionally a modified layout, x, y and type.
+GET /farms lists the farms and GET /health returns the number of queries and cache hits.
+
+Answered queries are kept in an LRU result cache. Identical queries in progress are answered by the same
+simulation, and the queries that arrive while a simulation runs are grouped by farm, wake model, grid and layout
+and their turbulence intensities and shear exponents are simulated together as one batched sweep, see
+offshore_farms.sweep. Simulations run one at a time in a background thread, while cached queries are answered
+directly by the HTTP threads. See benchmarks/load_test.py for a load test.
+"""
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import queue
+import threading
+import time
+from py_wake import np
+from offshore_farms.batch import get_wake_model
+from offshore_farms.registry import Farm, farm_names, get_farm
+from offshore_farms.sweep import sweep
+
+
+def normalize(query):
+    """Query dict with defaults and validated, JSON serializable values. Raises ValueError for invalid queries"""
+    if not isinstance(query, dict):
+        raise ValueError("The query must be a JSON object")
+    unknown = set(query) - {'farm', 'ti', 'shear', 'wake_model', 'wd', 'wd_step', 'ws', 'x', 'y', 'type'}
+    if unknown:
+        raise ValueError("Unknown field(s): %s" % ", ".join(sorted(unknown)))
+    if query.get('farm') not in farm_names():
+        raise ValueError("Unknown farm, '%s'. Known farms are: %s" % (query.get('farm'), ", ".join(farm_names())))
+    wake_model = query.get('wake_model') or 'NOJ'
+    get_wake_model(wake_model)
+
+    def floats(k):
+        v = query.get(k)
+        return None if v is None else [float(e) for e in np.atleast_1d(v)]
+    wd = floats('wd')
+    if query.get('wd_step') is not None:
+        if wd is not None:
+            raise ValueError("Specify either wd or wd_step")
+        wd = np.arange(0, 360, float(query['wd_step'])).tolist()
+    x, y = floats('x'), floats('y')
+    if (x is None) != (y is None) or (x is not None and len(x) != len(y)):
+        raise ValueError("x and y must be specified together and have the same length")
+    type_ = query.get('type')
+    return {'farm': query['farm'], 'ti': float(query.get('ti', .1)),
+            'shear': None if query.get('shear') is None else float(query['shear']),
+            'wake_model': wake_model, 'wd': wd, 'ws': floats('ws'), 'x': x, 'y': y,
+            'type': None if type_ is None else np.atleast_1d(type_).astype(int).tolist()}
+
+
+class AEPService():
+    """Warm farms, result cache and batched simulation of AEP queries"""
+
+    def __init__(self, cache_size=10000, max_batch=64, memory_GB=2):
+        """
+        Parameters
+        ----------
+        cache_size : int, optional
+            Number of answered queries kept in the result cache
+        max_batch : int, optional
+            Maximum number of queries simulated together
+        memory_GB : float, optional
+            Memory budget of a batched simulation, see offshore_farms.sweep
+        """
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.memory_GB = memory_GB
+        self.n_queries = self.n_cache_hits = self.n_simulations = 0
+        self._farms = {}
+        self._results = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='aep-service', daemon=True)
+        self._thread.start()
+
+    def farm(self, name):
+        """Farm, <name>, loaded once and kept warm"""
+        if name not in self._farms:
+            self._farms[name] = get_farm(name)
+        return self._farms[name]
+
+    def preload(self, names):
+        """Load the farms and run a small simulation of each, so the first queries are not slowed down"""
+        for name in names:
+            self.query({'farm': name, 'wd': [270], 'ws': [10]})
+
+    def query(self, query, timeout=None):
+        """Result dict of a query (see normalize). Blocks until the result is available"""
+        q = normalize(query)
+        key = json.dumps(q, sort_keys=True)
+        with self._lock:
+            self.n_queries += 1
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.n_cache_hits += 1
+                return {**self._results[key], 'cached': True}
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+                self._queue.put((key, q, future))
+        return future.result(timeout)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # queries that only differ in ti and shear are simulated together
+            groups = {}
+            for item in items:
+                q = item[1]
+                groups.setdefault(json.dumps({k: v for k, v in q.items() if k not in ('ti', 'shear')},
+                                             sort_keys=True), []).append(item)
+            for group in groups.values():
+                try:
+                    results = self._simulate([q for _, q, _ in group])
+                except Exception as e:
+                    for key, _, future in group:
+                        with self._lock:
+                            self._pending.pop(key, None)
+                        future.set_exception(e)
+                    continue
+                for (key, _, future), result in zip(group, results):
+                    with self._lock:
+                        self._results[key] = result
+                        while len(self._results) > self.cache_size:
+                            self._results.popitem(last=False)
+                        self._pending.pop(key, None)
+                    future.set_result({**result, 'cached': False})
+
+    def _simulate(self, queries):
+        q = queries[0]
+        farm = self.farm(q['farm'])
+        if q['x'] is not None:
+            if q['type'] is None and np.ndim(farm.type) and len(farm.type) != len(q['x']):
+                raise ValueError("type must be specified for a layout of %s with another number of wind turbines"
+                                 % farm.name)
+            farm = Farm(farm.name, farm.label, farm.site, farm.windTurbines, np.array(q['x']), np.array(q['y']),
+                        farm.type if q['type'] is None else np.array(q['type']), farm.subfarms)
+        ti = sorted({q['ti'] for q in queries})
+        shear = sorted({q['shear'] or 0. for q in queries})
+        res = sweep(farm, ti, shear, get_wake_model(q['wake_model']), q['wd'], q['ws'], self.memory_GB)
+        self.n_simulations += 1
+        results = []
+        for q in queries:
+            r = res.sel(ti=q['ti'], shear=q['shear'] or 0.)
+            results.append({'farm': q['farm'], 'ti': q['ti'], 'shear': q['shear'], 'wake_model': q['wake_model'],
+                            'aep': float(r.aep), 'aep_gross': float(r.aep_gross),
+                            'wake_loss': float(r.wake_loss), 'n_wt': len(farm.x), 'batch_size': len(queries)})
+        return results
+
+    def status(self):
+        return {'queries': self.n_queries, 'cache_hits': self.n_cache_hits, 'simulations': self.n_simulations,
+                'cached_results': len(self._results), 'farms': sorted(self._farms)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/farms':
+            self._send(200, farm_names())
+        elif self.path == '/health':
+            self._send(200, self.service.status())
+        else:
+            self._send(404, {'error': 'Not found: %s' % self.path})
+
+    def do_POST(self):
+        if self.path != '/aep':
+            self._send(404, {'error': 'Not found: %s' % self.path})
+            return
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+            t = time.perf_counter()
+            result = self.service.query(query)
+            self._send(200, {**result, 'time': time.perf_counter() - t})
+        except (ValueError, TypeError) as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': '%s: %s' % (type(e).__name__, e)})
+
+    def log_message(self, format, *args):  # @ReservedAssignment
+        pass  # no logging of each request
+
+
+def make_server(service, host='127.0.0.1', port=8765):
+    """ThreadingHTTPServer of <service>. Port 0 picks a free port, see server.server_address"""
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.service', description='Local AEP service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-size', type=int, default=10000, help='Number of cached results')
+    parser.add_argument('--preload', nargs='*', default=[], choices=farm_names(), help='Farms loaded at startup')
+    args = parser.parse_args(argv)
+    service = AEPService(args.cache_size)
+    service.preload(args.preload)
+    server = make_server(service, args.host, args.port)
+    print('AEP service listening on http://%s:%d' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Binary storage of the wind turbine layouts and power/Ct curves.
+
+The layouts, (n_wt, 2) x/y positions, and curves, (n, 2) wind speed/value tables, are stored as .npy files in
+offshore_farms/data together with a manifest.json with the format version and the dtype, shape and sha256 hash
+of each file. The files are loaded memory-mapped (read-only), so processes that load the same farm share the
+pages of the file instead of holding their own copies.
+
+The literal values in the farm modules and in offshore_farms/turbines.py are the reference. The registered farms
+and the wind turbines compare the binary data with them when they load it (a few hundred values) and raise
+ValueError if the binary data is stale. After changing the literal values, rebuild and validate the binary data with
+
+    python -m offshore_farms.storage build
+    python -m offshore_farms.storage validate
+
+Layouts of other (e.g. large synthetic) farms can be stored in another directory with save_layout(name, x, y,
+directory) and loaded with load_layout(name, directory).
+"""
+import argparse
+from functools import lru_cache
+import hashlib
+import importlib
+import json
+import os
+import sys
+from py_wake import np
+
+format_version = 1
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+kinds = ('layouts', 'curves')
+
+
+def _manifest_path(directory):
+    return os.path.join(directory, 'manifest.json')
+
+
+@lru_cache(maxsize=None)
+def _manifest(directory, mtime):
+    with open(_manifest_path(directory)) as fid:
+        manifest = json.load(fid)
+    if manifest['version'] != format_version:
+        raise ValueError("Binary data in %s has format version %s, expected %s. Rebuild it with "
+                         "'python -m offshore_farms.storage build'" % (directory, manifest['version'], format_version))
+    return manifest
+
+
+def manifest(directory=None):
+    """Manifest of the binary data in <directory> (default offshore_farms/data)"""
+    directory = directory or data_dir
+    if not os.path.exists(_manifest_path(directory)):
+        return {'version': format_version, **{kind: {} for kind in kinds}}
+    return _manifest(directory, os.path.getmtime(_manifest_path(directory)))
+
+
+def _sha256(path):
+    with open(path, 'rb') as fid:
+        return hashlib.sha256(fid.read()).hexdigest()
+
+
+def save(kind, name, array, directory=None, dtype=float):
+    """Save <array> as <directory>/<kind>/<name>.npy and add it to the manifest"""
+    directory = directory or data_dir
+    os.makedirs(os.path.join(directory, kind), exist_ok=True)
+    path = os.path.join(directory, kind, name + '.npy')
+    array = np.ascontiguousarray(array, dtype=dtype)
+    np.save(path, array)
+    m = manifest(directory)
+    m = {'version': format_version, **{k: dict(m.get(k, {})) for k in kinds}}
+    m[kind][name] = {'file': os.path.join(kind, name + '.npy'), 'dtype': array.dtype.str,
+                     'shape': list(array.shape), 'sha256': _sha256(path)}
+    with open(_manifest_path(directory), 'w') as fid:
+        json.dump(m, fid, indent=1, sort_keys=True)
+        fid.write('\n')
+
+
+def load(kind, name, directory=None, mmap=True, reference=None):
+    """Load <kind>/<name> of the manifest in <directory>, memory-mapped read-only if mmap is True
+
+    Raises ValueError if the array differs from the manifest (dtype and shape) or from <reference>, e.g. the literal
+    values that the binary data was built from
+    """
+    directory = directory or data_dir
+    entries = manifest(directory)[kind]
+    if name not in entries:
+        raise KeyError("No binary %s, '%s', in %s" % (kind[:-1], name, directory))
+    array = np.load(os.path.join(directory, entries[name]['file']), mmap_mode=('r' if mmap else None))
+    if array.dtype.str != entries[name]['dtype'] or list(array.shape) != entries[name]['shape']:
+        raise ValueError("Binary %s, '%s', in %s differs from the manifest" % (kind[:-1], name, directory))
+    if reference is not None:
+        reference = np.asarray(reference, dtype=float)
+        if reference.shape != array.shape or not np.array_equal(array, reference.astype(array.dtype)):
+            raise ValueError("Binary %s, '%s', in %s differs from the literal values. Rebuild it with "
+                             "'python -m offshore_farms.storage build'" % (kind[:-1], name, directory))
+    return array
+
+
+def has_layout(name, directory=None):
+    return name in manifest(directory)['layouts']
+
+
+def save_layout(name, x, y, directory=None, dtype=float):
+    save('layouts', name, np.array([x, y]).T, directory, dtype)
+
+
+def load_layout(name, directory=None, mmap=True, reference=None):
+    """(n_wt, 2) x/y positions of the layout, <name>. Raises ValueError if they differ from <reference>"""
+    return load('layouts', name, directory, mmap, reference)
+
+
+def load_curve(name, directory=None, mmap=True, reference=None):
+    """(n, 2) table of wind speed and value of the curve, <name>, e.g. 'SG8_167_power' or 'SG8_167_ct'. Raises
+    ValueError if it differs from <reference>"""
+    return load('curves', name, directory, mmap, reference)
+
+
+def reference_data():
+    """{(kind, name): array} of the literal layouts and curves of the farm modules and the wind turbine library"""
+    from offshore_farms import registry, turbines
+    data = {}
+    for name, module in registry.farm_modules.items():
+        module = importlib.import_module(module)
+        data['layouts', name] = np.array([module.wt_x, module.wt_y], dtype=float).T
+    for name, (power_curve, ct_curve) in turbines.power_ct_curves.items():
+        data['curves', name + '_power'] = power_curve
+        data['curves', name + '_ct'] = ct_curve
+    return data
+
+
+def build(directory=None, dtype=float):
+    """Write the literal layouts and curves to binary files"""
+    for (kind, name), array in reference_data().items():
+        save(kind, name, array, directory, dtype)
+
+
+def validate(directory=None):
+    """Check the binary data against the manifest and the literal values. Returns a list of problems"""
+    directory = directory or data_dir
+    problems = []
+    m = manifest(directory)
+    for (kind, name), ref in reference_data().items():
+        entry = m[kind].get(name)
+        if entry is None:
+            problems.append('%s/%s: missing' % (kind, name))
+            continue
+        if _sha256(os.path.join(directory, entry['file'])) != entry['sha256']:
+            problems.append('%s/%s: sha256 differs from manifest' % (kind, name))
+        array = load(kind, name, directory)
+        if array.shape != ref.shape or not np.array_equal(array, ref.astype(array.dtype)):
+            problems.append('%s/%s: differs from the literal values' % (kind, name))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or validate the binary layouts and curves')
+    parser.add_argument('command', choices=['build', 'validate'])
+    parser.add_argument('--directory', default=data_dir)
+    parser.add_argument('--dtype', default='float64', choices=['float64', 'float32'], help='dtype used by build')
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        build(args.directory, args.dtype)
+        print('Binary data written to %s' % args.directory)
+    problems = validate(args.directory)
+    for p in problems:
+        print(p)
+    print('%s: %s' % (args.directory, ['ok', '%d problem(s)' % len(problems)][bool(problems)]))
+    return int(bool(problems))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
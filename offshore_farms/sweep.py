@@ -0,0 +1,93 @@
+"""
+Turbulence intensity and shear sensitivity sweeps.
+
+All combinations of the turbulence intensities and shear exponents are simulated as an extra batched dimension
+of one simulation: the wind speed axis is repeated once per combination, and the ambient turbulence intensity and
+the (sheared) hub height wind speed of each repetition are passed to the wind farm model. The layout geometry,
+the Weibull probabilities and the free-stream power are computed once. If the power of the wind farm model does
+not depend on the ambient turbulence intensity (e.g. NOJ), only one turbulence intensity is simulated and the
+result is used for all of them.
+"""
+import xarray as xr
+from py_wake import np
+from offshore_farms.chunking import batched_power_P
+from offshore_farms.probability import probability
+from offshore_farms.registry import shear_h_ref
+from offshore_farms.report import hours_pr_year
+
+
+def ti_dependent(wfm, types=(0,)):
+    """True if the power of a wind turbine in the wake of another depends on the ambient turbulence intensity"""
+    for t in types:
+        D = wfm.windTurbines.diameter(t)
+        power = [wfm([0, 5 * D], [0, 0], type=t, wd=270, ws=[6, 10], TI=ti, return_simulationResult=False)[2]
+                 for ti in [.05, .15]]
+        if not np.array_equal(*power):
+            return True
+    return False
+
+
+def sweep(farm, ti=.1, shear=None, wake_model=None, wd=None, ws=None, memory_GB=2, precision='float64'):
+    """AEP with and without wake loss for all combinations of turbulence intensity and shear exponent
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm, see offshore_farms.get_farm. The turbulence intensity and shear of its site are not used
+    ti : float or array_like
+        Ambient turbulence intensities
+    shear : float, array_like or None
+        Exponents of a power law shear with reference height 100m. None or 0 means no shear
+    wake_model : WindFarmModel class, optional
+        Wind farm model, default is NOJ
+    wd, ws : array_like, optional
+        Wind directions and wind speeds. Default is the default grid of the site
+    memory_GB : float, optional
+        Memory budget. The combinations are simulated in as few simulations as the budget allows
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+
+    Returns
+    -------
+    xarray Dataset with
+        AEP, AEP_gross : (ti, shear, wt) AEP with and without wake loss [GWh]
+        aep, aep_gross, wake_loss : (ti, shear) total AEP, AEP without wake loss and wake loss [GWh]
+    """
+    ti = np.atleast_1d(ti).astype(float)
+    shear = np.atleast_1d(np.where(np.equal(shear, None), 0, shear)).astype(float)
+    wd, ws = farm.site.get_defaults(wd, ws)
+    I, L, K = len(farm.x), len(wd), len(ws)
+    type_i = np.zeros(I, dtype=int) + farm.type
+    h_i = farm.windTurbines.hub_height(type_i)
+    P_ilk = probability(farm.site, wd, ws, farm.x, farm.y, h_i)
+
+    wfm = farm.wind_farm_model(wake_model)
+    ti_sim = ti if ti_dependent(wfm, np.unique(type_i)) else ti[:1]
+    ti_n, shear_n = [v.ravel() for v in np.meshgrid(ti_sim, shear, indexing='ij')]
+    # hub height free-stream wind speed, (wt, combination, ws)
+    WS_ink = ws[np.newaxis, np.newaxis] * (h_i[:, np.newaxis, np.newaxis] / shear_h_ref) ** shear_n[:, np.newaxis]
+
+    def batch_kwargs(n):
+        N = len(ti_n[n])
+        return {'TI': np.repeat(ti_n[n], K)[np.newaxis, np.newaxis], 'WS': WS_ink[:, n].reshape(I, 1, N * K)}
+    aep_in = batched_power_P(farm, wfm, wd, ws, P_ilk, len(ti_n), batch_kwargs, memory_GB, precision).sum(1)
+    power_gross_ink = wfm.windTurbines.power(ws=WS_ink, **wfm.get_wt_kwargs(ti_n[np.newaxis, :, np.newaxis],
+                                                                            {'type_i': type_i}))
+    aep_gross_in = (power_gross_ink * P_ilk.sum(1)[:, np.newaxis]).sum(2)
+
+    def ti_shear_wt(aep_in):
+        aep = (aep_in * hours_pr_year * 1e-9).reshape(I, len(ti_sim), len(shear))
+        return np.broadcast_to(aep, (I, len(ti), len(shear))).transpose(1, 2, 0)
+    AEP, AEP_gross = ti_shear_wt(aep_in), ti_shear_wt(aep_gross_in)
+    aep, aep_gross = AEP.sum(2), AEP_gross.sum(2)
+    return xr.Dataset(
+        data_vars={'AEP': (('ti', 'shear', 'wt'), AEP, {'Description': 'Annual energy production [GWh]'}),
+                   'AEP_gross': (('ti', 'shear', 'wt'), AEP_gross,
+                                 {'Description': 'Annual energy production without wake loss [GWh]'}),
+                   'aep': (('ti', 'shear'), aep, {'Description': 'Total annual energy production [GWh]'}),
+                   'aep_gross': (('ti', 'shear'), aep_gross,
+                                 {'Description': 'Total annual energy production without wake loss [GWh]'}),
+                   'wake_loss': (('ti', 'shear'), aep_gross - aep, {'Description': 'Wake loss [GWh]'})},
+        coords={'ti': ti, 'shear': shear, 'wt': np.arange(I), 'x': ('wt', farm.x), 'y': ('wt', farm.y),
+                'type': ('wt', type_i)},
+        attrs={'farm': farm.name, 'label': farm.label})
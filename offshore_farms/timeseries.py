@@ -0,0 +1,298 @@
+"""
+AEP and hourly farm output from long time series of wind direction, wind speed and turbulence intensity.
+
+The records are consumed in chunks of a fixed number of records from a generator, so the full record is never in
+memory. read_chunks reads .npy files (memory mapped) with the columns wd, ws and optionally ti, or CSV files with
+a header of (at least) the columns wd and ws, and optionally ti and time, which is passed through to the output:
+
+    python -m offshore_farms.timeseries hornsea2 met_20y.csv --chunk-size 8760 --output hornsea2_hourly.csv
+
+Long records repeat the same conditions many times, so identical records (same wd, ws and TI) form one bin that is
+simulated once, in PyWake's time series mode (one flow case per bin) in batches within a memory budget. The result
+is the same as simulating every record. Optionally, the records are binned more coarsely (e.g. 1 deg, 0.1 m/s and
+0.01 TI, the values of a bin are its centre), which approximates the records by fewer bins. The power of each wind
+turbine of the simulated bins is kept in an LRU cache of at most max_bins bins, so later chunks only simulate bins
+that were not seen before. Records with missing values (NaN) produce no output and are excluded from the AEP, which
+is the mean power of the valid records times the hours of a year.
+
+Without a record file, --synthetic n generates n records from the Weibull distributions of the site, e.g. to
+compare with the AEP of the wind rose (aep_report):
+
+    python -m offshore_farms.timeseries borkumriffgrund2 --synthetic 175320 --seed 1
+"""
+import argparse
+import csv
+import itertools
+import sys
+import time
+import numpy
+import xarray as xr
+from py_wake import np
+from offshore_farms.cache import LRUCache
+from offshore_farms.chunking import n_per_simulation
+from offshore_farms.precision import check_precision, precisions, simulate
+from offshore_farms.report import free_stream_power, hours_pr_year
+
+record_columns = ('wd', 'ws', 'ti')
+
+
+def array_chunks(records, chunk_size=8760):
+    """Yield chunks, {'wd', 'ws'[, 'ti']: array}, of a (record, 2 or 3) array with the columns wd, ws[, ti] or a
+    structured array with these fields. Memory mapped arrays are read one chunk at a time"""
+    for s in range(0, len(records), chunk_size):
+        block = records[s:s + chunk_size]
+        if block.dtype.names:
+            yield {k: np.array(block[k], dtype=float) for k in record_columns if k in block.dtype.names}
+        else:
+            block = np.array(block, dtype=float)
+            yield {k: block[:, c] for c, k in enumerate(record_columns[:block.shape[1]])}
+
+
+def row_chunks(rows, chunk_size=8760):
+    """Yield chunks of an iterable of (wd, ws[, ti]) rows, e.g. a generator"""
+    rows = iter(rows)
+    while True:
+        block = list(itertools.islice(rows, chunk_size))
+        if not block:
+            return
+        yield from array_chunks(np.array(block, dtype=float), chunk_size)
+
+
+def read_chunks(filename, chunk_size=8760):
+    """Yield chunks of a .npy file (see array_chunks) or a CSV file with the columns wd, ws[, ti][, time]"""
+    if filename.endswith('.npy'):
+        yield from array_chunks(np.load(filename, mmap_mode='r'), chunk_size)
+        return
+    with open(filename, newline='') as fid:
+        reader = csv.DictReader(fid)
+        columns = {c.strip().lower(): c for c in reader.fieldnames or []}
+        if not {'wd', 'ws'} <= set(columns):
+            raise ValueError("%s must have the columns wd and ws" % filename)
+
+        def value(v):
+            return float(v) if v not in ('', None) else np.nan
+        while True:
+            block = list(itertools.islice(reader, chunk_size))
+            if not block:
+                return
+            chunk = {k: np.array([value(r[columns[k]]) for r in block]) for k in record_columns if k in columns}
+            if 'time' in columns:
+                chunk['time'] = np.array([r[columns['time']] for r in block])
+            yield chunk
+
+
+def weibull_chunks(site, n_records, chunk_size=8760, seed=None):
+    """Yield chunks of n_records random records from the sector frequencies and Weibull distributions of <site>"""
+    rng = np.random.default_rng(seed)
+    ds = site.ds
+    sector_wd = ds.wd.values[:-1] if ds.wd.values[-1] == 360 else ds.wd.values
+    freq = ds.Sector_frequency.sel(wd=sector_wd).values
+    A, k = ds.Weibull_A.sel(wd=sector_wd).values, ds.Weibull_k.sel(wd=sector_wd).values
+    width = 360 / len(sector_wd)
+    ti = float(ds.TI.values) if 'TI' in ds else .1
+    for s in range(0, n_records, chunk_size):
+        n = min(chunk_size, n_records - s)
+        sector = rng.choice(len(sector_wd), n, p=freq / freq.sum())
+        wd = (sector_wd[sector] + rng.uniform(-width / 2, width / 2, n)) % 360
+        yield {'wd': wd, 'ws': A[sector] * rng.weibull(k[sector]), 'ti': np.full(n, ti)}
+
+
+def _quantize(v, resolution):
+    return v if not resolution else np.round(v / resolution) * resolution
+
+
+def timeseries_power(farm, chunks, wake_model=None, wd_resolution=None, ws_resolution=None, ti_resolution=None,
+                     memory_GB=1, precision='float64', max_bins=100000, info=None):
+    """Yield the power of each chunk of records as an xarray Dataset
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm, see offshore_farms.get_farm
+    chunks : iterable
+        Chunks of records, {'wd', 'ws'[, 'ti'][, 'time']: array}, see read_chunks. Without ti, the turbulence
+        intensity of the site is used
+    wake_model : WindFarmModel class, optional
+        Wind farm model, default is NOJ
+    wd_resolution, ws_resolution, ti_resolution : float or None, optional
+        Bin sizes of the records, e.g. 1, .1 and .01. None or 0 (default): no binning, only identical records are
+        simulated once
+    memory_GB : float, optional
+        Memory budget of a simulation of the new bins of a chunk
+    precision : {'float64', 'float32'}
+        Floating point precision of the simulations, see offshore_farms.precision
+    max_bins : int, optional
+        Max number of bins kept in the cache. The least recently used bins are evicted when exceeded
+    info : dict, optional
+        If specified, the number of records, valid records, bins of the chunks ('bins') and simulated bins
+        ('simulated_bins') are updated in it
+
+    Yields
+    ------
+    xarray Dataset, (time, wt), with the variables
+        Power : Power of each wind turbine [W] (float32)
+        power, power_gross : Power of the farm with and without wake loss [W]
+        wd, ws, ti : values of the records
+    The time coordinate is the time column of the records if present, otherwise the record number
+    """
+    check_precision(precision)
+    info = {} if info is None else info
+    for k in ['records', 'valid_records', 'bins', 'simulated_bins']:
+        info.setdefault(k, 0)
+    I = len(farm.x)
+    wfm = farm.wind_farm_model(wake_model)
+    site_ti = float(farm.site.ds.TI.values) if 'TI' in farm.site.ds and farm.site.ds.TI.size == 1 else None
+    cache = LRUCache(max_bins)
+    n_per_sim = n_per_simulation(I, 1, 1, memory_GB, precision)
+    start = 0
+    for chunk in chunks:
+        wd, ws = np.asarray(chunk['wd'], dtype=float), np.asarray(chunk['ws'], dtype=float)
+        T = len(wd)
+        if 'ti' in chunk:
+            ti = np.asarray(chunk['ti'], dtype=float)
+        elif site_ti is not None:
+            ti = np.full(T, site_ti)
+        else:
+            raise ValueError("The records must have a ti column, as the site has no scalar TI")
+        valid = np.isfinite(wd) & np.isfinite(ws) & np.isfinite(ti)
+        bins_t = np.array([_quantize(wd[valid] % 360, wd_resolution) % 360, _quantize(ws[valid], ws_resolution),
+                           _quantize(ti[valid], ti_resolution)]).T
+        bins, inverse = np.unique(bins_t, axis=0, return_inverse=True)
+        keys = [b.tobytes() for b in bins]
+        new = [u for u, key in enumerate(keys) if key not in cache]
+        simulated = {}
+        for s in range(0, len(new), n_per_sim):
+            u = np.array(new[s:s + n_per_sim])
+            wd_u, ws_u, ti_u = bins[u].T
+            _, _, power_ilk, _, lw, kwargs_ilk = simulate(wfm, farm.x, farm.y, precision, type=farm.type, wd=wd_u,
+                                                          ws=ws_u, time=True, TI=ti_u)
+            gross_ilk = np.broadcast_to(free_stream_power(wfm, lw, kwargs_ilk), power_ilk.shape)
+            for j, uj in enumerate(u):
+                simulated[keys[uj]] = (numpy.asarray(power_ilk[:, j, 0], dtype=numpy.float32),
+                                   float(gross_ilk[:, j, 0].sum(dtype=float)))
+        # look up the bins before caching the new ones, so the bins of this chunk are not evicted while in use
+        power_ui = np.zeros((len(bins), I), dtype=numpy.float32)
+        gross_u = np.zeros(len(bins))
+        for u, key in enumerate(keys):
+            power_ui[u], gross_u[u] = simulated[key] if key in simulated else cache.get(key)
+        for key, value in simulated.items():
+            cache.put(key, value)
+
+        power_ti = np.full((T, I), np.nan, dtype=numpy.float32)
+        power_ti[valid] = power_ui[inverse.ravel()]
+        gross_t = np.full(T, np.nan)
+        gross_t[valid] = gross_u[inverse.ravel()]
+        info['records'] += T
+        info['valid_records'] += int(valid.sum())
+        info['bins'] += len(bins)
+        info['simulated_bins'] += len(new)
+        t = chunk['time'] if 'time' in chunk else np.arange(start, start + T)
+        start += T
+        yield xr.Dataset(
+            data_vars={'Power': (('time', 'wt'), power_ti, {'Description': 'Power [W]'}),
+                       'power': ('time', power_ti.sum(1, dtype=float), {'Description': 'Farm power [W]'}),
+                       'power_gross': ('time', gross_t, {'Description': 'Farm power without wake loss [W]'}),
+                       'wd': ('time', wd), 'ws': ('time', ws), 'ti': ('time', ti)},
+            coords={'time': t, 'wt': np.arange(I)})
+
+
+def timeseries_aep(farm, chunks, wake_model=None, output=None, info=None, **kwargs):
+    """AEP with and without wake loss of the records, optionally writing the hourly farm output to a CSV file
+
+    Parameters
+    ----------
+    farm : Farm
+        Wind farm, see offshore_farms.get_farm
+    chunks : iterable
+        Chunks of records, see read_chunks and timeseries_power
+    wake_model : WindFarmModel class, optional
+        Wind farm model, default is NOJ
+    output : str, optional
+        CSV file with the time, wd, ws, ti and farm power with and without wake loss [MW] of each record
+    info : dict, optional
+        Updated with the record and bin counts, see timeseries_power
+    kwargs : dict
+        Additional arguments for timeseries_power, e.g. the bin resolutions
+
+    Returns
+    -------
+    xarray Dataset with the variables
+        AEP : (wt) Annual energy production [GWh]
+        aep, aep_gross, wake_loss : Total AEP with and without wake loss and wake loss [GWh]
+    """
+    info = {} if info is None else info
+    energy_i, energy_gross = np.zeros(len(farm.x)), 0.
+    fid = open(output, 'w', newline='') if output else None
+    try:
+        if fid:
+            writer = csv.writer(fid)
+            writer.writerow(['time', 'wd', 'ws', 'ti', 'power [MW]', 'power_gross [MW]'])
+        for ds in timeseries_power(farm, chunks, wake_model, info=info, **kwargs):
+            energy_i += np.nansum(ds.Power.values, 0, dtype=float)
+            energy_gross += np.nansum(ds.power_gross.values)
+            if fid:
+                power = np.where(np.isnan(ds.power_gross.values), np.nan, ds.power.values)
+                writer.writerows(zip(ds.time.values, ds.wd.values, ds.ws.values, ds.ti.values,
+                                     np.round(power * 1e-6, 4), np.round(ds.power_gross.values * 1e-6, 4)))
+    finally:
+        if fid:
+            fid.close()
+    if info['valid_records'] == 0:
+        raise ValueError("No valid records")
+    aep_i = energy_i / info['valid_records'] * hours_pr_year * 1e-9
+    res = xr.Dataset(
+        data_vars={'AEP': ('wt', aep_i, {'Description': 'Annual energy production [GWh]'})},
+        coords={'wt': np.arange(len(farm.x)), 'x': ('wt', farm.x), 'y': ('wt', farm.y),
+                'type': ('wt', np.zeros(len(farm.x), dtype=int) + farm.type)},
+        attrs={'farm': farm.name, 'label': farm.label, **info})
+    res['aep'] = ((), aep_i.sum(), {'Description': 'Total annual energy production [GWh]'})
+    res['aep_gross'] = ((), energy_gross / info['valid_records'] * hours_pr_year * 1e-9,
+                        {'Description': 'Total annual energy production without wake loss [GWh]'})
+    res['wake_loss'] = res.aep_gross - res.aep
+    res['wake_loss'].attrs['Description'] = 'Wake loss [GWh]'
+    return res
+
+
+def main(argv=None):
+    from offshore_farms.batch import get_wake_model
+    from offshore_farms.registry import farm_names, get_farm
+    parser = argparse.ArgumentParser(prog='python -m offshore_farms.timeseries',
+                                     description='AEP and hourly output of a wind farm from a time series of records')
+    parser.add_argument('farm', choices=farm_names())
+    parser.add_argument('records', nargs='?', default=None, help='.npy or CSV file with the columns wd, ws[, ti]')
+    parser.add_argument('--synthetic', type=int, default=None,
+                        help='Number of random records from the Weibull distributions of the site (without records)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=8760, help='Number of records per chunk')
+    parser.add_argument('--wake-model', default=None, help='Default: NOJ')
+    parser.add_argument('--wd-resolution', type=float, default=0,
+                        help='Wind direction bin size, e.g. 1. Default: 0, identical records are simulated once')
+    parser.add_argument('--ws-resolution', type=float, default=0, help='Wind speed bin size, e.g. 0.1. Default: 0')
+    parser.add_argument('--ti-resolution', type=float, default=0, help='TI bin size, e.g. 0.01. Default: 0')
+    parser.add_argument('--memory-GB', type=float, default=1, help='Memory budget of a simulation')
+    parser.add_argument('--precision', default='float64', choices=precisions,
+                        help='Floating point precision of the simulations')
+    parser.add_argument('--output', default=None, help='CSV file of the hourly farm output')
+    args = parser.parse_args(argv)
+    if (args.records is None) == (args.synthetic is None):
+        parser.error('Specify either a records file or --synthetic')
+
+    farm = get_farm(args.farm)
+    if args.records:
+        chunks = read_chunks(args.records, args.chunk_size)
+    else:
+        chunks = weibull_chunks(farm.site, args.synthetic, args.chunk_size, args.seed)
+    info = {}
+    t = time.perf_counter()
+    res = timeseries_aep(farm, chunks, args.wake_model and get_wake_model(args.wake_model), args.output, info,
+                         wd_resolution=args.wd_resolution, ws_resolution=args.ws_resolution,
+                         ti_resolution=args.ti_resolution, memory_GB=args.memory_GB, precision=args.precision)
+    print('%s: AEP %.2f GWh, gross %.2f GWh, wake loss %.2f GWh' % (farm.label, res.aep, res.aep_gross,
+                                                                   res.wake_loss))
+    print('%(valid_records)d of %(records)d records valid, %(simulated_bins)d bins simulated' % info +
+          ' in %.1f s' % (time.perf_counter() - t))
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
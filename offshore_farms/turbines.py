@@ -0,0 +1,203 @@
+"""
+Library of the wind turbines used in the wind farm models.
+The power and Ct curves are defined once here and each PowerCtTabular interpolant is only built once per process,
+so all wind farms with the same wind turbine share it.
+"""
+from functools import lru_cache
+from py_wake import np
+from py_wake.wind_turbines import WindTurbine
+from py_wake.wind_turbines.power_ct_functions import PowerCtTabular
+from offshore_farms import storage
+
+#This is the power curve of the SG8.0-167 DD wind turbine
+sg8_167_power_curve = np.array([[3.0, 0.0],
+                                [4.0, 169.0],
+                                [5.0, 593.0],
+                                [6.0, 1307.0],
+                                [7.0, 2186.0],
+                                [8.0, 3278.0],
+                                [9.0, 4687.0],
+                                [10.0, 6112.0],
+                                [11.0, 7249.0],
+                                [12.0, 7795.0],
+                                [13.0, 7947.0],
+                                [14.0, 8000.0],
+                                [15.0, 8000.0],
+                                [16.0, 8000.0],
+                                [17.0, 8000.0],
+                                [18.0, 8000.0],
+                                [19.0, 8000.0],
+                                [20.0, 8000.0],
+                                [21.0, 8000.0],
+                                [22.0, 8000.0],
+                                [23.0, 8000.0],
+                                [24.0, 8000.0],
+                                [25.0, 8000.0]]) * [1, 1000]
+
+#This is the power curve of the V164-8 MW wind turbine
+v164_8mw_power_curve = np.array([[3.0, 0.0],
+                                 [4.0, 100.0],
+                                 [5.0, 650.0],
+                                 [6.0, 1150.0],
+                                 [7.0, 1850.0],
+                                 [8.0, 2900.0],
+                                 [9.0, 4150.0],
+                                 [10.0, 5600.0],
+                                 [11.0, 7100.0],
+                                 [12.0, 7800.0],
+                                 [13.0, 8000.0],
+                                 [14.0, 8000.0],
+                                 [15.0, 8000.0],
+                                 [16.0, 8000.0],
+                                 [17.0, 8000.0],
+                                 [18.0, 8000.0],
+                                 [19.0, 8000.0],
+                                 [20.0, 8000.0],
+                                 [21.0, 8000.0],
+                                 [22.0, 8000.0],
+                                 [23.0, 8000.0],
+                                 [24.0, 8000.0],
+                                 [25.0, 8000.0]]) * [1, 1000]
+
+#This is the power curve of the V164-9.5 MW wind turbine
+v164_9_5mw_power_curve = np.array([[3.0, 0.0],
+                                   [4.0, 249.0],
+                                   [5.0, 613.0],
+                                   [6.0, 1226.0],
+                                   [7.0, 2030.0],
+                                   [8.0, 3123.0],
+                                   [9.0, 4444.0],
+                                   [10.0, 5900.0],
+                                   [11.0, 7299.0],
+                                   [12.0, 8601.0],
+                                   [13.0, 9272.0],
+                                   [14.0, 9500.0],
+                                   [15.0, 9500.0],
+                                   [16.0, 9500.0],
+                                   [17.0, 9500.0],
+                                   [18.0, 9500.0],
+                                   [19.0, 9500.0],
+                                   [20.0, 9500.0],
+                                   [21.0, 9500.0],
+                                   [22.0, 9500.0],
+                                   [23.0, 9500.0],
+                                   [24.0, 9500.0],
+                                   [25.0, 9500.0]]) * [1, 1000]
+
+#As the Ct-curves of the SG8.0-167 DD and V164-8 MW wind turbines wasnt accessible, a reference Ct-curve was used.
+#The Ct-curve used was the one of the LW 8 MW reference wind turbine, which is a wind turbine model based on the similarly sized Vestas V164-8 MW wind turbine.
+#Description of an 8 MW reference wind turbine: https://iopscience.iop.org/article/10.1088/1742-6596/753/9/092013#references
+lw8mw_ct_curve = np.array([[3, 0.0],
+                           [4, 0.92],
+                           [5, 0.85],
+                           [6, 0.82],
+                           [7, 0.80],
+                           [8, 0.78],
+                           [9, 0.76],
+                           [10, 0.73],
+                           [11, 0.67],
+                           [12, 0.52],
+                           [13, 0.39],
+                           [14, 0.30],
+                           [15, 0.24],
+                           [16, 0.19],
+                           [17, 0.16],
+                           [18, 0.14],
+                           [19, 0.12],
+                           [20, 0.10],
+                           [21, 0.09],
+                           [22, 0.08],
+                           [23, 0.07],
+                           [24, 0.06],
+                           [25, 0.05],
+                           ])
+
+#Reference Ct-curve from the DTU 10 MW turbine
+#As the Ct-curve of the V164-9.5 MW wind turbine wasnt accessible a reference Ct-curve from a similar sized wind turbine already in PyWake was used.
+dtu10mw_ct_curve = np.array([[3, 0.0],
+                             [4, 0.923],
+                             [5, 0.919],
+                             [6, 0.904],
+                             [7, 0.858],
+                             [8, 0.814],
+                             [9, 0.814],
+                             [10, 0.814],
+                             [11, 0.814],
+                             [12, 0.577],
+                             [13, 0.419],
+                             [14, 0.323],
+                             [15, 0.259],
+                             [16, 0.211],
+                             [17, 0.175],
+                             [18, 0.148],
+                             [19, 0.126],
+                             [20, 0.109],
+                             [21, 0.095],
+                             [22, 0.084],
+                             [23, 0.074],
+                             [24, 0.066],
+                             [25, 0.059],
+                             ])
+
+# (power curve, Ct curve) of each wind turbine
+power_ct_curves = {'SG8_167': (sg8_167_power_curve, lw8mw_ct_curve),
+                   'V164_8MW': (v164_8mw_power_curve, lw8mw_ct_curve),
+                   'V164_9_5MW': (v164_9_5mw_power_curve, dtu10mw_ct_curve)}
+
+
+@lru_cache(maxsize=None)
+def power_ct_function(name, method='linear'):
+    """PowerCtTabular of the wind turbine, <name>. The interpolant is built once per process and shared
+
+    Parameters
+    ----------
+    name : {'SG8_167', 'V164_8MW', 'V164_9_5MW'}
+        Key in power_ct_curves
+    method : {'linear', 'pchip'}
+        linear(fast) or pchip(smooth and gradient friendly) interpolation
+    """
+    # memory-mapped binary copies of power_ct_curves (ValueError if they are stale), see offshore_farms.storage
+    power_curve, ct_curve = [storage.load_curve(name + suffix, reference=curve)
+                             for suffix, curve in zip(['_power', '_ct'], power_ct_curves[name])]
+    ws, power, ct = power_curve[:, 0], power_curve[:, 1], ct_curve[:, 1]
+    if method == 'pchip':
+        # Constant values outside the table, as the linear method, instead of extrapolating the end polynomials,
+        # which gives Ct from -1 to 6.6 in [0, 30] m/s, e.g. for wake affected wind speeds below the first point
+        ws, power, ct = np.r_[0, ws, 100], np.r_[power[0], power, power[-1]], np.r_[ct[0], ct, ct[-1]]
+    return PowerCtTabular(ws, power, 'w', ct, method=method)
+
+
+class SG8_167(WindTurbine):
+    def __init__(self, method='linear'):
+        """
+        Parameters
+        ----------
+        method : {'linear', 'pchip'}
+            linear(fast) or pchip(smooth and gradient friendly) interpolation
+        """
+        WindTurbine.__init__(self, name='SG8_167', diameter=167, hub_height=116,
+                             powerCtFunction=power_ct_function('SG8_167', method))
+
+
+class V164_8MW(WindTurbine):
+    def __init__(self, method='linear'):
+        """
+        Parameters
+        ----------
+        method : {'linear', 'pchip'}
+            linear(fast) or pchip(smooth and gradient friendly) interpolation
+        """
+        WindTurbine.__init__(self, name='V164', diameter=164, hub_height=105,
+                             powerCtFunction=power_ct_function('V164_8MW', method))
+
+
+class V164_9_5MW(WindTurbine):
+    def __init__(self, method='linear'):
+        """
+        Parameters
+        ----------
+        method : {'linear', 'pchip'}
+            linear(fast) or pchip(smooth and gradient friendly) interpolation
+        """
+        WindTurbine.__init__(self, name='V164', diameter=164, hub_height=109,
+                             powerCtFunction=power_ct_function('V164_9_5MW', method))
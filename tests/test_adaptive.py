@@ -0,0 +1,29 @@
+import numpy as np
+from offshore_farms import get_farm
+from offshore_farms.adaptive import adaptive_power_P, initial_nodes
+from offshore_farms.probability import probability
+from offshore_farms.report import aep_report
+
+wd = np.arange(360)
+ws = np.arange(4, 25, 2)
+
+
+def test_adaptive_within_tolerance():
+    farm = get_farm('borkumriffgrund2')
+    full = aep_report(farm, wd=wd, ws=ws)
+    adaptive = aep_report(farm, wd=wd, ws=ws, adaptive_rtol=1e-3)
+    np.testing.assert_allclose(adaptive.aep, full.aep, rtol=1e-3)
+    np.testing.assert_allclose(adaptive.aep_gross, full.aep_gross, rtol=1e-10)
+
+
+def test_adaptive_simulates_subset():
+    farm = get_farm('borkumriffgrund2')
+    info = {}
+    power_P_il = adaptive_power_P(farm, None, wd, ws, probability(farm.site, wd, ws), rtol=1e-3, info=info)
+    assert power_P_il.shape == (len(farm.x), len(wd))
+    assert 0 < info['flow_cases'] < len(wd) * len(ws)
+
+
+def test_initial_nodes():
+    np.testing.assert_array_equal(initial_nodes(10, 4, True), [0, 4, 8])
+    np.testing.assert_array_equal(initial_nodes(10, 4, False), [0, 4, 8, 9])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.batch import _worker_farm, get_wake_model, run_batch, scenario_matrix
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_scenario_matrix():
+    scenarios = scenario_matrix(['hornsea2', 'borkumriffgrund2'], ('NOJ', 'BastankhahGaussian'), (.06, .1), (None,))
+    assert len(scenarios) == 8
+    assert scenarios[0] == {'farm': 'hornsea2', 'wake_model': 'NOJ', 'ti': .06, 'shear': None}
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_batch_equals_aep_report(workers):
+    scenarios = scenario_matrix(['borkumriffgrund2', 'borssele3and4'], ti=(.06, .1), shear=(None, .1))
+    rows = sorted(run_batch(scenarios, workers, wd=wd, ws=ws), key=lambda r: r['scenario'])
+    assert [r['scenario'] for r in rows] == list(range(len(scenarios)))
+    for row, s in zip(rows, scenarios):
+        ref = aep_report(get_farm(s['farm'], s['ti'], s['shear']), wd=wd, ws=ws)
+        np.testing.assert_allclose(row['aep'], ref.aep, rtol=1e-10)
+        np.testing.assert_allclose(row['wake_loss_pct'], ref.wake_loss / ref.aep_gross * 100, rtol=1e-10)
+
+
+def test_worker_model_reuse():
+    scenarios = scenario_matrix(['borkumriffgrund2'], ('NOJ', 'NOJLocal'))
+    list(run_batch(scenarios, 1, wd=wd, ws=ws))
+    farm = _worker_farm('borkumriffgrund2', .1, None)
+    wfm = farm.wind_farm_model(get_wake_model('NOJ'))
+    list(run_batch(scenarios, 1, wd=wd, ws=ws))
+    assert farm.wind_farm_model(get_wake_model('NOJ')) is wfm
+    assert len(farm._models) == 2
+
+
+def test_unknown_wake_model():
+    with pytest.raises(ValueError):
+        get_wake_model('Unknown')
+    with pytest.raises(ValueError):
+        list(run_batch(scenario_matrix(['hornsea2'], ['np']), 1))
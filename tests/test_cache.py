@@ -0,0 +1,101 @@
+import os
+import numpy as np
+from py_wake import BastankhahGaussian
+from offshore_farms import get_farm
+from offshore_farms.cache import AEPCache, LRUCache, cache_key
+from offshore_farms.probability import ProbabilityTables, probability
+from offshore_farms.registry import Farm
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_aep_cache_hit_and_miss(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    cache = AEPCache(str(tmp_path))
+    key = cache_key(farm, None, wd, ws)
+    assert cache.get(key) is None
+    report = aep_report(farm, wd=wd, ws=ws, cache=cache)
+    assert os.listdir(tmp_path) == [key + '.npz']
+    cached = aep_report(farm, wd=wd, ws=ws, cache=cache)
+    np.testing.assert_array_equal(cached.AEP.values, report.AEP.values)
+    # the cached report is a copy
+    cached.AEP[:] = 0
+    assert cache.get(key).aep == report.aep
+
+    # a new cache instance loads the report from disk
+    from_disk = AEPCache(str(tmp_path)).get(key)
+    np.testing.assert_array_equal(from_disk.AEP.values, report.AEP.values)
+    np.testing.assert_array_equal(from_disk.x.values, report.x.values)
+    assert from_disk.farm == report.farm
+
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+    assert cache.get(key) is None
+
+
+def test_cache_key_sensitivity():
+    farm = get_farm('borkumriffgrund2')
+    key = cache_key(farm, None, wd, ws)
+    assert cache_key(get_farm('borkumriffgrund2'), None, wd, ws) == key
+    # execution arguments do not change the result
+    assert cache_key(farm, None, wd, ws, n_cpu=2) == key
+    other_ti = get_farm('borkumriffgrund2', ti=.08)
+    moved = Farm(farm.name, farm.label, farm.site, farm.windTurbines, farm.x + np.eye(len(farm.x))[3], farm.y,
+                 farm.type, farm.subfarms)
+    others = [cache_key(farm, None, wd[1:], ws), cache_key(farm, None, wd, ws + .5),
+              cache_key(farm, BastankhahGaussian, wd, ws), cache_key(other_ti, None, wd, ws),
+              cache_key(get_farm('borkumriffgrund2', shear=.1), None, wd, ws), cache_key(moved, None, wd, ws),
+              cache_key(farm, None, wd, ws, max_wake_distance=1e4)]
+    assert key not in others
+
+
+def test_aep_cache_evicts_least_recently_used(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    report = aep_report(farm, wd=wd, ws=ws)
+    cache = AEPCache(str(tmp_path), max_bytes=0)
+    cache.put('a', report)
+    cache.put('b', report)
+    # the result just stored is kept even if it exceeds max_bytes
+    assert os.listdir(tmp_path) == ['b.npz']
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('b') is None
+
+
+def test_lru_cache_directory(tmp_path):
+    cache = LRUCache(1, str(tmp_path))
+    cache.put('a', np.arange(3))
+    cache.put('b', np.arange(4))
+    assert 'a' not in cache
+    np.testing.assert_array_equal(cache.get('a'), np.arange(3))
+    assert 'a' in cache
+    cache.clear()
+    assert sorted(os.listdir(tmp_path)) == ['a.npy', 'b.npy']
+    cache.clear(files=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_probability_tables(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    ref = farm.site.local_wind(farm.x, farm.y, 100, wd, ws).P_ilk
+    tables = ProbabilityTables(directory=str(tmp_path))
+    P_ilk = probability(farm.site, wd, ws, tables=tables)
+    np.testing.assert_allclose(np.broadcast_to(P_ilk, ref.shape), ref, rtol=1e-12)
+    assert not P_ilk.flags.writeable
+    # the turbulence intensity does not change the probabilities
+    probability(get_farm('borkumriffgrund2', ti=.05).site, wd, ws, tables=tables)
+    assert tables.n_computed == 1
+    tables.clear()
+    tables.get(farm.site, wd, ws)
+    assert tables.n_computed == 1
+    tables.get(farm.site, wd[1:], ws)
+    assert tables.n_computed == 2
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.chunking import (batched_power_P, chunked_power_P, estimate_memory_GB, n_per_simulation,
+                                     n_wd_chunks, wd_chunk_slices)
+from offshore_farms.probability import probability
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+@pytest.mark.parametrize('name', ['borkumriffgrund2', 'borsselewfz'])
+@pytest.mark.parametrize('options', [dict(memory_GB=1e-4), dict(n_workers=2, parallel='thread'),
+                                     dict(n_workers=2, parallel='process')])
+def test_chunked_equals_serial(name, options):
+    farm = get_farm(name)
+    serial = aep_report(farm, wd=wd, ws=ws)
+    chunked = aep_report(farm, wd=wd, ws=ws, **options)
+    np.testing.assert_allclose(chunked.AEP.values, serial.AEP.values, rtol=1e-10)
+    np.testing.assert_allclose(chunked.AEP_gross.values, serial.AEP_gross.values, rtol=1e-10)
+
+
+def test_chunked_power_P():
+    farm = get_farm('borkumriffgrund2')
+    P_ilk = probability(farm.site, wd, ws)
+    sim_res = farm.wind_farm_model()(farm.x, farm.y, wd=wd, ws=ws)
+    np.testing.assert_allclose(chunked_power_P(farm, None, wd, ws, P_ilk, memory_GB=1e-4),
+                               (sim_res.Power * sim_res.P).sum('ws').values, rtol=1e-12)
+
+
+def test_batched_power_P():
+    farm = get_farm('borkumriffgrund2')
+    wfm = farm.wind_farm_model()
+    P_ilk = probability(farm.site, wd, ws)
+    ti = np.array([.05, .1, .15, .2, .25])
+
+    def batch_kwargs(s):
+        return {'TI': np.repeat(ti[s], len(ws))}
+    for memory_GB in [None, 1e-4]:
+        res = batched_power_P(farm, wfm, wd, ws, P_ilk, len(ti), batch_kwargs, memory_GB)
+        assert res.shape == (len(farm.x), len(wd), len(ti))
+        for v, t in enumerate(ti):
+            sim_res = wfm(farm.x, farm.y, wd=wd, ws=ws, TI=t)
+            np.testing.assert_allclose(res[:, :, v], (sim_res.Power * sim_res.P).sum('ws').values, rtol=1e-12)
+
+
+def test_chunk_sizes():
+    assert n_wd_chunks(100, 360, 23) == 1
+    assert n_wd_chunks(100, 360, 23, n_workers=4) == 4
+    assert n_wd_chunks(100, 3, 23, n_workers=4) == 3
+    one_wd = estimate_memory_GB(100, 1, 23)
+    assert n_wd_chunks(100, 360, 23, memory_GB=10 * one_wd) == 36
+    assert n_wd_chunks(100, 360, 23, memory_GB=10 * one_wd, precision='float32') == 18
+    assert n_per_simulation(100, 360, 23, 2.5 * estimate_memory_GB(100, 360, 23)) == 2
+    assert n_per_simulation(100, 360, 23, 0) == 1
+    slices = wd_chunk_slices(10, 3)
+    assert [(s.start, s.stop) for s in slices] == [(0, 3), (3, 6), (6, 10)]
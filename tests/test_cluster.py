@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from py_wake import NOJLocal
+from offshore_farms import get_farm, registry
+from offshore_farms.cluster import cluster_farm, cluster_report, farm_wake_losses, project
+from offshore_farms.registry import (get_anchor, get_positions, get_site_class, get_wind_turbine_classes,
+                                     register_farm)
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+names = ['borssele1and2', 'borssele3and4']
+
+
+def test_cluster_report():
+    res = cluster_report(names, wd=wd, ws=ws, max_distance=1e6)
+    losses = farm_wake_losses(res)
+    for name in names:
+        alone = aep_report(get_farm(name), wd=wd, ws=ws)
+        np.testing.assert_allclose(losses.aep_alone.sel(subfarm=name), alone.aep, rtol=1e-10)
+        np.testing.assert_allclose(losses.aep_gross.sel(subfarm=name), alone.aep_gross, rtol=1e-10)
+        assert losses.external_wake_loss.sel(subfarm=name) > 0
+    # the cluster is simulated as one farm
+    ref = aep_report(cluster_farm(names), wd=wd, ws=ws)
+    np.testing.assert_allclose(res.aep, ref.aep, rtol=1e-10)
+    np.testing.assert_allclose(res.internal_wake_loss + res.external_wake_loss, res.wake_loss, rtol=1e-12)
+
+
+def test_member_sites():
+    # farms far apart do not interact, so each farm gets the AEP of its own site, not the site of the first farm
+    class TurbulentHornsea2(get_site_class('hornsea2')):
+        def __init__(self, ti=.1, shear=None):
+            super().__init__(ti=ti * 2, shear=shear)
+    register_farm('turbulenthornsea2', 'Hornsea 2 at TI 2x', get_wind_turbine_classes('hornsea2'),
+                  *get_positions('hornsea2').T, anchor=get_anchor('hornsea2'))(TurbulentHornsea2)
+    try:
+        far = ['borkumriffgrund2', 'turbulenthornsea2']
+        losses = farm_wake_losses(cluster_report(far, NOJLocal, wd=wd, ws=ws, max_distance=1e5, n_sectors=1))
+        for name in far:
+            alone = aep_report(get_farm(name), NOJLocal, wd=wd, ws=ws)  # TI dependent wake expansion
+            np.testing.assert_allclose(losses.aep.sel(subfarm=name), alone.aep, rtol=1e-10)
+    finally:
+        registry._farms.pop('turbulenthornsea2')
+
+
+def test_cluster_farm():
+    farm = cluster_farm(names)
+    assert len(farm.x) == len(get_farm(names[0]).x) + len(get_farm(names[1]).x)
+    assert sorted(farm.subfarms) == names
+    # the Borssele farms share their layout frame, so their relative positions are kept
+    x, y = get_farm(names[1]).x, get_farm(names[1]).y
+    np.testing.assert_allclose(farm.x[farm.subfarms[names[1]]] - farm.x[0], x - get_farm(names[0]).x[0], atol=1e-6)
+    np.testing.assert_allclose(farm.y[farm.subfarms[names[1]]] - farm.y[0], y - get_farm(names[0]).y[0], atol=1e-6)
+    with pytest.raises(ValueError):
+        cluster_farm(['borsselewfz', 'borssele1and2'])
+
+
+def test_project():
+    dx, dy = project([(55, 3), (56, 3)])
+    np.testing.assert_allclose(dx, 0, atol=1e-9)
+    np.testing.assert_allclose(dy[1] - dy[0], 111195, rtol=1e-3)
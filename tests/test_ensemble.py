@@ -0,0 +1,58 @@
+import copy
+import numpy as np
+import pytest
+from py_wake.wind_turbines.power_ct_functions import PowerCtTabular
+from offshore_farms import get_farm
+from offshore_farms.ensemble import ensemble_aep, ensemble_statistics, nominal_curves, perturbed_curves
+from offshore_farms.registry import Farm
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 10)
+ws = np.arange(4, 25, 2)
+
+
+def member_farm(farm, curves):
+    """Farm with the power/Ct curves of one (single type) member"""
+    (ws_tab, power, ct), = curves
+    wts = copy.copy(farm.windTurbines)
+    wts.powerCtFunction = PowerCtTabular(ws_tab, power, 'w', ct)
+    return Farm(farm.name, farm.label, farm.site, wts, farm.x, farm.y, farm.type, farm.subfarms)
+
+
+@pytest.mark.parametrize('memory_GB', [1e-4, 1])
+def test_batched_members_equal_separate_simulations(memory_GB):
+    farm = get_farm('borkumriffgrund2')
+    members = perturbed_curves(farm.windTurbines, 4, rng=np.random.default_rng(1))
+    res = ensemble_aep(farm, members, wd=wd, ws=ws, ensemble_wd_step=None, memory_GB=memory_GB)
+    for m, curves in enumerate(members):
+        ref = aep_report(member_farm(farm, curves), wd=wd, ws=ws)
+        np.testing.assert_allclose(res.AEP[m], ref.AEP.sum('wd'), rtol=1e-9)
+        np.testing.assert_allclose(res.AEP_gross[m], ref.AEP_gross.sum('wd'), rtol=1e-9)
+    ref = aep_report(farm, wd=wd, ws=ws)
+    np.testing.assert_allclose(res.aep_nominal, ref.aep, rtol=1e-9)
+    np.testing.assert_allclose(res.wake_loss_nominal, ref.wake_loss, rtol=1e-8)
+
+
+def test_ensemble_grid():
+    farm = get_farm('borkumriffgrund2')
+    members = perturbed_curves(farm.windTurbines, 4, rng=np.random.default_rng(2))
+    full = ensemble_aep(farm, members, wd=wd, ws=ws, ensemble_wd_step=None)
+    coarse = ensemble_aep(farm, members, wd=wd, ws=ws, ensemble_wd_step=30)
+    assert coarse.ensemble_wd == 12
+    np.testing.assert_allclose(coarse.aep, full.aep, rtol=1e-3)
+    np.testing.assert_allclose(coarse.aep_gross, full.aep_gross, rtol=1e-12)
+    np.testing.assert_allclose(coarse.aep_nominal, full.aep_nominal, rtol=1e-12)
+
+
+def test_perturbed_curves():
+    farm = get_farm('borsselewfz')
+    nominal = nominal_curves(farm.windTurbines)
+    assert len(nominal) == 2
+    members = perturbed_curves(farm.windTurbines, 3, power_std=.05, rng=np.random.default_rng(0))
+    for member in members:
+        for (ws_m, power_m, ct_m), (ws_n, power_n, _) in zip(member, nominal):
+            np.testing.assert_array_equal(ws_m, ws_n)
+            assert power_m.max() <= power_n.max()
+            assert np.all(ct_m >= 0)
+    stat = ensemble_statistics([1, 2, 3, 4, 5])
+    assert stat['P50'] == 3 and stat['n'] == 5
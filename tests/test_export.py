@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import pytest
+import xarray as xr
+from offshore_farms import get_farm
+from offshore_farms.export import ExportReader, export
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_export_equals_simulation(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    directory = str(tmp_path / 'export')
+    manifest = export(farm, directory, wd=wd, ws=ws, n_chunks=3, dtype='float64')
+    assert manifest['complete'] and len(manifest['chunks']) == 3
+    sim_res = farm.wind_farm_model()(farm.x, farm.y, type=farm.type, wd=wd, ws=ws)
+    np.testing.assert_allclose(manifest['aep'], aep_report(farm, wd=wd, ws=ws).aep, rtol=1e-10)
+
+    results = ExportReader(directory)
+    assert results.complete
+    ds = results.sel(['Power', 'WS_eff'], wd=slice(60, 200), wt=[0, 1, 2])
+    np.testing.assert_array_equal(ds.wd, wd[(wd >= 60) & (wd <= 200)])
+    ref = sim_res.sel(wd=ds.wd, wt=[0, 1, 2])
+    np.testing.assert_allclose(ds.Power.values, ref.Power.values, rtol=1e-12)
+    np.testing.assert_allclose(ds.WS_eff.values, ref.WS_eff.values, rtol=1e-12)
+    np.testing.assert_allclose(results.reduce('AEP', xr.DataArray.sum, ('wd', 'ws')).values,
+                               sim_res.aep().sum(['wd', 'ws']).values, rtol=1e-10)
+    with pytest.raises(KeyError):
+        results.sel(wd=5)
+
+
+def test_export_overwrite(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    directory = str(tmp_path)
+    open(os.path.join(directory, 'other.txt'), 'w').close()
+    export(farm, directory, wd=wd, ws=ws, n_chunks=3)
+    with pytest.raises(FileExistsError):
+        export(farm, directory, wd=wd, ws=ws)
+    manifest = export(farm, directory, wd=wd, ws=ws, n_chunks=2, overwrite=True)
+    assert sorted(os.listdir(directory)) == ['chunk_0000.nc', 'chunk_0001.nc', 'manifest.json', 'other.txt']
+    # float32 values, AEP accumulated in float64
+    results = ExportReader(directory)
+    assert results.sel(['Power']).Power.dtype == np.float32
+    np.testing.assert_allclose(float(results.reduce('AEP', xr.DataArray.sum, ('wt', 'wd', 'ws'))),
+                               manifest['aep'], rtol=1e-6)
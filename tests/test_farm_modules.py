@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+import pytest
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+farm_modules = ['BorkumRiffgrundII', 'BorsseleIIIandIV', 'BorsseleIandII', 'BorsseleWFZ', 'HornseaProject2']
+
+
+@pytest.mark.parametrize('module', farm_modules)
+def test_farm_module_import_has_no_side_effects(module):
+    # importing a farm module neither prints reports nor shows figures
+    out = subprocess.run([sys.executable, '-c', 'import %s' % module], cwd=repo_dir, check=True,
+                         capture_output=True, text=True, env={**os.environ, 'MPLBACKEND': 'Agg'})
+    assert out.stdout == ''
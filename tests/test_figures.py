@@ -0,0 +1,21 @@
+import os
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.figures import FigureExporter, export_figures, render
+
+
+def test_export_figures(tmp_path):
+    filenames = export_figures(['hornsea2', 'borsselewfz'], str(tmp_path), formats=('png', 'svg'), workers=2)
+    assert len(filenames) == 2 * 3 * 2
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(f) for f in filenames)
+    assert all(os.path.getsize(f) > 0 for f in filenames)
+
+
+def test_figure_exporter(tmp_path):
+    with FigureExporter(str(tmp_path / 'figures')) as exporter:
+        futures = exporter.submit(get_farm('borkumriffgrund2'), ['layout'])
+        with pytest.raises(ValueError):
+            exporter.submit('hornsea2', ['unknown'])
+    assert futures[0].result() == [str(tmp_path / 'figures' / 'borkumriffgrund2_layout.png')]
+    # the figures of a thread are reused
+    assert render('hornsea2', 'layout', str(tmp_path)) == [str(tmp_path / 'hornsea2_layout.png')]
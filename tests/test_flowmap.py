@@ -0,0 +1,36 @@
+import numpy as np
+from py_wake.flow_map import HorizontalGrid
+from offshore_farms import get_farm
+from offshore_farms.flowmap import FlowMapTiles, TileCache
+
+
+def test_tiles_equal_flow_map(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    cache = TileCache(directory=str(tmp_path))
+    tiles = FlowMapTiles(farm, tile_size=8, resolution=800, cache=cache)
+    bbox = tiles.default_bbox()
+    fm = tiles.flow_map(270, 10, bbox, level=1)
+    assert fm.resolution == 400
+    assert fm.x.min() >= bbox[0] and fm.x.max() <= bbox[2]
+    sim_res = farm.wind_farm_model()(farm.x, farm.y, type=farm.type, wd=[270], ws=[10])
+    ref = sim_res.flow_map(HorizontalGrid(x=fm.x.values, y=fm.y.values, h=tiles.h)).WS_eff.squeeze()
+    np.testing.assert_allclose(fm.values, ref.values, rtol=1e-6)
+
+    # the tiles are cached in memory and on disk
+    n = tiles.n_computed
+    tiles.flow_map(270, 10, bbox, level=1)
+    assert tiles.n_computed == n
+    cached = FlowMapTiles(farm, tile_size=8, resolution=800, cache=TileCache(directory=str(tmp_path)))
+    np.testing.assert_array_equal(cached.flow_map(270, 10, bbox, level=1).values, fm.values)
+    assert cached.n_computed == 0
+
+
+def test_levels():
+    farm = get_farm('borkumriffgrund2')
+    with FlowMapTiles(farm, tile_size=8, n_workers=2, parallel='thread') as tiles:
+        levels = list(tiles.levels(0, 12, level=2))
+        assert [level for level, _ in levels] == [0, 1, 2]
+        assert [fm.resolution for _, fm in levels] == [800, 400, 200]
+        serial = FlowMapTiles(farm, tile_size=8)
+        np.testing.assert_allclose(levels[-1][1].values, serial.flow_map(0, 12, level=2).values, rtol=1e-6)
+    assert tiles.level_for((0, 0, 8000, 8000), max_points=400) == 1
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from py_wake import NOJ, BastankhahGaussian, NOJLocal
+from offshore_farms import get_farm
+from offshore_farms.incremental import IncrementalAEP, in_wake, upstream, wake_levels, wd_groups
+from offshore_farms.pruning import wake_cone_k
+
+wd = np.arange(0, 360, 10)
+ws = np.arange(4, 25, 4)
+
+
+def full_aep_il(wfm, x, y, type_i, active):
+    aep_il = np.zeros((len(x), len(wd)))
+    sim_res = wfm(x[active], y[active], type=type_i[active], wd=wd, ws=ws)
+    aep_il[active] = sim_res.aep().sum('ws').values
+    return aep_il
+
+
+@pytest.mark.parametrize('name', ['borssele1and2', 'borsselewfz'])
+def test_incremental_equals_full_simulation(name):
+    farm = get_farm(name)
+    wfm = farm.wind_farm_model()
+    inc = IncrementalAEP(wfm(farm.x, farm.y, type=farm.type, wd=wd, ws=ws))
+    x, y = np.array(farm.x, dtype=float), np.array(farm.y, dtype=float)
+    type_i = np.zeros(len(x), dtype=int) + farm.type
+    active = np.ones(len(x), dtype=bool)
+
+    inc.move(40, x[40] + 300, y[40] - 100)
+    x[40] += 300
+    y[40] -= 100
+    np.testing.assert_allclose(inc.aep_il(), full_aep_il(wfm, x, y, type_i, active), rtol=1e-8, atol=1e-10)
+    assert 0 < inc.n_simulated <= len(x) * len(wd) * len(ws)
+
+    # several edits evaluated together
+    inc.remove(10)
+    active[10] = False
+    inc.move([11, 12], x[[11, 12]] + 150, y[[11, 12]])
+    x[[11, 12]] += 150
+    if len(farm.windTurbines.types()) > 1:
+        inc.set_type(5, 1 - type_i[5])
+        type_i[5] = 1 - type_i[5]
+    np.testing.assert_allclose(inc.aep_il(), full_aep_il(wfm, x, y, type_i, active), rtol=1e-8, atol=1e-10)
+    np.testing.assert_allclose(inc.aep(), full_aep_il(wfm, x, y, type_i, active).sum(), rtol=1e-10)
+
+
+def test_incremental_gaussian_is_approximate():
+    farm = get_farm('borssele1and2')
+    wfm = farm.wind_farm_model(BastankhahGaussian)
+    inc = IncrementalAEP(wfm(farm.x, farm.y, type=farm.type, wd=wd, ws=ws), k=.2)
+    x = np.array(farm.x, dtype=float)
+    x[40] += 300
+    inc.move(40, x[40], farm.y[40])
+    ref = wfm(x, farm.y, type=farm.type, wd=wd, ws=ws).aep().sum()
+    np.testing.assert_allclose(inc.aep(), ref, rtol=1e-4)
+
+
+def test_incremental_requires_propagate_downwind_wd_ws_result():
+    farm = get_farm('borkumriffgrund2')
+    wfm = farm.wind_farm_model(NOJ)
+    with pytest.raises(ValueError):
+        IncrementalAEP(wfm(farm.x, farm.y, wd=[0, 90], ws=[10, 10], time=True))
+
+
+def test_wake_levels():
+    # three wind turbines in a row along the wind (wd=270: the wind blows towards +x) and one far to the side
+    x, y = np.array([0, 500, 1000, 0]), np.array([0, 0, 0, 5000])
+    seed_il = np.array([[True], [False], [False], [False]])
+    np.testing.assert_array_equal(in_wake(x[:1], y[:1], x, y, [270], 100, .1)[0, :, 0], [False, True, True, False])
+    np.testing.assert_array_equal(wake_levels(x, y, [270], seed_il, 100, .1)[:, 0], [0, 1, 2, -1])
+    # the first wind turbine is upstream of the two others
+    np.testing.assert_array_equal(upstream(x, y, [270], [[False], [False], [True], [False]], 100, .1)[:, 0],
+                                  [True, True, True, False])
+
+
+def test_wd_groups():
+    needed_il = np.zeros((100, 6), dtype=bool)
+    needed_il[:50, [0, 1]] = True
+    needed_il[50:, [3, 4]] = True
+    assert [list(l) for l in wd_groups(needed_il)] == [[0, 1], [3, 4]]
+
+
+def test_default_wake_cone():
+    farm = get_farm('borkumriffgrund2')
+    sim_res = farm.wind_farm_model(NOJLocal)(farm.x, farm.y, type=farm.type, wd=wd, ws=ws)
+    assert IncrementalAEP(sim_res).k == wake_cone_k(sim_res.windFarmModel) != .1
@@ -0,0 +1,44 @@
+import numpy as np
+from offshore_farms import get_farm
+from offshore_farms.montecarlo import aep_statistics, monte_carlo, outage_samples, sample_aep
+from offshore_farms.registry import Farm
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_outages_equal_removed_wind_turbines():
+    farm = get_farm('borkumriffgrund2')
+    I = len(farm.x)
+    operating_si = np.ones((3, I), dtype=bool)
+    operating_si[1, [3, 20]] = False
+    operating_si[2] = False
+    aep_s = sample_aep(farm, operating_si, wd=wd, ws=ws, memory_GB=1e-4)
+    np.testing.assert_allclose(aep_s[0], aep_report(farm, wd=wd, ws=ws).aep, rtol=1e-9)
+    op = operating_si[1]
+    removed = Farm(farm.name, farm.label, farm.site, farm.windTurbines, farm.x[op], farm.y[op])
+    np.testing.assert_allclose(aep_s[1], aep_report(removed, wd=wd, ws=ws).aep, rtol=1e-9)
+    assert aep_s[2] == 0
+
+
+def test_outage_samples():
+    operating_si = outage_samples(50, 2000, .9, np.random.default_rng(0))
+    assert operating_si.shape == (2000, 50)
+    np.testing.assert_allclose(operating_si.mean(), .9, atol=.01)
+
+
+def test_aep_statistics():
+    stat = aep_statistics(np.arange(1001.))
+    assert stat['n'] == 1001 and stat['mean'] == 500 and stat['P50'] == 500 and stat['P90'] == 100
+    assert stat['P50_low'] < stat['P50'] < stat['P50_high']
+    assert stat['P90_low'] < stat['P90'] < stat['P90_high']
+
+
+def test_monte_carlo_independent_of_workers():
+    kwargs = dict(n_samples=12, batch_size=4, wd=wd, ws=ws, seed=1)
+    serial = list(monte_carlo('borkumriffgrund2', workers=1, **kwargs))
+    parallel = list(monte_carlo('borkumriffgrund2', workers=2, **kwargs))
+    assert [s['n'] for s in serial] == [4, 8, 12]
+    np.testing.assert_allclose(parallel[-1]['mean'], serial[-1]['mean'], rtol=1e-12)
+    np.testing.assert_allclose(parallel[-1]['P90'], serial[-1]['P90'], rtol=1e-12)
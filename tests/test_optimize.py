@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.optimize import (Evaluator, hull_constraints, layout_groups, optimize, optimize_farm, project,
+                                     violation)
+from offshore_farms.report import aep_report
+
+ws = [6, 9, 12]
+
+
+def test_optimize_improves_feasible_layout():
+    farm = get_farm('borkumriffgrund2')
+    D = farm.windTurbines.diameter()
+    A, b = hull_constraints(farm.x, farm.y)
+    ev = Evaluator('borkumriffgrund2', wd=np.arange(0, 360, 30), ws=ws)
+    aep_initial = ev.aep(farm.x, farm.y)
+    rounds = list(optimize('borkumriffgrund2', n_starts=2, wd_step=30, ws=ws, max_rounds=2, steps_per_round=2,
+                           seed=1))
+    assert len(rounds) <= 2
+    for s in rounds[-1]:
+        assert violation(s['x'], s['y'], A, b, 3.5 * D) <= 1e-3 * D
+        np.testing.assert_allclose(s['aep'], ev.aep(s['x'], s['y']), rtol=1e-10)
+    assert rounds[-1][0]['aep'] >= aep_initial
+
+
+def test_optimize_farm_without_rounds():
+    res = optimize_farm('borkumriffgrund2', max_rounds=0)
+    np.testing.assert_array_equal(res.x, res.x_initial)
+    assert res.gain == 0 and len(res.start) == 0
+    # reported with the pchip curves of the optimization
+    np.testing.assert_allclose(res.aep_initial, aep_report(get_farm('borkumriffgrund2', method='pchip')).aep)
+
+
+def test_layout_groups():
+    farm = get_farm('hornsea2')
+    groups = layout_groups(farm.x, farm.y)
+    assert len(groups) == 2
+    assert sorted(np.concatenate(groups)) == list(range(len(farm.x)))
+    # the empty area between the two clusters is inside the convex hull of the farm, but not inside a group hull
+    gap = np.array([[25000.], [8000.]])
+    assert violation(*gap, *[v[:1] for v in hull_constraints(farm.x, farm.y)], 0) < 0
+    A, b = hull_constraints(farm.x, farm.y, groups)
+    assert all(violation(*gap, A[[g[0]]], b[[g[0]]], 0) > 0 for g in groups)
+    assert violation(farm.x, farm.y, A, b, 0) <= 1e-6
+    # the groups are within the subfarms
+    farm = get_farm('borsselewfz')
+    subfarm_i = np.zeros(len(farm.x), dtype=int)
+    subfarm_i[farm.subfarms['Borssele I & II']] = 1
+    assert all(len(set(subfarm_i[g])) == 1 for g in layout_groups(farm.x, farm.y, farm.subfarms))
+
+
+def test_project():
+    x, y = np.array([0., 1000, 1000, 0, 500, 500]), np.array([0., 0, 1000, 1000, 500, 510])
+    A, b = hull_constraints(x, y)
+    x_new, y_new = project(np.r_[x[:5], 1200], np.r_[y[:5], 500], A, b, 100)
+    assert violation(x_new, y_new, A, b, 100) <= 1e-6
+    with pytest.raises(ValueError):
+        next(optimize('borkumriffgrund2', min_spacing=100))
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from py_wake import BastankhahGaussian
+from offshore_farms import farm_names, get_farm
+from offshore_farms.precision import check_precision, float32_model, precisions, simulate
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+@pytest.mark.parametrize('name', farm_names())
+def test_float32_within_stated_error(name):
+    farm = get_farm(name)
+    ref = aep_report(farm, wd=wd, ws=ws)
+    res = aep_report(farm, wd=wd, ws=ws, precision='float32')
+    # the AEP differs by less than 1e-7 (relative), see offshore_farms.precision
+    np.testing.assert_allclose(res.aep, ref.aep, rtol=1e-7)
+    np.testing.assert_allclose(res.wake_loss, ref.wake_loss, rtol=1e-5)
+    assert res.AEP.dtype == np.float64
+
+
+def test_float32_gaussian():
+    farm = get_farm('borkumriffgrund2')
+    ref = aep_report(farm, BastankhahGaussian, wd, ws)
+    res = aep_report(farm, BastankhahGaussian, wd, ws, precision='float32')
+    np.testing.assert_allclose(res.aep, ref.aep, rtol=1e-7)
+
+
+def test_float32_in_threads():
+    farm = get_farm('borkumriffgrund2')
+    wfm = farm.wind_farm_model()
+    ref = {p: simulate(wfm, farm.x, farm.y, p, type=farm.type, wd=wd, ws=ws)[2] for p in precisions}
+    with ThreadPoolExecutor(4) as executor:
+        res = list(executor.map(lambda p: simulate(wfm, farm.x, farm.y, p, type=farm.type, wd=wd, ws=ws)[2],
+                                precisions * 4))
+    for p, power_ilk in zip(precisions * 4, res):
+        np.testing.assert_array_equal(power_ilk, ref[p])
+    # the float32 simulations run on a copy of the model
+    assert '_calc_deficit' not in vars(wfm)
+    assert '_calc_deficit' in vars(float32_model(wfm))
+    assert not np.array_equal(ref['float32'], ref['float64'])
+
+
+def test_float32_thread_chunks():
+    farm = get_farm('borkumriffgrund2')
+    ref = aep_report(farm, wd=wd, ws=ws, precision='float32')
+    res = aep_report(farm, wd=wd, ws=ws, n_workers=2, parallel='thread', precision='float32')
+    np.testing.assert_allclose(res.AEP.values, ref.AEP.values, rtol=1e-12)
+    check_precision('float64')
+    with pytest.raises(ValueError):
+        check_precision('float16')
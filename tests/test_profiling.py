@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import numpy as np
+import pytest
+from py_wake.wind_farm_models.engineering_models import EngineeringWindFarmModel
+from offshore_farms import get_farm, profiling
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_profile(tmp_path):
+    farm = get_farm('borsselewfz')
+    assert not profiling.enabled()
+    with profiling.profile(memory=True) as prof:
+        assert profiling.enabled()
+        res = aep_report(farm, wd=wd, ws=ws)
+        with pytest.raises(RuntimeError):
+            with profiling.profile():
+                pass
+    assert not profiling.enabled()
+    summary = prof.summary()
+    assert {'simulation', 'site', 'wake_deficit', 'power_ct', 'aggregation'} <= set(summary)
+    assert summary['simulation']['calls'] == 1
+    assert summary['aggregation']['max_shape'] == [171, len(wd), len(ws)]
+    assert summary['simulation']['time'] >= summary['wake_deficit']['time']
+    assert summary['simulation']['peak_MB'] > 0
+    prof.save_json(str(tmp_path / 'profile.json'), farm=farm.name)
+    with open(tmp_path / 'profile.json') as fid:
+        assert json.load(fid)['farm'] == 'borsselewfz'
+    prof.save_chrome_trace(str(tmp_path / 'profile.trace'))
+    with open(tmp_path / 'profile.trace') as fid:
+        assert len(json.load(fid)['traceEvents']) == len(prof.events)
+    # the profiling hooks are removed again and do not change the result
+    np.testing.assert_array_equal(aep_report(farm, wd=wd, ws=ws).AEP, res.AEP)
+
+
+def test_profile_calling_thread_only():
+    farm = get_farm('borkumriffgrund2')
+    ref = aep_report(farm, wd=wd, ws=ws)
+    calc_deficit = EngineeringWindFarmModel.__dict__['_calc_deficit']
+    started, stop = threading.Event(), threading.Event()
+
+    def other_thread():
+        started.set()
+        reports = []
+        while not stop.is_set():
+            reports.append(aep_report(farm, wd=wd, ws=ws).AEP.values)
+        return reports
+    with ThreadPoolExecutor(1) as executor:
+        future = executor.submit(other_thread)
+        started.wait()
+        with profiling.profile() as prof:
+            res = aep_report(farm, wd=wd, ws=ws, precision='float32')
+        stop.set()
+        reports = future.result()
+    # the simulations of the other thread are neither recorded nor changed
+    assert {e[1] for e in prof.events} == {threading.get_ident()}
+    assert prof.summary()['simulation']['calls'] == 1
+    for AEP in reports:
+        np.testing.assert_array_equal(AEP, ref.AEP.values)
+    # the float32 deficits are recorded and the PyWake classes are not changed
+    assert 'wake_deficit' in prof.summary()
+    np.testing.assert_allclose(res.AEP.values, ref.AEP.values, rtol=1e-6)
+    assert EngineeringWindFarmModel.__dict__['_calc_deficit'] is calc_deficit
@@ -0,0 +1,47 @@
+import numpy as np
+from py_wake import NOJ, BastankhahGaussian, NOJLocal
+from offshore_farms import get_farm
+from offshore_farms.pruning import interacting_pairs, merge_clusters, sector_clusters, wake_cone_k
+from offshore_farms.report import aep_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+def test_pruned_within_tolerance():
+    farm = get_farm('borsselewfz')
+    full = aep_report(farm, wd=wd, ws=ws)
+    # NOJ wakes are inside the wake cone, so only the wakes beyond max_wake_distance are neglected
+    pruned = aep_report(farm, wd=wd, ws=ws, max_wake_distance=1e5)
+    np.testing.assert_allclose(pruned.AEP.values, full.AEP.values, rtol=1e-10)
+    pruned = aep_report(farm, wd=wd, ws=ws, max_wake_distance=3000)
+    assert full.aep <= pruned.aep <= full.aep * 1.01
+    np.testing.assert_allclose(pruned.AEP_gross.values, full.AEP_gross.values, rtol=1e-10)
+
+
+def test_pruned_gaussian_within_tolerance():
+    farm = get_farm('borkumriffgrund2')
+    full = aep_report(farm, BastankhahGaussian, wd=wd, ws=ws)
+    pruned = aep_report(farm, BastankhahGaussian, wd=wd, ws=ws, max_wake_distance=1e5, wake_cone_k=.2)
+    assert full.aep <= pruned.aep <= full.aep * 1.002
+
+
+def test_wake_cone_k():
+    farm = get_farm('borkumriffgrund2')
+    assert wake_cone_k(farm.wind_farm_model(NOJ)) == .1
+    # the expansion coefficient of NOJLocal, .38 * TI + .004, depends on the turbulence intensity
+    np.testing.assert_allclose(wake_cone_k(get_farm('borkumriffgrund2', ti=.08).wind_farm_model(NOJLocal)),
+                               .38 * .08 + .004)
+    assert wake_cone_k(farm.wind_farm_model(BastankhahGaussian), .3) == .3
+
+
+def test_clusters():
+    # two pairs of wind turbines 500 m apart along x, 10 km apart along y
+    x, y = np.array([0, 500, 0, 500]), np.array([0, 0, 10000, 10000])
+    pairs = interacting_pairs(x, y, 2000, 100)
+    assert len(pairs[0]) == 4
+    np.testing.assert_array_equal(sector_clusters(4, pairs, [270]), [0, 0, 1, 1])
+    # no wakes for wind from the north
+    assert len(np.unique(sector_clusters(4, pairs, [0]))) == 4
+    groups = merge_clusters(np.array([0, 0, 1, 1, 2]), 2)
+    assert sorted(map(len, groups)) == [2, 3]
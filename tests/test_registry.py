@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from py_wake.site.shear import PowerShear
+from offshore_farms import farm_names, get_farm
+from offshore_farms.registry import farm_modules, get_anchor, get_wind_turbine_classes
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_farm_names():
+    assert farm_names() == ['borkumriffgrund2', 'borssele1and2', 'borssele3and4', 'borsselewfz', 'hornsea2']
+    with pytest.raises(KeyError):
+        get_farm('unknown')
+
+
+def test_get_farm():
+    farm = get_farm('borsselewfz', ti=.08, shear=.12)
+    assert len(farm.x) == len(farm.y) == len(farm.type) == 171
+    assert len(get_wind_turbine_classes('borsselewfz')) == 2
+    assert float(farm.site.ds.TI) == .08
+    assert isinstance(farm.site.shear, PowerShear)
+    assert sorted(farm.subfarms) == ['Borssele I & II', 'Borssele III & IV']
+    np.testing.assert_array_equal(np.unique(farm.subfarm_i()), sorted(farm.subfarms))
+    assert get_anchor('hornsea2') == (53.530064, 1.472992)
+
+
+def test_farms_are_loaded_lazily():
+    code = ("import sys; from offshore_farms import get_farm; get_farm('hornsea2'); "
+            "print(sorted(m for m in %r if m in sys.modules))" % sorted(farm_modules.values()))
+    out = subprocess.run([sys.executable, '-c', code], cwd=repo_dir, check=True, capture_output=True,
+                         text=True).stdout
+    assert out.strip() == "['HornseaProject2']"
+
+
+def test_farm_module_aep_report():
+    from BorkumRiffgrundII import aep_report
+    from offshore_farms.report import aep_report as report_aep_report
+    np.testing.assert_allclose(aep_report(ti=.08, wd=wd, ws=ws).aep,
+                               report_aep_report(get_farm('borkumriffgrund2', ti=.08), wd=wd, ws=ws).aep)
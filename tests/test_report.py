@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from offshore_farms import farm_names, get_farm
+from offshore_farms.report import aep_report, subfarm_report
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+@pytest.mark.parametrize('name', farm_names())
+def test_aep_report_equals_simulation_aep(name):
+    farm = get_farm(name)
+    sim_res = farm.wind_farm_model()(farm.x, farm.y, type=farm.type, wd=wd, ws=ws)
+    report = aep_report(farm, wd=wd, ws=ws)
+    np.testing.assert_allclose(report.AEP.values, sim_res.aep().sum('ws').values, rtol=1e-10)
+    np.testing.assert_allclose(report.AEP_gross.values, sim_res.aep(with_wake_loss=False).sum('ws').values,
+                               rtol=1e-10)
+    np.testing.assert_allclose(report.aep, sim_res.aep().sum(), rtol=1e-10)
+    np.testing.assert_allclose(report.wake_loss, report.aep_gross - report.aep)
+
+
+def test_subfarm_report_sums_to_total():
+    report = aep_report(get_farm('borsselewfz'), wd=wd, ws=ws)
+    sub = subfarm_report(report)
+    np.testing.assert_allclose(sub.aep.sum(), report.aep, rtol=1e-12)
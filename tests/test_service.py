@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.report import aep_report
+from offshore_farms.service import AEPService, make_server, normalize
+
+wd = np.arange(0, 360, 30).tolist()
+ws = [4, 8, 12, 16, 20, 24]
+
+
+def test_queries_equal_aep_report():
+    service = AEPService()
+    queries = [{'farm': 'borkumriffgrund2', 'ti': ti, 'shear': shear, 'wd': wd, 'ws': ws}
+               for ti in [.06, .1] for shear in [None, .12]]
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(service.query, queries))
+    for q, r in zip(queries, results):
+        ref = aep_report(get_farm(q['farm'], q['ti'], q['shear']), wd=wd, ws=ws)
+        np.testing.assert_allclose(r['aep'], ref.aep, rtol=1e-9)
+        np.testing.assert_allclose(r['wake_loss'], ref.wake_loss, rtol=1e-8)
+        assert not r['cached']
+    # the queries differ only in ti and shear, so they are simulated together when they arrive together
+    assert [r['batch_size'] for r in service._simulate([normalize(q) for q in queries])] == [4] * 4
+    assert service.query(queries[0])['cached']
+    assert service.status()['cache_hits'] == 1
+
+    farm = get_farm('borkumriffgrund2')
+    r = service.query({'farm': 'borkumriffgrund2', 'wd': wd, 'ws': ws, 'x': farm.x[:10], 'y': farm.y[:10]})
+    assert r['n_wt'] == 10
+
+
+def test_normalize():
+    assert normalize({'farm': 'hornsea2', 'wd_step': 90})['wd'] == [0, 90, 180, 270]
+    for query in [[], {'farm': 'unknown'}, {'farm': 'hornsea2', 'unknown': 1},
+                  {'farm': 'hornsea2', 'wake_model': 'Unknown'}, {'farm': 'hornsea2', 'wd': [0], 'wd_step': 10},
+                  {'farm': 'hornsea2', 'x': [0, 1]}]:
+        with pytest.raises(ValueError):
+            normalize(query)
+
+
+def test_http():
+    server = make_server(AEPService(), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    try:
+        def post(query):
+            return json.load(urllib.request.urlopen(url + '/aep', json.dumps(query).encode()))
+        r = post({'farm': 'borkumriffgrund2', 'wd': [270], 'ws': [10]})
+        assert r['n_wt'] == 56 and r['aep'] > 0
+        assert json.load(urllib.request.urlopen(url + '/farms'))[0] == 'borkumriffgrund2'
+        assert json.load(urllib.request.urlopen(url + '/health'))['queries'] == 1
+        with pytest.raises(urllib.error.HTTPError) as e:
+            post({'farm': 'unknown'})
+        assert e.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
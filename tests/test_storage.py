@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from offshore_farms import farm_names, get_farm, storage
+
+
+def test_validate():
+    assert storage.validate() == []
+    assert storage.main(['validate']) == 0
+
+
+def test_build_and_validate(tmp_path):
+    assert storage.main(['build', '--directory', str(tmp_path), '--dtype', 'float32']) == 0
+    layout = storage.load_layout('hornsea2', str(tmp_path))
+    assert layout.dtype == np.float32
+
+
+def test_validate_detects_changes(tmp_path):
+    storage.build(str(tmp_path))
+    layout = np.array(storage.load_layout('hornsea2', str(tmp_path)))
+    layout[0, 0] += 1
+    np.save(tmp_path / 'layouts' / 'hornsea2.npy', layout)
+    assert storage.validate(str(tmp_path)) == ['layouts/hornsea2: sha256 differs from manifest',
+                                               'layouts/hornsea2: differs from the literal values']
+
+
+def test_stale_binary_data_raises(tmp_path):
+    ref = storage.reference_data()['layouts', 'hornsea2']
+    stale = ref.copy()
+    stale[0, 0] += 1
+    storage.save_layout('hornsea2', *stale.T, str(tmp_path))
+    np.testing.assert_array_equal(storage.load_layout('hornsea2', str(tmp_path)), stale)
+    with pytest.raises(ValueError, match='storage build'):
+        storage.load_layout('hornsea2', str(tmp_path), reference=ref)
+    storage.save_layout('hornsea2', *ref[1:].T, str(tmp_path))
+    with pytest.raises(ValueError):
+        storage.load_layout('hornsea2', str(tmp_path), reference=ref)
+
+
+@pytest.mark.parametrize('name', farm_names())
+def test_farm_layout_from_binary_data(name):
+    farm = get_farm(name)
+    np.testing.assert_array_equal(np.array([farm.x, farm.y]).T, storage.reference_data()['layouts', name])
+    layout = storage.load_layout(name)
+    assert not layout.flags.writeable
+
+
+def test_layout_in_other_directory(tmp_path):
+    x, y = np.arange(3.), np.arange(3.) * 2
+    assert not storage.has_layout('synthetic', str(tmp_path))
+    storage.save_layout('synthetic', x, y, str(tmp_path))
+    np.testing.assert_array_equal(storage.load_layout('synthetic', str(tmp_path)), np.array([x, y]).T)
+    with pytest.raises(KeyError):
+        storage.load_layout('synthetic')
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from py_wake import NOJ, NOJLocal
+from offshore_farms import get_farm
+from offshore_farms.report import aep_report
+from offshore_farms.sweep import sweep, ti_dependent
+
+wd = np.arange(0, 360, 30)
+ws = np.arange(4, 25, 4)
+
+
+@pytest.mark.parametrize('wake_model', [NOJ, NOJLocal])
+@pytest.mark.parametrize('memory_GB', [1e-4, 2])
+def test_sweep_equals_aep_report(wake_model, memory_GB):
+    farm = get_farm('borkumriffgrund2')
+    ti, shear = [.06, .12], [0, .1, .2]
+    res = sweep(farm, ti, shear, wake_model, wd, ws, memory_GB=memory_GB)
+    for t in ti:
+        for s in shear:
+            ref = aep_report(get_farm('borkumriffgrund2', ti=t, shear=s or None), wake_model, wd, ws)
+            r = res.sel(ti=t, shear=s)
+            np.testing.assert_allclose(r.AEP.values, ref.AEP.sum('wd').values, rtol=1e-9)
+            np.testing.assert_allclose(r.AEP_gross.values, ref.AEP_gross.sum('wd').values, rtol=1e-9)
+            np.testing.assert_allclose(r.wake_loss, ref.wake_loss, rtol=1e-8)
+
+
+def test_ti_dependent():
+    farm = get_farm('borkumriffgrund2')
+    assert not ti_dependent(farm.wind_farm_model(NOJ))
+    assert ti_dependent(farm.wind_farm_model(NOJLocal))
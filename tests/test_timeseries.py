@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from offshore_farms import get_farm
+from offshore_farms.report import hours_pr_year
+from offshore_farms.timeseries import array_chunks, read_chunks, timeseries_aep, timeseries_power
+
+
+def records(n, seed=0):
+    """Records on the bin centres, with many repetitions"""
+    rng = np.random.default_rng(seed)
+    return np.array([rng.integers(0, 36, n) * 10., rng.integers(30, 150, n) / 10, rng.integers(6, 9, n) / 100]).T
+
+
+@pytest.mark.parametrize('max_bins', [10, 100000])
+def test_binned_equals_records(max_bins):
+    farm = get_farm('borkumriffgrund2')
+    rec = records(1200)
+    rec[5] = np.nan
+    info = {}
+    res = list(timeseries_power(farm, array_chunks(rec, 500), memory_GB=1e-3, max_bins=max_bins, info=info))
+    assert [len(ds.time) for ds in res] == [500, 500, 200]
+    assert info['records'] == 1200 and info['valid_records'] == 1199
+    assert info['simulated_bins'] < info['bins'] < 1199
+    power = np.concatenate([ds.Power.values for ds in res])
+    assert np.all(np.isnan(power[5]))
+
+    valid = np.isfinite(rec).all(1)
+    wd, ws, ti = rec[valid].T
+    ref = farm.wind_farm_model()(farm.x, farm.y, type=farm.type, wd=wd, ws=ws, TI=ti, time=True)
+    np.testing.assert_allclose(power[valid], ref.Power.values.T, rtol=1e-6)
+    np.testing.assert_allclose(np.concatenate([ds.power.values for ds in res])[valid],
+                               ref.Power.sum('wt').values, rtol=1e-6)
+
+
+def test_binning():
+    farm = get_farm('borkumriffgrund2')
+    rec = records(300)
+    noisy = rec + np.random.default_rng(1).uniform(-.049, .049, rec.shape) * [10, 1, .1]
+    resolution = dict(wd_resolution=10, ws_resolution=.1, ti_resolution=.01)
+    binned = np.concatenate([ds.Power.values for ds in timeseries_power(farm, array_chunks(noisy), **resolution)])
+    ref = np.concatenate([ds.Power.values for ds in timeseries_power(farm, array_chunks(rec))])
+    np.testing.assert_array_equal(binned, ref)
+    # by default only identical records are simulated once
+    info = {}
+    list(timeseries_power(farm, array_chunks(noisy), info=info))
+    assert info['simulated_bins'] == 300
+
+
+def test_default_aep_equals_per_record_aep():
+    farm = get_farm('borkumriffgrund2')
+    rng = np.random.default_rng(2)
+    # continuous records, each repeated three times
+    rec = np.array([rng.uniform(0, 360, 200), rng.uniform(3, 25, 200), rng.uniform(.05, .1, 200)]).T
+    rec = rng.permutation(np.concatenate([rec] * 3))
+    info = {}
+    res = timeseries_aep(farm, array_chunks(rec, 250), info=info)
+    assert info['simulated_bins'] == 200
+    wd, ws, ti = rec.T
+    sim_res = farm.wind_farm_model()(farm.x, farm.y, type=farm.type, wd=wd, ws=ws, TI=ti, time=True)
+    aep_i = sim_res.Power.mean('time').values * hours_pr_year * 1e-9
+    np.testing.assert_allclose(res.AEP.values, aep_i, rtol=1e-7)
+    np.testing.assert_allclose(res.aep, aep_i.sum(), rtol=1e-7)
+
+
+def test_timeseries_aep(tmp_path):
+    farm = get_farm('borkumriffgrund2')
+    rec = records(400)
+    filename = str(tmp_path / 'records.csv')
+    np.savetxt(filename, rec, delimiter=',', header='wd,ws,ti', comments='')
+    output = str(tmp_path / 'output.csv')
+    res = timeseries_aep(farm, read_chunks(filename, 150), output=output)
+    ref = timeseries_aep(farm, array_chunks(rec))
+    np.testing.assert_allclose(res.aep, ref.aep, rtol=1e-12)
+    power = np.concatenate([ds.power.values for ds in timeseries_power(farm, array_chunks(rec))])
+    np.testing.assert_allclose(res.aep, power.mean() * hours_pr_year * 1e-9, rtol=1e-6)
+    assert res.aep < res.aep_gross
+    out = np.genfromtxt(output, delimiter=',', names=True)
+    assert len(out) == 400
+    np.testing.assert_allclose(out['power_MW'], np.round(power * 1e-6, 4), atol=1e-4)